@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Serialisation benchmark for the hot list routes.
+
+Compares the validated path FastAPI takes for `response_model=List[...]`
+(validate every element, dump to JSON-able python, encode with the stdlib)
+against the fast path the list routes now use (projected Mongo dicts
+encoded directly with orjson). Each route is measured at its list limit
+and reported as responses/second, which is the ceiling serialisation puts
+on requests/second for that route. When msgpack is installed, the
+MessagePack encoding of the same dicts (`Accept: application/msgpack`) is
+measured too, with the body size of both formats.
+
+Usage:
+    python benchmarks/bench_list_routes.py [--rounds N]
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "bench")
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+from server import (  # noqa: E402
+    Assignment,
+    DutyDefinition,
+    Personnel,
+    ScheduleDuty,
+    SEED_DUTIES,
+    SEED_PERSONNEL,
+    msgpack_default,
+)
+
+
+def make_assignments(n):
+    docs = []
+    for i in range(n):
+        person = SEED_PERSONNEL[i % len(SEED_PERSONNEL)]
+        duty = SEED_DUTIES[i % len(SEED_DUTIES)]
+        docs.append(Assignment(
+            schedule_duty_id=f"sd-{i % 40}",
+            duty_code=duty["code"],
+            duty_name=duty["name"],
+            personnel_id=f"p-{i % len(SEED_PERSONNEL)}",
+            personnel_name=person["name"],
+            personnel_callsign=person["callsign"],
+            date=f"2026-03-{(i % 28) + 1:02d}",
+            start_time="0800",
+            end_time="1200",
+        ).model_dump())
+    return docs
+
+
+def make_schedule_duties(n):
+    docs = []
+    for i in range(n):
+        duty = SEED_DUTIES[i % len(SEED_DUTIES)]
+        docs.append(ScheduleDuty(
+            duty_id=f"d-{i % len(SEED_DUTIES)}",
+            duty_name=duty["name"],
+            duty_code=duty["code"],
+            qualifications=duty["qualifications"],
+            date=f"2026-03-{(i % 28) + 1:02d}",
+        ).model_dump())
+    return docs
+
+
+def make_personnel(n):
+    return [Personnel(**SEED_PERSONNEL[i % len(SEED_PERSONNEL)]).model_dump() for i in range(n)]
+
+
+def make_duties(n):
+    return [DutyDefinition(**SEED_DUTIES[i % len(SEED_DUTIES)]).model_dump() for i in range(n)]
+
+
+# route -> (response model, document factory, list limit used by the route)
+ROUTES = {
+    "GET /api/assignments": (Assignment, make_assignments, 500),
+    "GET /api/schedule-duties": (ScheduleDuty, make_schedule_duties, 500),
+    "GET /api/personnel": (Personnel, make_personnel, 100),
+    "GET /api/duties": (DutyDefinition, make_duties, 100),
+}
+
+
+def validated_encode(adapter, docs):
+    items = adapter.validate_python(docs)
+    return JSONResponse(adapter.dump_python(items, mode="json")).body
+
+
+def fast_encode(docs):
+    return ORJSONResponse(docs).body
+
+
+def msgpack_encode(docs):
+    return msgpack.packb(docs, default=msgpack_default)
+
+
+def per_second(fn, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return rounds / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    header = f"{'route':<28}{'rows':>6}{'validated/s':>14}{'orjson/s':>12}{'gain':>8}"
+    if msgpack is not None:
+        header += f"{'msgpack/s':>12}{'json KB':>10}{'msgpack KB':>12}"
+    print(header)
+    for route, (model, factory, limit) in ROUTES.items():
+        docs = factory(limit)
+        adapter = TypeAdapter(List[model])
+        assert validated_encode(adapter, docs) and fast_encode(docs)
+        slow = per_second(lambda: validated_encode(adapter, docs), args.rounds)
+        fast = per_second(lambda: fast_encode(docs), args.rounds)
+        line = f"{route:<28}{limit:>6}{slow:>14.0f}{fast:>12.0f}{fast / slow:>7.1f}x"
+        if msgpack is not None:
+            packed = per_second(lambda: msgpack_encode(docs), args.rounds)
+            json_kb = len(fast_encode(docs)) / 1024
+            msgpack_kb = len(msgpack_encode(docs)) / 1024
+            line += f"{packed:>12.0f}{json_kb:>10.1f}{msgpack_kb:>12.1f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,250 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse
+from fastapi.routing import APIRoute
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from starlette.datastructures import Headers, MutableHeaders
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import CursorType, DeleteOne, InsertOne, ReplaceOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, CollectionInvalid, DuplicateKeyError, OperationFailure, PyMongoError
+from pymongo.monitoring import ConnectionPoolListener
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
+import asyncio
+import base64
+import bisect
+from collections import Counter, OrderedDict
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 import os
 import logging
+import re
+import threading
+import time
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional
+from typing import Any, Dict, List, NamedTuple, Optional
 import uuid
 from datetime import datetime, timezone, timedelta
+import calendar
+import gzip
+import httpx
+import orjson
 from dateutil.relativedelta import relativedelta
+import numpy as np
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip is always available
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:  # MessagePack is optional; responses stay JSON without it
+    msgpack = None
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# --- Database ---
+# Pool sizing, timeouts and wire compression come from the environment so
+# worker counts can be sized against the database without code changes.
+
+MONGO_ENV_OPTIONS = {
+    'MONGO_MAX_POOL_SIZE': 'maxPoolSize',
+    'MONGO_MIN_POOL_SIZE': 'minPoolSize',
+    'MONGO_MAX_IDLE_TIME_MS': 'maxIdleTimeMS',
+    'MONGO_WAIT_QUEUE_TIMEOUT_MS': 'waitQueueTimeoutMS',
+    'MONGO_CONNECT_TIMEOUT_MS': 'connectTimeoutMS',
+    'MONGO_SOCKET_TIMEOUT_MS': 'socketTimeoutMS',
+    'MONGO_SERVER_SELECTION_TIMEOUT_MS': 'serverSelectionTimeoutMS',
+}
+
+READ_PREFERENCES = {
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+class PoolStatsListener(ConnectionPoolListener):
+    """Collects connection checkout wait times across the driver's threads"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.stats = {
+            "checkouts": 0, "checkout_failures": 0, "checked_out": 0,
+            "wait_ms_total": 0.0, "wait_ms_max": 0.0,
+            "connections_created": 0, "connections_closed": 0, "pool_clears": 0,
+        }
+
+    def bump(self, key, amount=1):
+        with self.lock:
+            self.stats[key] += amount
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self.bump("pool_clears")
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self.bump("connections_created")
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self.bump("connections_closed")
+
+    def connection_check_out_started(self, event):
+        # Start and end of a checkout are reported on the same thread
+        self.local.started = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        self.bump("checkout_failures")
+
+    def connection_checked_out(self, event):
+        waited = (time.perf_counter() - getattr(self.local, "started", time.perf_counter())) * 1000
+        with self.lock:
+            self.stats["checkouts"] += 1
+            self.stats["checked_out"] += 1
+            self.stats["wait_ms_total"] += waited
+            self.stats["wait_ms_max"] = max(self.stats["wait_ms_max"], waited)
+
+    def connection_checked_in(self, event):
+        self.bump("checked_out", -1)
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            stats = dict(self.stats)
+        stats["wait_ms_avg"] = round(stats["wait_ms_total"] / stats["checkouts"], 3) if stats["checkouts"] else 0.0
+        stats["wait_ms_total"] = round(stats["wait_ms_total"], 3)
+        stats["wait_ms_max"] = round(stats["wait_ms_max"], 3)
+        return stats
+
+def mongo_client_options() -> dict:
+    options = {opt: int(os.environ[var]) for var, opt in MONGO_ENV_OPTIONS.items() if var in os.environ}
+    if os.environ.get('MONGO_COMPRESSORS'):
+        options['compressors'] = os.environ['MONGO_COMPRESSORS']  # e.g. "zstd,snappy,zlib"
+    return options
+
+def secondary_read_preference():
+    """Read preference for routes listed in MONGO_SECONDARY_READ_ROUTES"""
+    mode = os.environ.get('MONGO_SECONDARY_READ_PREFERENCE', 'secondaryPreferred')
+    max_staleness = int(os.environ.get('MONGO_MAX_STALENESS_SECONDS', '-1'))  # >= 90 when set
+    if mode == "primary":
+        return Primary()
+    return READ_PREFERENCES[mode](max_staleness=max_staleness)
+
+pool_stats = PoolStatsListener()
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, event_listeners=[pool_stats], **mongo_client_options())
 db = client[os.environ['DB_NAME']]
+# Heavy list/aggregation reads that tolerate bounded staleness; writes and
+# read-your-writes paths always use `db` (primary)
+read_db = client.get_database(os.environ['DB_NAME'], read_preference=secondary_read_preference())
+SECONDARY_READ_ROUTES = {
+    r.strip() for r in os.environ.get('MONGO_SECONDARY_READ_ROUTES', '').split(',') if r.strip()
+}
+
+def reader(route: str):
+    """Database handle a read route should use, per MONGO_SECONDARY_READ_ROUTES"""
+    return read_db if route in SECONDARY_READ_ROUTES else db
+
+# --- Content Negotiation ---
+# Clients sending `Accept: application/msgpack` get MessagePack instead of
+# JSON from api_router routes; the same Mongo dicts that would go to orjson
+# are packed directly. Request bodies may be MessagePack as well
+# (`Content-Type: application/msgpack`). Pre-encoded bodies (published
+# schedules) and error responses are always JSON.
+
+MSGPACK_TYPES = {"application/msgpack", "application/x-msgpack", "application/vnd.msgpack"}
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+response_format: ContextVar[str] = ContextVar("response_format", default="json")
+
+def wants_msgpack(accept: str) -> bool:
+    """True if the Accept header ranks MessagePack at least as high as JSON"""
+    if msgpack is None:
+        return False
+    msgpack_q = json_q = 0.0
+    for part in accept.split(","):
+        media_type, *params = part.split(";")
+        media_type = media_type.strip().lower()
+        q = 1.0
+        for param in params:
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if media_type in MSGPACK_TYPES:
+            msgpack_q = max(msgpack_q, q)
+        elif media_type in ("application/json", "application/*", "*/*"):
+            json_q = max(json_q, q)
+    return msgpack_q > 0 and msgpack_q >= json_q
+
+def msgpack_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot encode {type(value).__name__} as MessagePack")
+
+class APIResponse(ORJSONResponse):
+    """orjson response that packs MessagePack instead when the client asked for it"""
+
+    def render(self, content: Any) -> bytes:
+        if response_format.get() == "msgpack":
+            self.media_type = MSGPACK_MEDIA_TYPE
+            return msgpack.packb(content, default=msgpack_default)
+        return super().render(content)
+
+class MsgPackRequest(Request):
+    """Request whose body FastAPI reads through json() but is MessagePack"""
+
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            self._json = msgpack.unpackb(await self.body())
+        return self._json
+
+class NegotiatedRoute(APIRoute):
+    """Route decoding MessagePack bodies and choosing the response format"""
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def negotiated_handler(request: Request) -> Response:
+            content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+            if msgpack is not None and content_type in MSGPACK_TYPES:
+                # FastAPI only parses bodies it sees as JSON, via request.json()
+                headers = [(k, v) for k, v in request.scope["headers"] if k != b"content-type"]
+                scope = {**request.scope, "headers": headers + [(b"content-type", b"application/json")]}
+                request = MsgPackRequest(scope, request.receive)
+            token = response_format.set("msgpack" if wants_msgpack(request.headers.get("accept", "")) else "json")
+            try:
+                response = await handler(request)
+            finally:
+                response_format.reset(token)
+            if msgpack is not None:
+                response.headers.add_vary_header("Accept")
+            return response
+
+        return negotiated_handler
 
 app = FastAPI()
-api_router = APIRouter(prefix="/api")
+api_router = APIRouter(prefix="/api", route_class=NegotiatedRoute, default_response_class=APIResponse)
 
 # --- Models ---
 
+HHMM_PATTERN = r"^([01][0-9]|2[0-3])[0-5][0-9]$"  # "0000".."2359"
+
 class DutyDefinition(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -36,6 +258,12 @@ class DutyDefinitionCreate(BaseModel):
     code: str
     qualifications: List[str] = []
 
+class PersonnelCreate(BaseModel):
+    callsign: str
+    name: str
+    qualifications: List[str] = []
+    available: bool = True
+
 class ScheduleDuty(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -46,6 +274,7 @@ class ScheduleDuty(BaseModel):
     qualifications: List[str] = []
     date: str
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+    updated_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
 class ScheduleDutyCreate(BaseModel):
     duty_id: str
@@ -55,6 +284,11 @@ class ScheduleDutyCreate(BaseModel):
     qualifications: List[str] = []
     date: str
 
+class ScheduleDutyCascadeDelete(BaseModel):
+    ids: List[str] = []
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+
 class Personnel(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -79,7 +313,9 @@ class Assignment(BaseModel):
     end_time: str
     sub_duty_name: str = ""  # For group duties: "Pilot", "Tower", etc.
     slot_index: int = 0       # For group duties: slot number within sub-duty
+    version: int = 0          # Bumped on every update; see version_filter()
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+    updated_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
 class AssignmentCreate(BaseModel):
     schedule_duty_id: str
@@ -89,8 +325,8 @@ class AssignmentCreate(BaseModel):
     personnel_name: str
     personnel_callsign: str
     date: str
-    start_time: str
-    end_time: str
+    start_time: str = Field(pattern=HHMM_PATTERN)
+    end_time: str = Field(pattern=HHMM_PATTERN)
     sub_duty_name: str = ""
     slot_index: int = 0
 
@@ -98,6 +334,32 @@ class AssignmentUpdate(BaseModel):
     personnel_id: str
     personnel_name: str
     personnel_callsign: str
+    expected_version: Optional[int] = None  # 409 if the assignment moved on
+
+class AssignmentMove(BaseModel):
+    # Omitted fields keep their current value; a new schedule_duty_id also
+    # takes that duty's date, code and name
+    schedule_duty_id: Optional[str] = None
+    date: Optional[str] = None
+    start_time: Optional[str] = Field(None, pattern=HHMM_PATTERN)
+    end_time: Optional[str] = Field(None, pattern=HHMM_PATTERN)
+    expected_version: Optional[int] = None
+
+class AssignmentMoveItem(AssignmentMove):
+    id: str
+
+class AssignmentMoveBatch(BaseModel):
+    moves: List[AssignmentMoveItem]
+
+class AssignmentSwap(BaseModel):
+    first_id: str
+    second_id: str
+    expected_versions: Dict[str, int] = {}  # assignment id -> version; 409 if any moved on
+
+class AssignmentRotation(BaseModel):
+    # The person on cycle[i] takes cycle[i + 1]; the last wraps to cycle[0]
+    cycles: List[List[str]]
+    expected_versions: Dict[str, int] = {}
 
 class DutyConfigItem(BaseModel):
     name: str
@@ -108,11 +370,13 @@ class DutyGroupConfig(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     schedule_duty_id: str
     duties: List[DutyConfigItem] = []
+    version: int = 0
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
 class DutyGroupConfigCreate(BaseModel):
     schedule_duty_id: str
     duties: List[DutyConfigItem] = []
+    expected_version: Optional[int] = None
 
 class RecurrencePattern(BaseModel):
     frequency: str  # "daily", "weekly", "biweekly", "monthly", "custom"
@@ -130,12 +394,486 @@ class RecurringAssignmentCreate(BaseModel):
     personnel_name: str
     personnel_callsign: str
     start_date: str
-    start_time: str
-    end_time: str
+    start_time: str = Field(pattern=HHMM_PATTERN)
+    end_time: str = Field(pattern=HHMM_PATTERN)
     recurrence: RecurrencePattern
     sub_duty_name: str = ""
     slot_index: int = 0
 
+class RotationMember(BaseModel):
+    personnel_id: str
+    offset: int = 0  # days into the cycle this member starts at
+
+class RotationCreate(BaseModel):
+    schedule_duty_id: str  # template duty; one is scheduled per working day
+    members: List[RotationMember]
+    pattern: Optional[str] = None  # a ROTATION_PATTERNS name, or give `cycle`
+    cycle: List[int] = []          # 1 = on, 0 = off, one entry per day
+    start_date: str
+    end_date: str
+    start_time: str = Field(pattern=HHMM_PATTERN)
+    end_time: str = Field(pattern=HHMM_PATTERN)
+    sub_duty_name: str = ""
+    slot_index: int = 0
+
+class ConstraintRule(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    type: str  # "min_rest_hours", "max_consecutive_days", "max_weekly_hours", "qualification_required", "no_overlap", "availability"
+    value: float = 0  # hours or days, depending on type
+    severity: str = "error"  # "error" blocks writes, "warning" is only reported
+    enabled: bool = True
+    created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+
+class ConstraintRuleCreate(BaseModel):
+    type: str
+    value: float = 0
+    severity: str = "error"
+    enabled: bool = True
+
+class AvailabilityPeriod(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    personnel_id: str
+    start: str  # "YYYY-MM-DDTHHMM", inclusive
+    end: str    # "YYYY-MM-DDTHHMM", exclusive
+    reason: str = "leave"  # "leave", "course", "sick", "other"
+    note: str = ""
+    created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+
+class AvailabilityPeriodCreate(BaseModel):
+    personnel_id: str
+    start: str
+    end: str
+    reason: str = "leave"
+    note: str = ""
+
+class ScenarioCreate(BaseModel):
+    start_date: str
+    end_date: str
+
+class DayBucketRebuild(BaseModel):
+    start_date: Optional[str] = None  # both or neither; neither rebuilds every day
+    end_date: Optional[str] = None
+
+class BatchItem(BaseModel):
+    method: str
+    path: str  # e.g. "/api/assignments"
+    params: Dict[str, Any] = {}
+    body: Optional[Any] = None
+
+class BatchRequest(BaseModel):
+    requests: List[BatchItem]
+    atomic: bool = False  # stop at the first failure and undo earlier writes
+
+class Job(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    kind: str
+    status: str = "queued"  # "queued", "running", "succeeded", "failed", "cancelled"
+    payload: dict = {}
+    done: int = 0
+    total: int = 0
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    cancel_requested: bool = False
+    lease_until: Optional[str] = None
+    created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+
+# --- Read Projections ---
+# List routes return trusted documents straight from Mongo: the projection
+# selects exactly the model's fields and orjson encodes the dicts directly,
+# so response models are only enforced on the write path.
+
+def projection_for(model) -> dict:
+    """Mongo projection selecting the fields exposed by a response model"""
+    return {"_id": 0, **{name: 1 for name in model.model_fields}}
+
+DUTY_PROJECTION = projection_for(DutyDefinition)
+SCHEDULE_DUTY_PROJECTION = projection_for(ScheduleDuty)
+PERSONNEL_PROJECTION = projection_for(Personnel)
+ASSIGNMENT_PROJECTION = projection_for(Assignment)
+
+# `view=summary` presets: just enough for the month grid (codes and counts)
+SCHEDULE_DUTY_SUMMARY_FIELDS = ["duty_id", "duty_name", "duty_code", "duty_type", "date"]
+PERSONNEL_SUMMARY_FIELDS = ["callsign", "name", "total_duties", "available"]
+ASSIGNMENT_SUMMARY_FIELDS = ["schedule_duty_id", "duty_code", "date"]
+
+def resolve_projection(model, full: dict, summary_fields: List[str],
+                       fields: Optional[str], view: Optional[str]) -> dict:
+    """Map the `fields=` / `view=` query parameters onto a Mongo projection"""
+    if fields:
+        requested = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = sorted(set(requested) - set(model.model_fields))
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    elif view == "summary":
+        requested = summary_fields
+    elif view in (None, "full"):
+        return full
+    else:
+        raise HTTPException(status_code=400, detail=f"Unknown view: {view}")
+    # `id` is always returned so clients can key rows
+    return {"_id": 0, "id": 1, **{name: 1 for name in requested}}
+
+# --- Worker Coordination ---
+# Several uvicorn workers or pods share one database. Startup work that must
+# run once takes a lease-based lock in `locks`, and in-process caches tell
+# each other about invalidations through the capped `cache_events` collection.
+
+WORKER_ID = str(uuid.uuid4())
+CACHE_BUS_ENABLED = os.environ.get('CACHE_BUS_ENABLED', 'true').lower() == 'true'
+CACHE_EVENTS_SIZE_BYTES = int(os.environ.get('CACHE_EVENTS_SIZE_BYTES', str(1024 * 1024)))
+
+@asynccontextmanager
+async def distributed_lock(name: str, ttl_seconds: int = 60):
+    """Yield True if this worker holds `name`; the lease expires after ttl_seconds"""
+    now = datetime.now(timezone.utc)
+    try:
+        await db.locks.find_one_and_update(
+            {"_id": name, "expires_at": {"$lt": now}},
+            {"$set": {"owner": WORKER_ID, "expires_at": now + timedelta(seconds=ttl_seconds)}},
+            upsert=True,
+        )
+        acquired = True
+    except DuplicateKeyError:
+        acquired = False  # held by another worker and not yet expired
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            await db.locks.delete_one({"_id": name, "owner": WORKER_ID})
+
+class CacheBus:
+    """Cross-worker cache invalidation over a capped collection.
+
+    Every worker tails `cache_events` and applies invalidations published by
+    the others. Replaying old events only drops cache entries, so the tail
+    simply restarts from the beginning after any cursor error.
+    """
+
+    def __init__(self):
+        self.handlers = {}
+        self.pending = set()
+        self.task = None
+
+    def register(self, cache: str, handler):
+        """`handler(keys)` drops `keys` from the local cache (everything if empty)"""
+        self.handlers[cache] = handler
+
+    def publish(self, cache: str, keys: List[str]):
+        if self.task is None:
+            return
+        task = asyncio.create_task(db.cache_events.insert_one({
+            "cache": cache, "keys": keys, "origin": WORKER_ID,
+            "ts": datetime.now(timezone.utc).isoformat(),
+        }))
+        self.pending.add(task)
+        task.add_done_callback(self.pending.discard)
+
+    async def start(self):
+        if not CACHE_BUS_ENABLED:
+            return
+        try:
+            await db.create_collection("cache_events", capped=True, size=CACHE_EVENTS_SIZE_BYTES)
+        except CollectionInvalid:
+            pass  # created by another worker
+        # Tailable cursors die immediately on an empty capped collection
+        await db.cache_events.insert_one({"cache": None, "keys": [], "origin": WORKER_ID})
+        self.task = asyncio.create_task(self.listen())
+
+    async def listen(self):
+        while True:
+            try:
+                cursor = db.cache_events.find({}, cursor_type=CursorType.TAILABLE_AWAIT)
+                while cursor.alive:
+                    async for event in cursor:
+                        handler = self.handlers.get(event.get("cache"))
+                        if handler and event.get("origin") != WORKER_ID:
+                            handler(event.get("keys") or [])
+                    await asyncio.sleep(0.1)
+            except asyncio.CancelledError:
+                raise
+            except PyMongoError:
+                logger.exception("Cache event tail failed; dropping local caches and retrying")
+                for handler in self.handlers.values():
+                    handler([])
+            await asyncio.sleep(1)
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+
+cache_bus = CacheBus()
+
+# --- Change Log ---
+# Write routes describe what they changed as compact events in the capped,
+# append-only `change_log` collection: full documents for creates and
+# deletes, changed fields only for updates, so every event can be undone
+# and replayed. Events are queued in memory and written in batches by a
+# background task, so requests never wait on the log.
+
+CHANGE_LOG_SIZE_BYTES = int(os.environ.get('CHANGE_LOG_SIZE_BYTES', str(256 * 1024 * 1024)))
+CHANGE_LOG_BATCH_SIZE = int(os.environ.get('CHANGE_LOG_BATCH_SIZE', '500'))
+CHANGE_LOG_FLUSH_SECONDS = float(os.environ.get('CHANGE_LOG_FLUSH_SECONDS', '0.5'))
+CHANGE_LOG_QUEUE_SIZE = int(os.environ.get('CHANGE_LOG_QUEUE_SIZE', '10000'))
+
+current_actor: ContextVar[str] = ContextVar("current_actor", default="anonymous")
+# When set to a list, recorded events are also appended to it (see /api/batch)
+change_capture: ContextVar[Optional[list]] = ContextVar("change_capture", default=None)
+
+class ActorMiddleware:
+    """ASGI middleware exposing the X-Actor request header as `current_actor`"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        actor = Headers(scope=scope).get("x-actor")
+        token = current_actor.set(actor[:100] if actor else "anonymous")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_actor.reset(token)
+
+def diff_documents(before: dict, after: dict) -> dict:
+    """{field: [old, new]} for every top-level field that differs"""
+    return {
+        key: [before.get(key), after.get(key)]
+        for key in before.keys() | after.keys()
+        if key != "_id" and before.get(key) != after.get(key)
+    }
+
+class ChangeLog:
+    """Batched writer for change events"""
+
+    def __init__(self):
+        self.queue: Optional[asyncio.Queue] = None
+        self.task = None
+        self.batch: List[dict] = []
+        self.dropped = 0
+
+    def record(self, entity: str, entity_id: str, action: str, before: Optional[dict] = None, after: Optional[dict] = None):
+        """Queue one change; `action` is "create", "update" or "delete"."""
+        event = {
+            "id": str(uuid.uuid4()),
+            "ts": datetime.now(timezone.utc).isoformat(),
+            "actor": current_actor.get(),
+            "entity": entity,
+            "entity_id": entity_id,
+            "action": action,
+        }
+        if action == "create":
+            event["after"] = {k: v for k, v in after.items() if k != "_id"}
+        elif action == "delete":
+            event["before"] = {k: v for k, v in before.items() if k != "_id"}
+        else:
+            event["changes"] = diff_documents(before, after)
+            if not event["changes"]:
+                return
+        capture = change_capture.get()
+        if capture is not None:
+            capture.append(event)
+        if self.queue is None:
+            return  # not started (tests, scripts)
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning("Change log queue full; dropped event for %s %s", entity, entity_id)
+
+    async def wait_for_room(self, count: int):
+        """Backpressure for bulk writers: wait until `count` more events fit in the queue"""
+        if self.queue is None:
+            return
+        count = min(count, self.queue.maxsize)
+        while self.queue.maxsize - self.queue.qsize() < count:
+            await asyncio.sleep(CHANGE_LOG_FLUSH_SECONDS)
+
+    async def start(self):
+        try:
+            await db.create_collection("change_log", capped=True, size=CHANGE_LOG_SIZE_BYTES)
+        except CollectionInvalid:
+            pass  # exists, or created by another worker
+        await db.change_log.create_index([("entity_id", 1), ("ts", -1)])
+        await db.change_log.create_index("ts")
+        self.queue = asyncio.Queue(maxsize=CHANGE_LOG_QUEUE_SIZE)
+        self.task = asyncio.create_task(self.run())
+
+    async def fill_batch(self):
+        """Collect events into `self.batch` until it is full or the flush interval passes"""
+        self.batch.append(await self.queue.get())
+        deadline = time.monotonic() + CHANGE_LOG_FLUSH_SECONDS
+        while len(self.batch) < CHANGE_LOG_BATCH_SIZE:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                self.batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+    async def flush(self):
+        batch, self.batch = self.batch, []
+        if not batch:
+            return
+        try:
+            await db.change_log.insert_many(batch, ordered=False)
+        except PyMongoError:
+            logger.exception("Failed to write %d change events", len(batch))
+
+    async def run(self):
+        while True:
+            await self.fill_batch()
+            await self.flush()
+
+    async def stop(self):
+        """Stop the writer and flush whatever is still queued"""
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        while not self.queue.empty():
+            self.batch.append(self.queue.get_nowait())
+        await self.flush()
+
+change_log = ChangeLog()
+
+def record_change(entity: str, entity_id: str, action: str, before: Optional[dict] = None, after: Optional[dict] = None):
+    """Log a write and feed it to the day-bucket read model"""
+    change_log.record(entity, entity_id, action, before=before, after=after)
+    day_bucket_writer.record(entity, entity_id, action, before, after)
+
+async def make_room_for_changes(count: int):
+    """Backpressure for bulk writers about to record `count` events"""
+    await change_log.wait_for_room(count)
+    await day_bucket_writer.wait_for_room(count)
+
+# Collections holding each logged entity, for reverting events
+CHANGE_COLLECTIONS = {
+    "duty": "duties",
+    "personnel": "personnel",
+    "schedule_duty": "schedule_duties",
+    "duty_group_config": "duty_group_configs",
+    "assignment": "assignments",
+    "constraint_rule": "constraint_rules",
+    "availability_period": "availability",
+    "published_schedule": "published_schedules",
+}
+VERSIONED_ENTITIES = {"assignment", "duty_group_config"}
+
+def drop_entity_cache(entity: str):
+    """Drop in-process caches built from an entity's collection after a revert"""
+    if entity == "constraint_rule":
+        drop_compiled_rules()
+        cache_bus.publish("constraint_rules", [])
+    elif entity == "availability_period":
+        invalidate_availability()
+    elif entity == "published_schedule":
+        drop_published([])
+        cache_bus.publish("published_schedules", [])
+
+def revert_guard(entity: str, doc: dict) -> dict:
+    """Fields a row still holds if nothing has touched it since `doc` was written"""
+    if entity in VERSIONED_ENTITIES:
+        return {"version": doc.get("version", 0)}
+    if "updated_at" in doc:
+        return {"updated_at": doc["updated_at"]}
+    return dict(doc)
+
+async def revert_change(event: dict, written: dict) -> bool:
+    """Apply the inverse of a change event, logging the inverse as a new event.
+
+    The row is only reverted if it still holds what the event wrote; False
+    means something else changed it since and it was left alone. `written`
+    carries the versions and timestamps earlier reverts in the same rollback
+    moved forward, keyed by (entity, id). Assignment reverts also restore
+    the personnel total_duties counters.
+    """
+    entity, entity_id = event["entity"], event["entity_id"]
+    collection = db[CHANGE_COLLECTIONS[entity]]
+    key = (entity, entity_id)
+    now = datetime.now(timezone.utc).isoformat()
+    if event["action"] == "create":
+        guard = {**revert_guard(entity, event["after"]), **written.get(key, {})}
+        doc = await collection.find_one_and_delete({"id": entity_id, **guard}, {"_id": 0})
+        if not doc:
+            return False
+        if "date" in doc:
+            await db.tombstones.insert_many(tombstones_for(entity, [doc]))
+        if entity == "assignment":
+            await db.personnel.update_one({"id": doc["personnel_id"]}, {"$inc": {"total_duties": -1}})
+        record_change(entity, entity_id, "delete", before=doc)
+        drop_entity_cache(entity)
+    elif event["action"] == "delete":
+        doc = {**event["before"]}
+        if "updated_at" in doc:
+            doc["updated_at"] = now
+        if entity in VERSIONED_ENTITIES:
+            doc["version"] = doc.get("version", 0) + 1
+        try:
+            await collection.insert_one(doc)
+        except DuplicateKeyError:
+            return False  # recreated in the meantime
+        doc.pop("_id", None)
+        written[key] = {k: doc[k] for k in ("version", "updated_at") if k in doc}
+        if entity == "assignment":
+            await db.personnel.update_one({"id": doc["personnel_id"]}, {"$inc": {"total_duties": 1}})
+        record_change(entity, entity_id, "create", after=doc)
+        drop_entity_cache(entity)
+    else:
+        guard = {k: new for k, (old, new) in event["changes"].items()}
+        guard.update(written.get(key, {}))
+        # Versions and timestamps move forward; everything else goes back
+        restore = {k: old for k, (old, new) in event["changes"].items() if k not in ("version", "updated_at")}
+        update = {"$set": {**restore}}
+        if entity in VERSIONED_ENTITIES:
+            update["$inc"] = {"version": 1}
+        if entity in ("assignment", "schedule_duty"):
+            update["$set"]["updated_at"] = now
+        before = await collection.find_one_and_update({"id": entity_id, **guard}, update, {"_id": 0},
+                                                      return_document=ReturnDocument.BEFORE)
+        if not before:
+            return False
+        moved_from = event["changes"].get("personnel_id")
+        if entity == "assignment" and moved_from and before["personnel_id"] != moved_from[0]:
+            await db.personnel.bulk_write([
+                UpdateOne({"id": before["personnel_id"]}, {"$inc": {"total_duties": -1}}),
+                UpdateOne({"id": moved_from[0]}, {"$inc": {"total_duties": 1}}),
+            ], ordered=False)
+        after = {**before, **update["$set"]}
+        if "$inc" in update:
+            after["version"] = before.get("version", 0) + 1
+        written[key] = {k: after[k] for k in ("version", "updated_at") if k in after}
+        record_change(entity, entity_id, "update", before=before, after=after)
+    return True
+
+@api_router.get("/history", response_class=APIResponse)
+async def get_history(entity_id: Optional[str] = None, entity: Optional[str] = None,
+                      since: Optional[str] = None, limit: int = 100):
+    """Change events, newest first. Events are written in batches, so the
+    last CHANGE_LOG_FLUSH_SECONDS of changes may not be visible yet."""
+    query = {}
+    if entity_id:
+        query["entity_id"] = entity_id
+    if entity:
+        query["entity"] = entity
+    if since:
+        query["ts"] = {"$gt": since}
+    if not query:
+        raise HTTPException(status_code=400, detail="Provide entity_id, entity or since")
+    limit = max(1, min(limit, 1000))
+    events = await db.change_log.find(query, {"_id": 0}).sort("ts", -1).to_list(limit)
+    return APIResponse(events)
+
 # --- Seed Data ---
 
 SEED_DUTIES = [
@@ -161,71 +899,489 @@ SEED_PERSONNEL = [
 async def seed_duties():
     count = await db.duties.count_documents({})
     if count == 0:
-        for d in SEED_DUTIES:
-            duty = DutyDefinition(**d)
-            await db.duties.insert_one(duty.model_dump())
+        await db.duties.insert_many([DutyDefinition(**d).model_dump() for d in SEED_DUTIES])
         logger.info(f"Seeded {len(SEED_DUTIES)} duties")
 
 async def seed_personnel():
     count = await db.personnel.count_documents({})
     if count == 0:
-        for p in SEED_PERSONNEL:
-            person = Personnel(**p)
-            await db.personnel.insert_one(person.model_dump())
+        await db.personnel.insert_many([Personnel(**p).model_dump() for p in SEED_PERSONNEL])
         logger.info(f"Seeded {len(SEED_PERSONNEL)} personnel")
 
+async def seed_data():
+    # Check-then-insert is only safe while no other worker does the same
+    async with distributed_lock("seed") as acquired:
+        if not acquired:
+            logger.info("Another worker is seeding; skipping")
+            return
+        await seed_duties()
+        await seed_personnel()
+
 # --- Duty Routes ---
 
 @api_router.get("/")
 async def root():
     return {"message": "OpsScheduler API"}
 
-@api_router.get("/duties", response_model=List[DutyDefinition])
+@api_router.get("/duties", response_model=List[DutyDefinition], response_class=APIResponse)
 async def get_duties(search: Optional[str] = None):
     query = {}
     if search:
         query = {"name": {"$regex": search, "$options": "i"}}
-    duties = await db.duties.find(query, {"_id": 0}).to_list(100)
-    return duties
+    duties = await reader("duties").duties.find(query, DUTY_PROJECTION).to_list(100)
+    return APIResponse(duties)
 
 @api_router.post("/duties", response_model=DutyDefinition)
 async def create_duty(input: DutyDefinitionCreate):
     duty = DutyDefinition(**input.model_dump())
     doc = duty.model_dump()
     await db.duties.insert_one(doc)
+    record_change("duty", duty.id, "create", after=doc)
     return duty
 
-@api_router.get("/schedule-duties", response_model=List[ScheduleDuty])
-async def get_schedule_duties(date: Optional[str] = None, start_date: Optional[str] = None, end_date: Optional[str] = None):
+@api_router.get("/schedule-duties", response_model=List[ScheduleDuty], response_class=APIResponse)
+async def get_schedule_duties(date: Optional[str] = None, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                              fields: Optional[str] = None, view: Optional[str] = None):
+    projection = resolve_projection(ScheduleDuty, SCHEDULE_DUTY_PROJECTION, SCHEDULE_DUTY_SUMMARY_FIELDS, fields, view)
     query = {}
     if date:
         query["date"] = date
     elif start_date and end_date:
         query["date"] = {"$gte": start_date, "$lte": end_date}
-    duties = await db.schedule_duties.find(query, {"_id": 0}).to_list(500)
-    return duties
+    duties = await reader("schedule_duties").schedule_duties.find(query, projection).to_list(500)
+    return APIResponse(duties)
 
 @api_router.post("/schedule-duties", response_model=ScheduleDuty)
 async def add_schedule_duty(input: ScheduleDutyCreate):
-    schedule_duty = ScheduleDuty(**input.model_dump())
-    doc = schedule_duty.model_dump()
-    await db.schedule_duties.insert_one(doc)
-    return schedule_duty
+    stored = await upsert_schedule_duty(ScheduleDuty(**input.model_dump()))
+    invalidate_calendar_summary(stored["date"])
+    return stored
 
 @api_router.delete("/schedule-duties/{duty_id}")
 async def remove_schedule_duty(duty_id: str):
-    result = await db.schedule_duties.delete_one({"id": duty_id})
-    if result.deleted_count == 0:
+    result = await cascade_delete_schedule_duties({"id": duty_id})
+    if result["schedule_duties"] == 0:
         raise HTTPException(status_code=404, detail="Schedule duty not found")
-    # Also delete related configs and assignments
-    await db.duty_group_configs.delete_many({"schedule_duty_id": duty_id})
-    await db.assignments.delete_many({"schedule_duty_id": duty_id})
+    return {"deleted": True, **result}
+
+@api_router.post("/schedule-duties/cascade-delete")
+async def cascade_delete_schedule_duties_route(input: ScheduleDutyCascadeDelete):
+    """Delete schedule duties by id list and/or date range, with their configs and assignments"""
+    return await cascade_delete_schedule_duties(cascade_delete_query(input))
+
+# --- Optimistic Concurrency ---
+# Assignments and group configs carry a `version` that every update bumps.
+# Clients may send the version they last saw; a stale one yields 409.
+
+def version_filter(expected: Optional[int]) -> dict:
+    """Query fragment matching a document at `expected` version (any version if None)"""
+    if expected is None:
+        return {}
+    if expected == 0:
+        # Documents written before versioning have no field yet
+        return {"version": {"$in": [0, None]}}
+    return {"version": expected}
+
+async def raise_not_found_or_conflict(collection, query: dict, name: str):
+    """A conditional write matched nothing: 404 if the document is gone, else 409"""
+    if await collection.count_documents(query, limit=1):
+        raise HTTPException(status_code=409, detail=f"{name} was modified by another user; reload and retry")
+    raise HTTPException(status_code=404, detail=f"{name} not found")
+
+# --- Cascade Delete ---
+# Deleting a schedule duty removes its group config and assignments and
+# gives the assigned personnel their total_duties back. Duties are processed
+# in bounded chunks, each applied atomically in its own transaction.
+
+CASCADE_BATCH_SIZE = int(os.environ.get('CASCADE_BATCH_SIZE', '500'))
+transactions_supported = True
+
+async def run_in_transaction(fn):
+    """Await `fn(session)` inside a transaction.
+
+    Standalone servers (local development) cannot run transactions; there
+    `fn(None)` runs without one after the first refusal.
+    """
+    global transactions_supported
+    if transactions_supported:
+        async with await client.start_session() as session:
+            try:
+                async with session.start_transaction():
+                    return await fn(session)
+            except OperationFailure as exc:
+                if exc.code != 20:  # IllegalOperation: not a replica set member
+                    raise
+        transactions_supported = False
+        logger.warning("MongoDB does not support transactions; running multi-document writes without them")
+    return await fn(None)
+
+def cascade_delete_query(input: ScheduleDutyCascadeDelete) -> dict:
+    query = {}
+    if input.ids:
+        query["id"] = {"$in": input.ids}
+    if input.start_date and input.end_date:
+        query["date"] = {"$gte": input.start_date, "$lte": input.end_date}
+    elif input.start_date or input.end_date:
+        raise HTTPException(status_code=400, detail="start_date and end_date must be given together")
+    if not query:
+        raise HTTPException(status_code=400, detail="Provide ids or a start_date/end_date range")
+    return query
+
+async def cascade_delete_chunk(duty_ids: List[str], session):
+    """Delete one chunk; returns the counts and the deleted documents by entity"""
+    # Read what is about to disappear, for the change log and for the
+    # per-person decrements
+    deleted = {
+        "schedule_duty": await db.schedule_duties.find({"id": {"$in": duty_ids}}, {"_id": 0}, session=session).to_list(None),
+        "duty_group_config": await db.duty_group_configs.find({"schedule_duty_id": {"$in": duty_ids}}, {"_id": 0}, session=session).to_list(None),
+        "assignment": await db.assignments.find({"schedule_duty_id": {"$in": duty_ids}}, {"_id": 0}, session=session).to_list(None),
+    }
+    decrements = Counter(a["personnel_id"] for a in deleted["assignment"])
+    duties = await db.schedule_duties.delete_many({"id": {"$in": duty_ids}}, session=session)
+    configs = await db.duty_group_configs.delete_many({"schedule_duty_id": {"$in": duty_ids}}, session=session)
+    assignments = await db.assignments.delete_many({"schedule_duty_id": {"$in": duty_ids}}, session=session)
+    if decrements:
+        await db.personnel.bulk_write([
+            UpdateOne({"id": personnel_id}, {"$inc": {"total_duties": -count}})
+            for personnel_id, count in decrements.items()
+        ], ordered=False, session=session)
+    tombstones = tombstones_for("schedule_duty", deleted["schedule_duty"]) + tombstones_for("assignment", deleted["assignment"])
+    if tombstones:
+        await db.tombstones.insert_many(tombstones, session=session)
+    counts = {
+        "schedule_duties": duties.deleted_count,
+        "duty_group_configs": configs.deleted_count,
+        "assignments": assignments.deleted_count,
+        "personnel_updated": len(decrements),
+    }
+    return counts, deleted
+
+async def cascade_delete_schedule_duties(query: dict, progress=None) -> dict:
+    """Delete the schedule duties matching `query` and everything hanging off them"""
+    targets = await db.schedule_duties.find(query, {"_id": 0, "id": 1, "date": 1}).to_list(None)
+    totals = {"schedule_duties": 0, "duty_group_configs": 0, "assignments": 0, "personnel_updated": 0}
+    for start in range(0, len(targets), CASCADE_BATCH_SIZE):
+        chunk = [t["id"] for t in targets[start:start + CASCADE_BATCH_SIZE]]
+        counts, deleted = await run_in_transaction(lambda session: cascade_delete_chunk(chunk, session))
+        for key, value in counts.items():
+            totals[key] += value
+        for entity, docs in deleted.items():
+            for doc in docs:
+                record_change(entity, doc["id"], "delete", before=doc)
+        if progress:
+            await progress(start + len(chunk), len(targets))
+    if targets:
+        invalidate_calendar_summary(*{t["date"] for t in targets})
+    return totals
+
+# --- Schedule Duty Natural Key ---
+# A duty appears at most once per date and type. The unique
+# (duty_id, date, duty_type) index enforces it, and creation paths upsert on
+# that key so adding an existing occurrence returns it instead of a copy.
+
+SCHEDULE_DUTY_KEY = [("duty_id", 1), ("date", 1), ("duty_type", 1)]
+
+def schedule_duty_key(doc: dict) -> dict:
+    return {"duty_id": doc["duty_id"], "date": doc["date"], "duty_type": doc.get("duty_type", "single")}
+
+async def upsert_schedule_duty(schedule_duty: ScheduleDuty) -> dict:
+    """Insert `schedule_duty` unless its occurrence exists; return the stored one"""
+    doc = schedule_duty.model_dump()
+    key = schedule_duty_key(doc)
+    try:
+        stored = await db.schedule_duties.find_one_and_update(
+            key, {"$setOnInsert": doc}, {"_id": 0}, upsert=True, return_document=ReturnDocument.AFTER,
+        )
+    except DuplicateKeyError:
+        # Lost an insert race on the unique key; the winner's row is there now
+        stored = await db.schedule_duties.find_one(key, {"_id": 0})
+    if stored["id"] == schedule_duty.id:
+        record_change("schedule_duty", schedule_duty.id, "create", after=doc)
+    return stored
+
+async def upsert_schedule_duties(duties: List[ScheduleDuty]) -> dict:
+    """Bulk form of upsert_schedule_duty; returns {date: stored schedule duty id}"""
+    if not duties:
+        return {}
+    docs = [d.model_dump() for d in duties]
+    try:
+        result = await db.schedule_duties.bulk_write([
+            UpdateOne(schedule_duty_key(doc), {"$setOnInsert": doc}, upsert=True) for doc in docs
+        ], ordered=False)
+        upserted = result.upserted_ids
+    except BulkWriteError as exc:
+        # Duplicate keys mean another request inserted those occurrences first
+        if any(error["code"] != 11000 for error in exc.details["writeErrors"]):
+            raise
+        upserted = {row["index"]: row["_id"] for row in exc.details["upserted"]}
+    await make_room_for_changes(len(upserted))
+    for index in upserted:
+        record_change("schedule_duty", docs[index]["id"], "create", after=docs[index])
+    stored = await db.schedule_duties.find(
+        {"$or": [schedule_duty_key(doc) for doc in docs]}, {"_id": 0, "id": 1, "date": 1}
+    ).to_list(None)
+    return {d["date"]: d["id"] for d in stored}
+
+async def dedupe_schedule_duties_chunk(groups: List[dict], session) -> int:
+    """Merge each group of duplicates into its oldest row"""
+    keep_of = {}
+    for group in groups:
+        keeper, *duplicates = group["ids"]
+        for duplicate in duplicates:
+            keep_of[duplicate] = keeper
+    duplicate_ids = list(keep_of)
+    now = datetime.now(timezone.utc).isoformat()
+    moved = await db.assignments.find({"schedule_duty_id": {"$in": duplicate_ids}}, {"_id": 0}, session=session).to_list(None)
+    repointed = [
+        (before, {**before, "schedule_duty_id": keep_of[before["schedule_duty_id"]],
+                  "version": before.get("version", 0) + 1, "updated_at": now})
+        for before in moved
+    ]
+    if repointed:
+        await db.assignments.bulk_write([
+            UpdateOne({"id": after["id"]}, {"$set": {k: after[k] for k in ("schedule_duty_id", "version", "updated_at")}})
+            for _, after in repointed
+        ], ordered=False, session=session)
+    # Keep one group config per merged duty: the keeper's if it has one
+    configs = await db.duty_group_configs.find(
+        {"schedule_duty_id": {"$in": duplicate_ids + [g["ids"][0] for g in groups]}},
+        {"_id": 0}, session=session,
+    ).to_list(None)
+    configured = {c["schedule_duty_id"] for c in configs}
+    for config in configs:
+        keeper = keep_of.get(config["schedule_duty_id"])
+        if keeper is None:
+            continue
+        if keeper in configured:
+            await db.duty_group_configs.delete_one({"id": config["id"]}, session=session)
+            record_change("duty_group_config", config["id"], "delete", before=config)
+        else:
+            await db.duty_group_configs.update_one(
+                {"id": config["id"]}, {"$set": {"schedule_duty_id": keeper}, "$inc": {"version": 1}}, session=session
+            )
+            record_change("duty_group_config", config["id"], "update", before=config,
+                          after={**config, "schedule_duty_id": keeper, "version": config.get("version", 0) + 1})
+            configured.add(keeper)
+    for before, after in repointed:
+        record_change("assignment", after["id"], "update", before=before, after=after)
+    removed = await db.schedule_duties.find({"id": {"$in": duplicate_ids}}, {"_id": 0}, session=session).to_list(None)
+    await db.schedule_duties.delete_many({"id": {"$in": duplicate_ids}}, session=session)
+    if removed:
+        await db.tombstones.insert_many(tombstones_for("schedule_duty", removed), session=session)
+    for doc in removed:
+        record_change("schedule_duty", doc["id"], "delete", before=doc)
+    return len(removed)
+
+async def migrate_schedule_duty_key():
+    """One-off: merge duplicate occurrences, then enforce the natural key"""
+    async with distributed_lock("schedule_duty_key", ttl_seconds=600) as acquired:
+        if not acquired:
+            logger.info("Another worker is migrating schedule duty keys; skipping")
+            return
+        if not await db.migrations.find_one({"_id": "schedule_duty_key"}):
+            groups = await db.schedule_duties.aggregate([
+                {"$sort": {"created_at": 1}},
+                {"$group": {
+                    "_id": {"duty_id": "$duty_id", "date": "$date", "duty_type": {"$ifNull": ["$duty_type", "single"]}},
+                    "ids": {"$push": "$id"},
+                }},
+                {"$match": {"ids.1": {"$exists": True}}},
+            ], allowDiskUse=True).to_list(None)
+            removed = 0
+            for start in range(0, len(groups), CASCADE_BATCH_SIZE):
+                chunk = groups[start:start + CASCADE_BATCH_SIZE]
+                removed += await run_in_transaction(lambda session: dedupe_schedule_duties_chunk(chunk, session))
+            if removed:
+                logger.info(f"Merged {removed} duplicate schedule duties")
+                invalidate_calendar_summary()
+            await db.migrations.insert_one({"_id": "schedule_duty_key", "merged": removed, "at": datetime.now(timezone.utc)})
+        await db.schedule_duties.create_index(SCHEDULE_DUTY_KEY, unique=True)
+
+# --- Availability ---
+# Leave, courses and sick days are stored in `availability` as per-person
+# [start, end) periods. Each worker keeps every period in memory, merged and
+# sorted per person, so "is this person free at t / during this shift" is a
+# bisect instead of a query per person. A write marks that person stale on
+# every worker and the next lookup reloads only their periods.
+
+AVAILABILITY_REASONS = {"leave", "course", "sick", "other"}
+
+def parse_local_datetime(value: str) -> datetime:
+    """Parse "YYYY-MM-DDTHHMM" (or "YYYY-MM-DDTHH:MM") as a naive local time"""
+    try:
+        return datetime.strptime(value.replace(":", ""), "%Y-%m-%dT%H%M")
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid date-time {value!r}; expected YYYY-MM-DDTHHMM")
+
+def format_local_datetime(value: datetime) -> str:
+    return value.strftime("%Y-%m-%dT%H%M")
+
+class AvailabilityIndex:
+    """Unavailable intervals per person, overlaps merged, sorted by start.
+
+    Merged intervals are disjoint, so both starts and ends are sorted and a
+    single bisect answers each lookup.
+    """
+
+    def __init__(self, periods=()):
+        by_person: dict = {}
+        for p in periods:
+            by_person.setdefault(p["personnel_id"], []).append(p)
+        self.starts: Dict[str, List[datetime]] = {}
+        self.ends: Dict[str, List[datetime]] = {}
+        for pid, person_periods in by_person.items():
+            self.replace_person(pid, person_periods)
+
+    def replace_person(self, personnel_id: str, periods: List[dict]):
+        """Swap in one person's periods, leaving everyone else untouched"""
+        merged = []
+        for start, end in sorted((parse_local_datetime(p["start"]), parse_local_datetime(p["end"])) for p in periods):
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        if merged:
+            self.starts[personnel_id] = [start for start, _ in merged]
+            self.ends[personnel_id] = [end for _, end in merged]
+        else:
+            self.starts.pop(personnel_id, None)
+            self.ends.pop(personnel_id, None)
+
+    def unavailable_at(self, personnel_id: str, at: datetime) -> bool:
+        starts = self.starts.get(personnel_id)
+        if not starts:
+            return False
+        index = bisect.bisect_right(starts, at) - 1
+        return index >= 0 and self.ends[personnel_id][index] > at
+
+    def overlapping(self, personnel_id: str, start: datetime, end: datetime):
+        """The merged (start, end) interval overlapping [start, end), if any"""
+        ends = self.ends.get(personnel_id)
+        if not ends:
+            return None
+        index = bisect.bisect_right(ends, start)
+        if index < len(ends) and self.starts[personnel_id][index] < end:
+            return self.starts[personnel_id][index], ends[index]
+        return None
+
+    def unavailable_ids_at(self, at: datetime) -> set:
+        return {pid for pid in self.starts if self.unavailable_at(pid, at)}
+
+    def unavailable_ids_during(self, start: datetime, end: datetime) -> set:
+        return {pid for pid in self.starts if self.overlapping(pid, start, end)}
+
+availability_index: Optional[AvailabilityIndex] = None
+availability_generation = 0
+# People whose periods changed since the index was loaded
+stale_availability: set = set()
+
+AVAILABILITY_PROJECTION = {"_id": 0, "personnel_id": 1, "start": 1, "end": 1}
+
+def drop_availability_index(keys: List[str] = ()):
+    """Mark `keys` (personnel ids) stale, or drop the whole index if empty"""
+    global availability_index, availability_generation
+    if keys:
+        stale_availability.update(keys)
+    else:
+        availability_index = None
+    availability_generation += 1
+
+cache_bus.register("availability", drop_availability_index)
+
+def invalidate_availability(personnel_id: Optional[str] = None):
+    keys = [personnel_id] if personnel_id else []
+    drop_availability_index(keys)
+    cache_bus.publish("availability", keys)
+
+async def get_availability_index() -> AvailabilityIndex:
+    """The in-memory index, loaded from `availability` on first use and
+    refreshed per person after writes"""
+    global availability_index
+    generation = availability_generation
+    if availability_index is None:
+        periods = await db.availability.find({}, AVAILABILITY_PROJECTION).to_list(None)
+        index = AvailabilityIndex(periods)
+        # A write that landed during the load leaves the index dropped
+        if generation == availability_generation:
+            availability_index = index
+            stale_availability.clear()
+        return index
+    if stale_availability:
+        index = availability_index
+        stale = set(stale_availability)
+        periods = await db.availability.find({"personnel_id": {"$in": list(stale)}}, AVAILABILITY_PROJECTION).to_list(None)
+        by_person = {pid: [] for pid in stale}
+        for p in periods:
+            by_person[p["personnel_id"]].append(p)
+        for pid, person_periods in by_person.items():
+            index.replace_person(pid, person_periods)
+        # A write that landed during the reload keeps its person stale
+        if generation == availability_generation:
+            stale_availability.difference_update(stale)
+        return index
+    return availability_index
+
+def availability_filter(query: dict, available: Optional[bool], unavailable_ids: set) -> dict:
+    """Combine the stored `available` flag with periods covering the requested time"""
+    if available is True:
+        query["available"] = True
+        if unavailable_ids:
+            query["id"] = {"$nin": list(unavailable_ids)}
+    elif available is False:
+        query.setdefault("$and", []).append({"$or": [{"available": False}, {"id": {"$in": list(unavailable_ids)}}]})
+    return query
+
+def mark_unavailable(personnel: List[dict], unavailable_ids: set) -> List[dict]:
+    for person in personnel:
+        if person["id"] in unavailable_ids and "available" in person:
+            person["available"] = False
+    return personnel
+
+@api_router.get("/availability", response_model=List[AvailabilityPeriod])
+async def get_availability(personnel_id: Optional[str] = None, start_date: Optional[str] = None,
+                           end_date: Optional[str] = None):
+    """Availability periods, optionally for one person and/or overlapping a date range"""
+    query = {}
+    if personnel_id:
+        query["personnel_id"] = personnel_id
+    if start_date and end_date:
+        query["start"] = {"$lte": f"{end_date}T2359"}
+        query["end"] = {"$gt": f"{start_date}T0000"}
+    return await db.availability.find(query, {"_id": 0}).sort("start", 1).to_list(1000)
+
+@api_router.post("/availability", response_model=AvailabilityPeriod)
+async def create_availability(input: AvailabilityPeriodCreate):
+    if input.reason not in AVAILABILITY_REASONS:
+        raise HTTPException(status_code=400, detail=f"reason must be one of: {', '.join(sorted(AVAILABILITY_REASONS))}")
+    start, end = parse_local_datetime(input.start), parse_local_datetime(input.end)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    if not await db.personnel.find_one({"id": input.personnel_id}, {"_id": 0, "id": 1}):
+        raise HTTPException(status_code=404, detail="Personnel not found")
+    period = AvailabilityPeriod(**{**input.model_dump(), "start": format_local_datetime(start), "end": format_local_datetime(end)})
+    doc = period.model_dump()
+    await db.availability.insert_one(doc)
+    record_change("availability_period", period.id, "create", after=doc)
+    invalidate_availability(period.personnel_id)
+    return period
+
+@api_router.delete("/availability/{period_id}")
+async def delete_availability(period_id: str):
+    period = await db.availability.find_one_and_delete({"id": period_id}, {"_id": 0})
+    if not period:
+        raise HTTPException(status_code=404, detail="Availability period not found")
+    record_change("availability_period", period_id, "delete", before=period)
+    invalidate_availability(period["personnel_id"])
     return {"deleted": True}
 
-# --- Personnel Routes ---
+# --- Candidate Ranking ---
+# Orders personnel for an assignment slot: qualification match first, then
+# free of overlapping assignments, availability and light recent workload.
 
-@api_router.get("/personnel", response_model=List[Personnel])
-async def get_personnel(search: Optional[str] = None, available: Optional[bool] = None):
+CANDIDATE_WEIGHTS = {"qualifications": 0.4, "overlap_free": 0.3, "available": 0.2, "workload": 0.1}
+CANDIDATE_WORKLOAD_DAYS = int(os.environ.get('CANDIDATE_WORKLOAD_DAYS', '14'))
+
+def personnel_search_query(search: Optional[str], available: Optional[bool]) -> dict:
     query = {}
     if search:
         query["$or"] = [
@@ -234,23 +1390,129 @@ async def get_personnel(search: Optional[str] = None, available: Optional[bool]
         ]
     if available is not None:
         query["available"] = available
-    personnel = await db.personnel.find(query, {"_id": 0}).to_list(100)
-    return personnel
+    return query
+
+def rank_candidates(personnel, required_qualifications: List[str], busy_ids: set, recent_counts: dict) -> List[dict]:
+    """Score and sort personnel dicts for a slot, best first"""
+    required = set(required_qualifications)
+    busiest = max(recent_counts.values(), default=0)
+    ranked = []
+    for person in personnel:
+        missing = sorted(required - set(person.get("qualifications", [])))
+        qualification_match = 1.0 - len(missing) / len(required) if required else 1.0
+        overlap_free = person["id"] not in busy_ids
+        recent = recent_counts.get(person["id"], 0)
+        workload = 1.0 - recent / busiest if busiest else 1.0
+        score = (
+            CANDIDATE_WEIGHTS["qualifications"] * qualification_match
+            + CANDIDATE_WEIGHTS["overlap_free"] * overlap_free
+            + CANDIDATE_WEIGHTS["available"] * bool(person.get("available", True))
+            + CANDIDATE_WEIGHTS["workload"] * workload
+        )
+        ranked.append({
+            **person,
+            "score": round(score, 4),
+            "qualification_match": round(qualification_match, 4),
+            "missing_qualifications": missing,
+            "overlap_free": overlap_free,
+            "recent_assignments": recent,
+        })
+    ranked.sort(key=lambda c: (-c["score"], c.get("callsign", "")))
+    return ranked
+
+@api_router.get("/schedule-duties/{duty_id}/candidates", response_class=APIResponse)
+async def get_candidates(duty_id: str,
+                         start_time: str = Query(pattern=HHMM_PATTERN), end_time: str = Query(pattern=HHMM_PATTERN),
+                         search: Optional[str] = None, available: Optional[bool] = None):
+    """Personnel ranked for one slot of a scheduled duty"""
+    duty = await db.schedule_duties.find_one({"id": duty_id}, {"_id": 0, "date": 1, "qualifications": 1})
+    if not duty:
+        raise HTTPException(status_code=404, detail="Schedule duty not found")
+    date = duty["date"]
+    window_start = (datetime.strptime(date, "%Y-%m-%d") - timedelta(days=CANDIDATE_WORKLOAD_DAYS)).strftime("%Y-%m-%d")
+    slot = make_shift(date, start_time, end_time)
+    away = (await get_availability_index()).unavailable_ids_during(slot.start, slot.end)
+    # Overnight shifts reach into the next day, so neighbouring dates can clash too
+    nearby_start, nearby_end = shift_window([date], 1)
+    rdb = reader("candidates")
+    personnel, nearby, recent = await asyncio.gather(
+        rdb.personnel.find(availability_filter(personnel_search_query(search, None), available, away),
+                           PERSONNEL_PROJECTION).to_list(None),
+        db.assignments.find({"date": {"$gte": nearby_start, "$lte": nearby_end}}, SHIFT_PROJECTION).to_list(None),
+        rdb.assignments.aggregate([
+            {"$match": {"date": {"$gte": window_start, "$lte": date}}},
+            {"$group": {"_id": "$personnel_id", "count": {"$sum": 1}}},
+        ]).to_list(None),
+    )
+    shifts_by_person: dict = {}
+    for a in nearby:
+        shifts_by_person.setdefault(a["personnel_id"], []).append(assignment_shift(a))
+    busy = {pid for pid, shifts in shifts_by_person.items() if PersonTimeline(shifts).overlapping(slot)}
+    ranked = rank_candidates(
+        mark_unavailable(personnel, away),
+        duty.get("qualifications", []),
+        busy,
+        {row["_id"]: row["count"] for row in recent},
+    )
+    return APIResponse(ranked)
+
+# --- Personnel Routes ---
+
+@api_router.get("/personnel", response_model=List[Personnel], response_class=APIResponse)
+async def get_personnel(search: Optional[str] = None, available: Optional[bool] = None,
+                        available_at: Optional[str] = None,
+                        fields: Optional[str] = None, view: Optional[str] = None):
+    """Personnel, optionally filtered by availability. With `available_at`
+    (YYYY-MM-DDTHHMM) availability also accounts for leave, courses and sick
+    days covering that moment."""
+    projection = resolve_projection(Personnel, PERSONNEL_PROJECTION, PERSONNEL_SUMMARY_FIELDS, fields, view)
+    if available_at is None:
+        query = personnel_search_query(search, available)
+        personnel = await reader("personnel").personnel.find(query, projection).to_list(100)
+        return APIResponse(personnel)
+    at = parse_local_datetime(available_at)
+    away = (await get_availability_index()).unavailable_ids_at(at)
+    query = availability_filter(personnel_search_query(search, None), available, away)
+    personnel = await reader("personnel").personnel.find(query, projection).to_list(100)
+    return APIResponse(mark_unavailable(personnel, away))
+
+@api_router.post("/personnel", response_model=Personnel)
+async def create_personnel(input: PersonnelCreate):
+    person = Personnel(**input.model_dump())
+    doc = person.model_dump()
+    await db.personnel.insert_one(doc)
+    record_change("personnel", person.id, "create", after=doc)
+    return person
+
+@api_router.delete("/personnel/{personnel_id}")
+async def delete_personnel(personnel_id: str):
+    """Remove someone with no assignments left"""
+    if await db.assignments.find_one({"personnel_id": personnel_id}, {"_id": 1}):
+        raise HTTPException(status_code=409, detail="Personnel still have assignments; remove them first")
+    doc = await db.personnel.find_one_and_delete({"id": personnel_id}, {"_id": 0})
+    if not doc:
+        raise HTTPException(status_code=404, detail="Personnel not found")
+    record_change("personnel", personnel_id, "delete", before=doc)
+    return {"message": "Personnel deleted"}
 
 # --- Assignment Routes ---
 
-@api_router.get("/assignments", response_model=List[Assignment])
-async def get_assignments(date: Optional[str] = None, start_date: Optional[str] = None, end_date: Optional[str] = None):
+@api_router.get("/assignments", response_model=List[Assignment], response_class=APIResponse)
+async def get_assignments(date: Optional[str] = None, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                          fields: Optional[str] = None, view: Optional[str] = None):
+    projection = resolve_projection(Assignment, ASSIGNMENT_PROJECTION, ASSIGNMENT_SUMMARY_FIELDS, fields, view)
     query = {}
     if date:
         query["date"] = date
     elif start_date and end_date:
         query["date"] = {"$gte": start_date, "$lte": end_date}
-    assignments = await db.assignments.find(query, {"_id": 0}).to_list(500)
-    return assignments
+    assignments = await reader("assignments").assignments.find(query, projection).to_list(500)
+    return APIResponse(assignments)
 
 @api_router.post("/assignments", response_model=Assignment)
 async def create_assignment(input: AssignmentCreate):
+    await enforce_constraints([input.model_dump()])
+    await enforce_availability([input.model_dump()])
     assignment = Assignment(**input.model_dump())
     doc = assignment.model_dump()
     await db.assignments.insert_one(doc)
@@ -258,33 +1520,40 @@ async def create_assignment(input: AssignmentCreate):
         {"id": input.personnel_id},
         {"$inc": {"total_duties": 1}}
     )
+    record_change("assignment", assignment.id, "create", after=doc)
+    invalidate_calendar_summary(assignment.date)
     return assignment
 
 @api_router.put("/assignments/{assignment_id}", response_model=Assignment)
 async def update_assignment(assignment_id: str, input: AssignmentUpdate):
-    old = await db.assignments.find_one({"id": assignment_id}, {"_id": 0})
-    if not old:
-        raise HTTPException(status_code=404, detail="Assignment not found")
-    # Decrement old personnel
-    await db.personnel.update_one(
-        {"id": old["personnel_id"]},
-        {"$inc": {"total_duties": -1}}
-    )
-    # Update assignment
-    await db.assignments.update_one(
-        {"id": assignment_id},
-        {"$set": {
-            "personnel_id": input.personnel_id,
-            "personnel_name": input.personnel_name,
-            "personnel_callsign": input.personnel_callsign,
-        }}
-    )
-    # Increment new personnel
-    await db.personnel.update_one(
-        {"id": input.personnel_id},
-        {"$inc": {"total_duties": 1}}
+    changes = {
+        "personnel_id": input.personnel_id,
+        "personnel_name": input.personnel_name,
+        "personnel_callsign": input.personnel_callsign,
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+    }
+    current = await db.assignments.find_one({"id": assignment_id}, SHIFT_PROJECTION)
+    if current and current["personnel_id"] != input.personnel_id:
+        candidate = {**current, "personnel_id": input.personnel_id}
+        await enforce_constraints([candidate])
+        await enforce_availability([candidate])
+    # The pre-image tells us whose counter to move, so concurrent
+    # reassignments can never decrement the same person twice
+    old = await db.assignments.find_one_and_update(
+        {"id": assignment_id, **version_filter(input.expected_version)},
+        {"$set": changes, "$inc": {"version": 1}},
+        ASSIGNMENT_PROJECTION,
+        return_document=ReturnDocument.BEFORE,
     )
-    updated = await db.assignments.find_one({"id": assignment_id}, {"_id": 0})
+    if not old:
+        await raise_not_found_or_conflict(db.assignments, {"id": assignment_id}, "Assignment")
+    if old["personnel_id"] != input.personnel_id:
+        await db.personnel.bulk_write([
+            UpdateOne({"id": old["personnel_id"]}, {"$inc": {"total_duties": -1}}),
+            UpdateOne({"id": input.personnel_id}, {"$inc": {"total_duties": 1}}),
+        ], ordered=False)
+    updated = {**old, **changes, "version": old.get("version", 0) + 1}
+    record_change("assignment", assignment_id, "update", before=old, after=updated)
     return updated
 
 @api_router.delete("/assignments/{assignment_id}")
@@ -293,10 +1562,13 @@ async def delete_assignment(assignment_id: str):
     if not assignment:
         raise HTTPException(status_code=404, detail="Assignment not found")
     await db.assignments.delete_one({"id": assignment_id})
+    await db.tombstones.insert_many(tombstones_for("assignment", [assignment]))
     await db.personnel.update_one(
         {"id": assignment["personnel_id"]},
         {"$inc": {"total_duties": -1}}
     )
+    record_change("assignment", assignment_id, "delete", before=assignment)
+    invalidate_calendar_summary(assignment["date"])
     return {"deleted": True}
 
 # --- Duty Group Config Routes ---
@@ -310,24 +1582,44 @@ async def get_duty_group_config(schedule_duty_id: str):
 
 @api_router.post("/duty-group-configs", response_model=DutyGroupConfig)
 async def save_duty_group_config(input: DutyGroupConfigCreate):
-    # Upsert: replace existing config for this schedule duty
-    existing = await db.duty_group_configs.find_one(
-        {"schedule_duty_id": input.schedule_duty_id}, {"_id": 0}
-    )
-    if existing:
-        await db.duty_group_configs.update_one(
-            {"schedule_duty_id": input.schedule_duty_id},
-            {"$set": {"duties": [d.model_dump() for d in input.duties]}}
+    # Upsert: replace existing config for this schedule duty. Without an
+    # expected_version (or with 0, "not created yet") a missing config is
+    # inserted; the unique schedule_duty_id index turns races into 409s.
+    new_config = DutyGroupConfig(schedule_duty_id=input.schedule_duty_id)
+    query = {"schedule_duty_id": input.schedule_duty_id, **version_filter(input.expected_version)}
+    duties = [d.model_dump() for d in input.duties]
+    upsert = not input.expected_version
+    try:
+        # The pre-image feeds the change log; no pre-image after an upsert
+        # means the config was just inserted
+        before = await db.duty_group_configs.find_one_and_update(
+            query,
+            {
+                "$set": {"duties": duties},
+                "$inc": {"version": 1},
+                "$setOnInsert": {"id": new_config.id, "created_at": new_config.created_at},
+            },
+            {"_id": 0},
+            upsert=upsert,
+            return_document=ReturnDocument.BEFORE,
         )
-        updated = await db.duty_group_configs.find_one(
-            {"schedule_duty_id": input.schedule_duty_id}, {"_id": 0}
-        )
-        return updated
+    except DuplicateKeyError:
+        before, upsert = None, False
+    if before:
+        config = {**before, "duties": duties, "version": before.get("version", 0) + 1}
+        record_change("duty_group_config", config["id"], "update", before=before, after=config)
+    elif upsert:
+        config = {**new_config.model_dump(), "duties": duties, "version": 1}
+        record_change("duty_group_config", config["id"], "create", after=config)
     else:
-        config = DutyGroupConfig(**input.model_dump())
-        doc = config.model_dump()
-        await db.duty_group_configs.insert_one(doc)
-        return config
+        await raise_not_found_or_conflict(
+            db.duty_group_configs, {"schedule_duty_id": input.schedule_duty_id}, "Duty group config"
+        )
+    # Required slot counts feed the month summary of the duty's day
+    duty = await db.schedule_duties.find_one({"id": input.schedule_duty_id}, {"_id": 0, "date": 1})
+    if duty:
+        invalidate_calendar_summary(duty["date"])
+    return config
 
 # --- Recurring Assignment Route ---
 
@@ -381,41 +1673,40 @@ def calculate_recurrence_dates(start_date: str, recurrence: RecurrencePattern) -
     
     return dates
 
-@api_router.post("/recurring-assignments")
-async def create_recurring_assignments(input: RecurringAssignmentCreate):
-    """Create multiple assignments based on recurrence pattern"""
+RECURRENCE_INSERT_CHUNK = int(os.environ.get('RECURRENCE_INSERT_CHUNK', '1000'))
+
+async def apply_recurring_assignments(input: RecurringAssignmentCreate, progress=None) -> dict:
+    """Expand a recurrence into schedule duties and assignments.
+
+    Shared by the synchronous route and the background job; `progress`,
+    when given, is awaited with (done, total) after each inserted chunk.
+    """
     dates = calculate_recurrence_dates(input.start_date, input.recurrence)
-    created_assignments = []
-    
-    for date in dates:
-        # Check for existing schedule duty on this date, create if needed
-        existing_duty = await db.schedule_duties.find_one({
-            "duty_id": input.duty_code,
-            "date": date
-        }, {"_id": 0})
-        
-        schedule_duty_id = input.schedule_duty_id
-        if not existing_duty and date != input.start_date:
-            # Find original duty to copy
-            original_duty = await db.schedule_duties.find_one({
-                "id": input.schedule_duty_id
-            }, {"_id": 0})
-            if original_duty:
-                new_duty = ScheduleDuty(
-                    duty_id=original_duty["duty_id"],
-                    duty_name=original_duty["duty_name"],
-                    duty_code=original_duty["duty_code"],
-                    duty_type=original_duty.get("duty_type", "single"),
-                    qualifications=original_duty.get("qualifications", []),
-                    date=date
-                )
-                doc = new_duty.model_dump()
-                await db.schedule_duties.insert_one(doc)
-                schedule_duty_id = new_duty.id
-        
-        # Create assignment
-        assignment = Assignment(
-            schedule_duty_id=schedule_duty_id,
+    # Validate the whole series before writing any of it
+    await enforce_constraints([
+        {"personnel_id": input.personnel_id, "schedule_duty_id": input.schedule_duty_id,
+         "date": date, "start_time": input.start_time, "end_time": input.end_time}
+        for date in dates
+    ])
+    # Every occurrence of the duty comes from one bulk upsert on the natural
+    # key, so re-running a recurrence reuses the rows it created last time
+    original_duty = await db.schedule_duties.find_one({"id": input.schedule_duty_id}, {"_id": 0})
+    duty_ids = {}
+    if original_duty:
+        duty_ids = await upsert_schedule_duties([
+            ScheduleDuty(
+                duty_id=original_duty["duty_id"],
+                duty_name=original_duty["duty_name"],
+                duty_code=original_duty["duty_code"],
+                duty_type=original_duty.get("duty_type", "single"),
+                qualifications=original_duty.get("qualifications", []),
+                date=date
+            )
+            for date in dates
+        ])
+    assignments = [
+        Assignment(
+            schedule_duty_id=duty_ids.get(date, input.schedule_duty_id),
             duty_code=input.duty_code,
             duty_name=input.duty_name,
             personnel_id=input.personnel_id,
@@ -426,34 +1717,2664 @@ async def create_recurring_assignments(input: RecurringAssignmentCreate):
             end_time=input.end_time,
             sub_duty_name=input.sub_duty_name,
             slot_index=input.slot_index
-        )
-        doc = assignment.model_dump()
-        await db.assignments.insert_one(doc)
-        created_assignments.append(assignment)
-    
-    # Update personnel total duties
-    await db.personnel.update_one(
-        {"id": input.personnel_id},
-        {"$inc": {"total_duties": len(created_assignments)}}
-    )
-    
+        ).model_dump()
+        for date in dates
+    ]
+    created = 0
+    for start in range(0, len(assignments), RECURRENCE_INSERT_CHUNK):
+        docs = assignments[start:start + RECURRENCE_INSERT_CHUNK]
+        await make_room_for_changes(len(docs))
+        # Stamped per chunk so /sync tokens issued mid-run don't skip later chunks
+        stamp = datetime.now(timezone.utc).isoformat()
+        for doc in docs:
+            doc["created_at"] = doc["updated_at"] = stamp
+        # The person's total_duties moves with each chunk, so a job stopped
+        # part-way leaves the counter matching what was written
+        await run_in_transaction(lambda session: insert_assignment_chunk(docs, session))
+        for doc in docs:
+            record_change("assignment", doc["id"], "create", after=doc)
+        invalidate_calendar_summary(*{doc["date"] for doc in docs})
+        created += len(docs)
+        if progress:
+            await progress(created, len(assignments))
+
     return {
-        "created_count": len(created_assignments),
+        "created_count": created,
         "dates": dates,
-        "assignments": [a.model_dump() for a in created_assignments]
+        "assignments": [{k: v for k, v in doc.items() if k != "_id"} for doc in assignments],
     }
 
-# --- App Setup ---
+async def insert_assignment_chunk(docs: List[dict], session):
+    """Insert one chunk of assignments and count them against their people"""
+    await db.assignments.insert_many(docs, ordered=False, session=session)
+    increments = Counter(doc["personnel_id"] for doc in docs)
+    await db.personnel.bulk_write([
+        UpdateOne({"id": personnel_id}, {"$inc": {"total_duties": count}}) for personnel_id, count in increments.items()
+    ], ordered=False, session=session)
 
-app.include_router(api_router)
+@api_router.post("/recurring-assignments")
+async def create_recurring_assignments(input: RecurringAssignmentCreate):
+    """Create multiple assignments based on recurrence pattern"""
+    return await apply_recurring_assignments(input)
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# --- Rotations ---
+# Fixed on/off cycles (4-on/4-off, 2-2-3 Panama, ...) for a whole team. The
+# team x day on/off matrix is expanded in one numpy operation and each chunk
+# of assignments is written with one insert_many plus one grouped counter
+# bulk_write, so a year for a few hundred people takes seconds. A rotation
+# stopped part-way (job cancelled or failed) leaves whole chunks with their
+# counters and summaries consistent.
+
+ROTATION_PATTERNS = {
+    "4on4off": [1, 1, 1, 1, 0, 0, 0, 0],
+    "panama": [1, 1, 0, 0, 1, 1, 1, 0, 0, 1, 1, 0, 0, 0],  # 2-2-3
+    "5on2off": [1, 1, 1, 1, 1, 0, 0],
+}
+ROTATION_MAX_DAYS = int(os.environ.get('ROTATION_MAX_DAYS', '732'))
+ROTATION_INSERT_CHUNK = int(os.environ.get('ROTATION_INSERT_CHUNK', '1000'))
+
+def rotation_cycle(input: RotationCreate) -> np.ndarray:
+    if input.pattern:
+        if input.pattern not in ROTATION_PATTERNS:
+            raise HTTPException(status_code=400, detail=f"pattern must be one of: {', '.join(sorted(ROTATION_PATTERNS))}")
+        cycle = ROTATION_PATTERNS[input.pattern]
+    else:
+        cycle = input.cycle
+    if not cycle or any(day not in (0, 1) for day in cycle) or not any(cycle):
+        raise HTTPException(status_code=400, detail="cycle must be a non-empty list of 0/1 days with at least one 1")
+    return np.array(cycle, dtype=bool)
+
+def expand_rotation(cycle: np.ndarray, offsets: List[int], days: int):
+    """(member index, day index) of every working day, in date order"""
+    day_numbers = np.arange(days)
+    on = cycle[(day_numbers[np.newaxis, :] + np.array(offsets)[:, np.newaxis]) % len(cycle)]
+    # Transposing first puts the nonzero entries in day-major order
+    day_index, member_index = np.nonzero(on.T)
+    return member_index, day_index
+
+async def apply_rotation(input: RotationCreate, progress=None) -> dict:
+    """Expand a rotation into schedule duties and assignments.
+
+    Shared by the synchronous route and the background job; `progress`,
+    when given, is awaited with (done, total) after each inserted chunk.
+    """
+    cycle = rotation_cycle(input)
+    try:
+        first = datetime.strptime(input.start_date, "%Y-%m-%d")
+        days = (datetime.strptime(input.end_date, "%Y-%m-%d") - first).days + 1
+    except ValueError:
+        raise HTTPException(status_code=400, detail="start_date and end_date must be YYYY-MM-DD")
+    if not 0 < days <= ROTATION_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"end_date must be on or after start_date and within {ROTATION_MAX_DAYS} days")
+    member_ids = [m.personnel_id for m in input.members]
+    if not member_ids or len(set(member_ids)) != len(member_ids):
+        raise HTTPException(status_code=400, detail="members must be a non-empty list of distinct personnel")
+
+    original_duty = await db.schedule_duties.find_one({"id": input.schedule_duty_id}, {"_id": 0})
+    if not original_duty:
+        raise HTTPException(status_code=404, detail="Schedule duty not found")
+    people = await db.personnel.find({"id": {"$in": member_ids}}, {"_id": 0, "id": 1, "name": 1, "callsign": 1}).to_list(None)
+    by_id = {p["id"]: p for p in people}
+    missing = [pid for pid in member_ids if pid not in by_id]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Personnel not found: {', '.join(missing)}")
+
+    member_index, day_index = expand_rotation(cycle, [m.offset for m in input.members], days)
+    dates = [(first + timedelta(days=d)).strftime("%Y-%m-%d") for d in range(days)]
+    members = [by_id[pid] for pid in member_ids]
+    rows = [(members[m], dates[d]) for m, d in zip(member_index.tolist(), day_index.tolist())]
+
+    # Validate the whole rotation before writing any of it
+    await enforce_constraints([
+        {"personnel_id": person["id"], "schedule_duty_id": input.schedule_duty_id,
+         "date": date, "start_time": input.start_time, "end_time": input.end_time}
+        for person, date in rows
+    ])
+    working_dates = [dates[d] for d in np.unique(day_index).tolist()]
+    duty_ids = await upsert_schedule_duties([
+        ScheduleDuty(
+            duty_id=original_duty["duty_id"],
+            duty_name=original_duty["duty_name"],
+            duty_code=original_duty["duty_code"],
+            duty_type=original_duty.get("duty_type", "single"),
+            qualifications=original_duty.get("qualifications", []),
+            date=date,
+        )
+        for date in working_dates
+    ])
+
+    # One validated template; each row only differs in id, person, duty and date
+    template = Assignment(
+        schedule_duty_id=input.schedule_duty_id,
+        duty_code=original_duty["duty_code"],
+        duty_name=original_duty["duty_name"],
+        personnel_id="", personnel_name="", personnel_callsign="",
+        date=input.start_date,
+        start_time=input.start_time,
+        end_time=input.end_time,
+        sub_duty_name=input.sub_duty_name,
+        slot_index=input.slot_index,
+    ).model_dump()
+    created = 0
+    for start in range(0, len(rows), ROTATION_INSERT_CHUNK):
+        docs = [
+            {**template, "id": str(uuid.uuid4()), "schedule_duty_id": duty_ids.get(date, input.schedule_duty_id),
+             "personnel_id": person["id"], "personnel_name": person["name"],
+             "personnel_callsign": person["callsign"], "date": date}
+            for person, date in rows[start:start + ROTATION_INSERT_CHUNK]
+        ]
+        # Don't outrun the change log and day bucket writers on rotations of many chunks
+        await make_room_for_changes(len(docs))
+        # Stamped per chunk: a /sync token issued while earlier chunks were
+        # written must not be newer than the rows of later ones
+        stamp = datetime.now(timezone.utc).isoformat()
+        for doc in docs:
+            doc["created_at"] = doc["updated_at"] = stamp
+        await run_in_transaction(lambda session: insert_assignment_chunk(docs, session))
+        for doc in docs:
+            record_change("assignment", doc["id"], "create", after=doc)
+        invalidate_calendar_summary(*{doc["date"] for doc in docs})
+        created += len(docs)
+        if progress:
+            await progress(created, len(rows))
+
+    counts = np.bincount(member_index, minlength=len(members)).tolist()
+    return {
+        "created_count": created,
+        "start_date": input.start_date,
+        "end_date": input.end_date,
+        "schedule_duty_ids": duty_ids,
+        "per_person": {person["id"]: count for person, count in zip(members, counts)},
+    }
+
+@api_router.post("/rotations", response_class=APIResponse)
+async def create_rotation(input: RotationCreate):
+    """Generate a team's assignments from an on/off cycle over a date range"""
+    return APIResponse(await apply_rotation(input))
+
+# --- Constraint Rules ---
+# Declarative scheduling rules stored in `constraint_rules`. Enabled rules
+# are compiled once into check functions (recompiled when rules change) and
+# evaluated against a per-person timeline of shifts sorted by start time, so
+# each check is a bisect plus a short local scan.
+
+RULE_TYPES = {"min_rest_hours", "max_consecutive_days", "max_weekly_hours", "qualification_required", "no_overlap",
+              "availability"}
+MAX_SHIFT_LENGTH = timedelta(hours=24)
+
+class Shift(NamedTuple):
+    start: datetime
+    end: datetime
+    id: Optional[str]
+    date: str
+
+def parse_date(value: str, field: str = "date") -> datetime:
+    """Parse a YYYY-MM-DD request value, answering 400 rather than a 500 from strptime"""
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail=f"{field} must be YYYY-MM-DD")
+
+def make_shift(date: str, start_time: str, end_time: str, assignment_id: Optional[str] = None) -> Shift:
+    day = datetime.strptime(date, "%Y-%m-%d")
+    start = day + timedelta(minutes=hhmm_to_minutes(start_time))
+    end = day + timedelta(minutes=hhmm_to_minutes(end_time))
+    if end <= start:
+        end += timedelta(days=1)  # overnight shift
+    return Shift(start, end, assignment_id, date)
+
+class PersonTimeline:
+    """One person's shifts sorted by start, with a per-date count"""
+
+    def __init__(self, shifts=()):
+        self.shifts = sorted(shifts)
+        self.starts = [s.start for s in self.shifts]
+        self.dates = Counter(s.date for s in self.shifts)
+
+    def add(self, shift: Shift):
+        index = bisect.bisect_right(self.starts, shift.start)
+        self.starts.insert(index, shift.start)
+        self.shifts.insert(index, shift)
+        self.dates[shift.date] += 1
+
+    def previous(self, shift: Shift) -> Optional[Shift]:
+        index = bisect.bisect_right(self.starts, shift.start)
+        for other in reversed(self.shifts[max(0, index - 2):index]):
+            if other.id is None or other.id != shift.id:
+                return other
+        return None
+
+    def following(self, shift: Shift) -> Optional[Shift]:
+        index = bisect.bisect_right(self.starts, shift.start)
+        for other in self.shifts[index:index + 2]:
+            if other.id is None or other.id != shift.id:
+                return other
+        return None
+
+    def overlapping(self, shift: Shift) -> List[Shift]:
+        index = bisect.bisect_left(self.starts, shift.end)
+        found = []
+        for other in reversed(self.shifts[:index]):
+            if other.start < shift.start - MAX_SHIFT_LENGTH:
+                break
+            if other.end > shift.start and (other.id is None or other.id != shift.id):
+                found.append(other)
+        return found
+
+    def between(self, lo: datetime, hi: datetime) -> List[Shift]:
+        return self.shifts[bisect.bisect_left(self.starts, lo):bisect.bisect_left(self.starts, hi)]
+
+def shift_hours(shift: Shift) -> float:
+    return (shift.end - shift.start).total_seconds() / 3600
+
+def compile_rule(rule: dict):
+    """Turn a rule document into `check(timeline, shift, context) -> Optional[str]`"""
+    kind, value = rule["type"], rule.get("value", 0)
+
+    if kind == "min_rest_hours":
+        minimum = timedelta(hours=value)
+
+        def check(timeline, shift, context):
+            before, after = timeline.previous(shift), timeline.following(shift)
+            if before and shift.start - before.end < minimum:
+                return f"Only {(shift.start - before.end).total_seconds() / 3600:g}h rest after the previous shift (minimum {value:g}h)"
+            if after and after.start - shift.end < minimum:
+                return f"Only {(after.start - shift.end).total_seconds() / 3600:g}h rest before the next shift (minimum {value:g}h)"
+            return None
+
+    elif kind == "max_consecutive_days":
+        limit = int(value)
+
+        def check(timeline, shift, context):
+            day = datetime.strptime(shift.date, "%Y-%m-%d")
+            run = 1
+            for step in (-1, 1):
+                offset = step
+                while run <= limit and timeline.dates[(day + timedelta(days=offset)).strftime("%Y-%m-%d")]:
+                    run += 1
+                    offset += step
+            if run > limit:
+                return f"More than {limit} consecutive days on duty"
+            return None
+
+    elif kind == "max_weekly_hours":
+        def check(timeline, shift, context):
+            week_start = datetime.strptime(shift.date, "%Y-%m-%d")
+            week_start -= timedelta(days=week_start.weekday())
+            others = timeline.between(week_start, week_start + timedelta(days=7))
+            hours = shift_hours(shift) + sum(shift_hours(s) for s in others if s.id is None or s.id != shift.id)
+            if hours > value:
+                return f"{hours:g}h scheduled in the week of {week_start:%Y-%m-%d} (maximum {value:g}h)"
+            return None
+
+    elif kind == "qualification_required":
+        def check(timeline, shift, context):
+            missing = sorted(set(context["duty_qualifications"]) - set(context["personnel_qualifications"]))
+            if missing:
+                return f"Missing qualifications: {', '.join(missing)}"
+            return None
+
+    elif kind == "no_overlap":
+        def check(timeline, shift, context):
+            clashes = timeline.overlapping(shift)
+            if clashes:
+                return f"Overlaps {len(clashes)} other assignment(s) on {shift.date}"
+            return None
+
+    elif kind == "availability":
+        def check(timeline, shift, context):
+            period = context["availability"].overlapping(context["personnel_id"], shift.start, shift.end)
+            if period:
+                return f"Unavailable from {format_local_datetime(period[0])} to {format_local_datetime(period[1])}"
+            return None
+
+    else:
+        raise ValueError(f"Unknown rule type: {kind}")
+    return check
+
+compiled_rules: Optional[list] = None
+
+def drop_compiled_rules(keys: List[str] = ()):
+    global compiled_rules
+    compiled_rules = None
+
+cache_bus.register("constraint_rules", drop_compiled_rules)
+
+async def get_compiled_rules() -> list:
+    """Enabled rules as (rule, check) pairs, compiled on first use"""
+    global compiled_rules
+    if compiled_rules is None:
+        rules = await db.constraint_rules.find({"enabled": True}, {"_id": 0}).to_list(None)
+        compiled_rules = [(rule, compile_rule(rule)) for rule in rules]
+    return compiled_rules
+
+def timeline_margin_days(rules: list) -> int:
+    """How far around the checked dates a timeline must reach"""
+    margin = 7  # a full week either side covers weekly hours and rest
+    for rule, _ in rules:
+        if rule["type"] == "max_consecutive_days":
+            margin = max(margin, int(rule.get("value", 0)) + 1)
+    return margin
+
+def shift_window(dates, margin_days: int):
+    lo = datetime.strptime(min(dates), "%Y-%m-%d") - timedelta(days=margin_days)
+    hi = datetime.strptime(max(dates), "%Y-%m-%d") + timedelta(days=margin_days)
+    return lo.strftime("%Y-%m-%d"), hi.strftime("%Y-%m-%d")
+
+def assignment_shift(a: dict) -> Shift:
+    return make_shift(a["date"], a["start_time"], a["end_time"], a.get("id"))
+
+SHIFT_PROJECTION = {"_id": 0, "id": 1, "personnel_id": 1, "schedule_duty_id": 1, "date": 1, "start_time": 1, "end_time": 1}
+
+async def qualification_context(rules: list, personnel_ids, schedule_duty_ids):
+    """Qualification lookups, only fetched when a qualification rule is active"""
+    if not any(rule["type"] == "qualification_required" for rule, _ in rules):
+        return {}, {}
+    personnel = await db.personnel.find({"id": {"$in": list(personnel_ids)}}, {"_id": 0, "id": 1, "qualifications": 1}).to_list(None)
+    duties = await db.schedule_duties.find({"id": {"$in": list(schedule_duty_ids)}}, {"_id": 0, "id": 1, "qualifications": 1}).to_list(None)
+    return (
+        {p["id"]: p.get("qualifications", []) for p in personnel},
+        {d["id"]: d.get("qualifications", []) for d in duties},
+    )
+
+async def availability_context(rules: list) -> Optional[AvailabilityIndex]:
+    """The availability index, only loaded when an availability rule is active"""
+    if not any(rule["type"] == "availability" for rule, _ in rules):
+        return None
+    return await get_availability_index()
+
+def evaluate_shift(rules: list, timeline: PersonTimeline, candidate: dict, person_quals: dict, duty_quals: dict,
+                   availability: Optional[AvailabilityIndex] = None) -> List[dict]:
+    shift = assignment_shift(candidate)
+    context = {
+        "personnel_id": candidate["personnel_id"],
+        "personnel_qualifications": person_quals.get(candidate["personnel_id"], []),
+        "duty_qualifications": duty_quals.get(candidate.get("schedule_duty_id"), []),
+        "availability": availability,
+    }
+    violations = []
+    for rule, check in rules:
+        message = check(timeline, shift, context)
+        if message:
+            violations.append({
+                "rule_id": rule["id"],
+                "type": rule["type"],
+                "severity": rule.get("severity", "error"),
+                "personnel_id": candidate["personnel_id"],
+                "assignment_id": candidate.get("id"),
+                "date": candidate["date"],
+                "message": message,
+            })
+    return violations
+
+async def check_candidates(rules: list, candidates: List[dict]) -> List[dict]:
+    """Evaluate new or changed assignments in order; each one joins its
+    person's timeline so a batch is checked against itself too. Candidates
+    with an id replace that assignment's stored position."""
+    dates = [c["date"] for c in candidates]
+    lo, hi = shift_window(dates, timeline_margin_days(rules))
+    personnel_ids = {c["personnel_id"] for c in candidates}
+    existing = await db.assignments.find(
+        {"personnel_id": {"$in": list(personnel_ids)}, "date": {"$gte": lo, "$lte": hi}}, SHIFT_PROJECTION
+    ).to_list(None)
+    timelines = {pid: PersonTimeline() for pid in personnel_ids}
+    replaced = {c["id"] for c in candidates if c.get("id")}
+    for a in existing:
+        if a["id"] not in replaced:
+            timelines[a["personnel_id"]].add(assignment_shift(a))
+    person_quals, duty_quals = await qualification_context(
+        rules, personnel_ids, {c.get("schedule_duty_id") for c in candidates}
+    )
+    availability = await availability_context(rules)
+    violations = []
+    for candidate in candidates:
+        timeline = timelines[candidate["personnel_id"]]
+        violations.extend(evaluate_shift(rules, timeline, candidate, person_quals, duty_quals, availability))
+        timeline.add(assignment_shift(candidate))
+    return violations
+
+async def enforce_constraints(candidates: List[dict], extra_rules: list = ()) -> List[dict]:
+    """Raise 422 if any candidate breaks an error-severity rule; return warnings.
+
+    `extra_rules` are (rule, check) pairs applied on top of the enabled ones.
+    """
+    rules = [*await get_compiled_rules(), *extra_rules]
+    if not rules or not candidates:
+        return []
+    for candidate in candidates:
+        parse_date(candidate["date"])
+    violations = await check_candidates(rules, candidates)
+    errors = [v for v in violations if v["severity"] == "error"]
+    if errors:
+        raise HTTPException(status_code=422, detail={
+            "message": "Assignment breaks scheduling rules",
+            "violations": errors[:50],
+        })
+    return violations
+
+async def enforce_availability(candidates: List[dict]):
+    """Raise 422 if a candidate's shift falls in one of the person's
+    unavailable periods, whatever rules are configured. An enabled
+    availability rule already covers this with its own severity.
+    """
+    if any(rule["type"] == "availability" for rule, _ in await get_compiled_rules()):
+        return
+    index = await get_availability_index()
+    violations = []
+    for candidate in candidates:
+        parse_date(candidate["date"])
+        if not (is_hhmm(candidate["start_time"]) and is_hhmm(candidate["end_time"])):
+            continue
+        shift = assignment_shift(candidate)
+        period = index.overlapping(candidate["personnel_id"], shift.start, shift.end)
+        if period:
+            violations.append({
+                "rule_id": None,
+                "type": "availability",
+                "severity": "error",
+                "personnel_id": candidate["personnel_id"],
+                "assignment_id": candidate.get("id"),
+                "date": candidate["date"],
+                "message": f"Unavailable from {format_local_datetime(period[0])} to {format_local_datetime(period[1])}",
+            })
+    if violations:
+        raise HTTPException(status_code=422, detail={
+            "message": "Assignment breaks scheduling rules",
+            "violations": violations[:50],
+        })
+
+@api_router.get("/constraint-rules", response_model=List[ConstraintRule])
+async def get_constraint_rules():
+    return await db.constraint_rules.find({}, {"_id": 0}).to_list(None)
+
+@api_router.post("/constraint-rules", response_model=ConstraintRule)
+async def create_constraint_rule(input: ConstraintRuleCreate):
+    if input.type not in RULE_TYPES:
+        raise HTTPException(status_code=400, detail=f"type must be one of: {', '.join(sorted(RULE_TYPES))}")
+    if input.severity not in ("error", "warning"):
+        raise HTTPException(status_code=400, detail="severity must be 'error' or 'warning'")
+    rule = ConstraintRule(**input.model_dump())
+    doc = rule.model_dump()
+    await db.constraint_rules.insert_one(doc)
+    record_change("constraint_rule", rule.id, "create", after=doc)
+    drop_compiled_rules()
+    cache_bus.publish("constraint_rules", [])
+    return rule
+
+@api_router.delete("/constraint-rules/{rule_id}")
+async def delete_constraint_rule(rule_id: str):
+    rule = await db.constraint_rules.find_one_and_delete({"id": rule_id}, {"_id": 0})
+    if not rule:
+        raise HTTPException(status_code=404, detail="Constraint rule not found")
+    record_change("constraint_rule", rule_id, "delete", before=rule)
+    drop_compiled_rules()
+    cache_bus.publish("constraint_rules", [])
+    return {"deleted": True}
+
+async def validate_range(rdb, start_date: str, end_date: str) -> dict:
+    """Check every assignment in the range against the enabled rules"""
+    rules = await get_compiled_rules()
+    lo, hi = shift_window([start_date, end_date], timeline_margin_days(rules))
+    assignments = await rdb.assignments.find(
+        {"date": {"$gte": lo, "$lte": hi}}, SHIFT_PROJECTION
+    ).to_list(None)
+    return await evaluate_range(rules, assignments, start_date, end_date)
+
+async def evaluate_range(rules: list, assignments: List[dict], start_date: str, end_date: str,
+                         schedule_duties: Optional[List[dict]] = None) -> dict:
+    """Check the assignments dated within the range; the others only fill in
+    timelines. `schedule_duties`, when given, supply duty qualifications
+    instead of the stored duties."""
+    timelines: dict = {}
+    for a in assignments:
+        timelines.setdefault(a["personnel_id"], PersonTimeline()).add(assignment_shift(a))
+    in_range = [a for a in assignments if start_date <= a["date"] <= end_date]
+    violations = []
+    if rules:
+        person_quals, duty_quals = await qualification_context(
+            rules, {a["personnel_id"] for a in in_range}, {a["schedule_duty_id"] for a in in_range}
+        )
+        if schedule_duties is not None:
+            duty_quals = {d["id"]: d.get("qualifications", []) for d in schedule_duties}
+        availability = await availability_context(rules)
+        for a in in_range:
+            violations.extend(evaluate_shift(rules, timelines[a["personnel_id"]], a, person_quals, duty_quals, availability))
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "valid": not any(v["severity"] == "error" for v in violations),
+        "checked": len(in_range),
+        "violations": violations,
+    }
+
+@api_router.get("/validate", response_class=APIResponse)
+async def validate_schedule(start_date: str, end_date: str):
+    """Check every assignment in the range against the enabled rules"""
+    parse_date(start_date, "start_date")
+    parse_date(end_date, "end_date")
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+    return APIResponse(await validate_range(reader("validate"), start_date, end_date))
+
+# --- Assignment Moves ---
+# Drag-and-drop moves an assignment to another slot, day or duty in one
+# conditional update that keeps its person, id and counters. Moves are
+# checked for overlaps with the person's other assignments (and against the
+# enabled rules) before anything is written.
+
+MOVE_OVERLAP_RULES = [({"id": "move_overlap", "type": "no_overlap", "severity": "error"},
+                       compile_rule({"type": "no_overlap"}))]
+
+async def plan_moves(moves: List[AssignmentMoveItem]) -> List[tuple]:
+    """(current document, $set changes) per move, after validating targets"""
+    ids = [m.id for m in moves]
+    if len(set(ids)) != len(ids):
+        raise HTTPException(status_code=400, detail="Each assignment may only be moved once per request")
+    current = {a["id"]: a for a in await db.assignments.find({"id": {"$in": ids}}, {"_id": 0}).to_list(None)}
+    missing = [i for i in ids if i not in current]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Assignment not found: {missing[0]}")
+    target_ids = {m.schedule_duty_id for m in moves if m.schedule_duty_id}
+    targets = {
+        d["id"]: d for d in await db.schedule_duties.find(
+            {"id": {"$in": list(target_ids)}}, MOVE_TARGET_PROJECTION
+        ).to_list(None)
+    }
+    # Date-only moves stay on the same duty: its occurrence on the new date
+    date_moves = [m for m in moves if date_only_move(current[m.id], m)]
+    same_duty = {}
+    if date_moves:
+        sources = {
+            d["id"]: d for d in await db.schedule_duties.find(
+                {"id": {"$in": list({current[m.id]["schedule_duty_id"] for m in date_moves})}}, MOVE_TARGET_PROJECTION
+            ).to_list(None)
+        }
+        keys = {
+            m.id: schedule_duty_key({**sources[current[m.id]["schedule_duty_id"]], "date": m.date})
+            for m in date_moves if current[m.id]["schedule_duty_id"] in sources
+        }
+        if keys:
+            found = await db.schedule_duties.find({"$or": list(keys.values())}, MOVE_TARGET_PROJECTION).to_list(None)
+            by_key = {tuple(schedule_duty_key(d).values()): d for d in found}
+            same_duty = {move_id: by_key.get(tuple(key.values())) for move_id, key in keys.items()}
+    return [
+        (current[move.id], move_changes(current[move.id], move,
+                                        same_duty.get(move.id) if date_only_move(current[move.id], move)
+                                        else targets.get(move.schedule_duty_id)))
+        for move in moves
+    ]
+
+MOVE_TARGET_PROJECTION = {"_id": 0, "id": 1, "duty_id": 1, "duty_type": 1, "duty_code": 1, "duty_name": 1, "date": 1}
+
+def date_only_move(old: dict, move: AssignmentMove) -> bool:
+    """True if `move` changes the date without naming another schedule duty"""
+    return bool(move.date) and move.date != old["date"] and move.schedule_duty_id in (None, old["schedule_duty_id"])
+
+def move_changes(old: dict, move: AssignmentMove, target: Optional[dict]) -> dict:
+    """$set changes moving `old` as `move` asks; `target` is the move's schedule
+    duty, or for a date-only move the same duty's occurrence on the new date"""
+    if move.expected_version is not None and old.get("version", 0) != move.expected_version:
+        raise HTTPException(status_code=409, detail="Assignment was modified by another user; reload and retry")
+    changes = {}
+    new_duty = move.schedule_duty_id and move.schedule_duty_id != old["schedule_duty_id"]
+    if new_duty or date_only_move(old, move):
+        if not target:
+            if new_duty:
+                raise HTTPException(status_code=404, detail="Schedule duty not found")
+            raise HTTPException(status_code=400, detail=f"The schedule duty is not scheduled on {move.date}")
+        changes.update(schedule_duty_id=target["id"], duty_code=target["duty_code"],
+                       duty_name=target["duty_name"], date=target["date"])
+        if move.date and move.date != target["date"]:
+            raise HTTPException(status_code=400, detail="date must match the target schedule duty's date")
+    for field in ("start_time", "end_time"):
+        value = getattr(move, field)
+        if value is not None:
+            changes[field] = value
+    return {k: v for k, v in changes.items() if old.get(k) != v}
+
+async def apply_moves(moves: List[AssignmentMoveItem]) -> List[dict]:
+    plans = [(old, changes) for old, changes in await plan_moves(moves) if changes]
+    if not plans:
+        return []
+    rules = await get_compiled_rules()
+    overlap_enforced = any(r["type"] == "no_overlap" and r.get("severity") == "error" for r, _ in rules)
+    await enforce_constraints([{**old, **changes} for old, changes in plans],
+                              () if overlap_enforced else MOVE_OVERLAP_RULES)
+
+    now = datetime.now(timezone.utc).isoformat()
+    # Each update is conditioned on the version read above, so a concurrent
+    # edit between the checks and the write turns into a 409
+    operations = [
+        UpdateOne({"id": old["id"], **version_filter(old.get("version", 0))},
+                  {"$set": {**changes, "updated_at": now}, "$inc": {"version": 1}})
+        for old, changes in plans
+    ]
+
+    ids = [old["id"] for old, _ in plans]
+    conflict = HTTPException(status_code=409, detail="Assignment was modified by another user; reload and retry")
+
+    async def write(session):
+        if session is None:
+            # Nothing to roll back without a transaction: catch stale versions
+            # before writing any of the moves
+            current = await db.assignments.find({"id": {"$in": ids}}, {"_id": 0, "id": 1, "version": 1}).to_list(None)
+            versions = {a["id"]: a.get("version", 0) for a in current}
+            if any(versions.get(old["id"]) != old.get("version", 0) for old, _ in plans):
+                raise conflict
+        result = await db.assignments.bulk_write(operations, ordered=True, session=session)
+        if result.matched_count != len(operations):
+            if session is None:
+                # An edit landed after the check; keep the moves that were
+                # applied (stamped with `now`) visible to /history and /sync
+                applied_ids = {a["id"] for a in await db.assignments.find(
+                    {"id": {"$in": ids}, "updated_at": now}, {"_id": 0, "id": 1}
+                ).to_list(None)}
+                applied = [(old, changes) for old, changes in plans if old["id"] in applied_ids]
+                await tombstone_left_dates(applied)
+                record_moves(applied, now)
+            raise conflict
+        await tombstone_left_dates(plans, session)
+
+    await run_in_transaction(write)
+    return record_moves(plans, now)
+
+async def tombstone_left_dates(plans: List[tuple], session=None):
+    """/sync clients whose range covers only a moved row's old date must drop it"""
+    left_dates = [old for old, changes in plans if changes.get("date", old["date"]) != old["date"]]
+    if left_dates:
+        await db.tombstones.insert_many(tombstones_for("assignment", left_dates), session=session)
+
+def record_moves(plans: List[tuple], now: str) -> List[dict]:
+    moved = []
+    for old, changes in plans:
+        new = {**old, **changes, "updated_at": now, "version": old.get("version", 0) + 1}
+        record_change("assignment", old["id"], "update", before=old, after=new)
+        moved.append(new)
+    if plans:
+        invalidate_calendar_summary(*{d for old, changes in plans for d in (old["date"], changes.get("date", old["date"]))})
+    return moved
+
+@api_router.patch("/assignments/move", response_class=APIResponse)
+async def move_assignments(input: AssignmentMoveBatch):
+    """Move several assignments at once (multi-select drag); all or nothing
+    where the server supports transactions"""
+    if not input.moves:
+        raise HTTPException(status_code=400, detail="No moves given")
+    moved = {a["id"]: a for a in await apply_moves(input.moves)}
+    # Unchanged moves are returned as they are
+    unchanged = [m.id for m in input.moves if m.id not in moved]
+    if unchanged:
+        for a in await db.assignments.find({"id": {"$in": unchanged}}, ASSIGNMENT_PROJECTION).to_list(None):
+            moved[a["id"]] = a
+    return APIResponse([moved[m.id] for m in input.moves])
+
+@api_router.patch("/assignments/{assignment_id}/move", response_model=Assignment)
+async def move_assignment(assignment_id: str, input: AssignmentMove):
+    """Move one assignment to another slot, day or duty"""
+    moved = await apply_moves([AssignmentMoveItem(id=assignment_id, **input.model_dump())])
+    if moved:
+        return moved[0]
+    return await db.assignments.find_one({"id": assignment_id}, ASSIGNMENT_PROJECTION)
+
+# --- Assignment Swaps ---
+# Personnel trade places between assignments: a swap is a rotation of two.
+# Each person gives up one slot and takes another, so counters are left
+# alone, and all changes go out as one conditional bulk_write.
+
+PERSONNEL_FIELDS = ("personnel_id", "personnel_name", "personnel_callsign")
+
+async def rotate_personnel(cycles: List[List[str]], expected_versions: dict) -> List[dict]:
+    """Move the person on cycle[i] to cycle[i + 1] (the last one to cycle[0])"""
+    ids = [i for cycle in cycles for i in cycle]
+    if any(len(cycle) < 2 for cycle in cycles):
+        raise HTTPException(status_code=400, detail="Each rotation needs at least two assignments")
+    if len(set(ids)) != len(ids):
+        raise HTTPException(status_code=400, detail="An assignment may only appear once per request")
+    current = {a["id"]: a for a in await db.assignments.find({"id": {"$in": ids}}, {"_id": 0}).to_list(None)}
+    missing = [i for i in ids if i not in current]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Assignment not found: {missing[0]}")
+    stale = [i for i, v in expected_versions.items() if i in current and current[i].get("version", 0) != v]
+    if stale:
+        raise HTTPException(status_code=409, detail="Assignment was modified by another user; reload and retry")
+
+    plans = []
+    for cycle in cycles:
+        for index, assignment_id in enumerate(cycle):
+            giver = current[cycle[index - 1]]
+            plans.append((current[assignment_id], {f: giver[f] for f in PERSONNEL_FIELDS}))
+    await enforce_constraints([{**old, **changes} for old, changes in plans])
+
+    now = datetime.now(timezone.utc).isoformat()
+    operations = [
+        UpdateOne(
+            {"id": old["id"], "personnel_id": old["personnel_id"], **version_filter(old.get("version", 0))},
+            {"$set": {**changes, "updated_at": now}, "$inc": {"version": 1}},
+        )
+        for old, changes in plans
+    ]
+
+    async def write(session):
+        result = await db.assignments.bulk_write(operations, ordered=True, session=session)
+        if result.matched_count != len(operations):
+            raise HTTPException(status_code=409, detail="Assignment was modified by another user; reload and retry")
+
+    await run_in_transaction(write)
+    swapped = []
+    for old, changes in plans:
+        new = {**old, **changes, "updated_at": now, "version": old.get("version", 0) + 1}
+        record_change("assignment", old["id"], "update", before=old, after=new)
+        swapped.append(new)
+    return swapped
+
+@api_router.post("/assignments/swap", response_class=APIResponse)
+async def swap_assignments(input: AssignmentSwap):
+    """Exchange the people on two assignments"""
+    return APIResponse(await rotate_personnel([[input.first_id, input.second_id]], input.expected_versions))
+
+@api_router.post("/assignments/rotate", response_class=APIResponse)
+async def rotate_assignments(input: AssignmentRotation):
+    """Rotate people along one or more cycles of assignments in one write"""
+    if not input.cycles:
+        raise HTTPException(status_code=400, detail="No cycles given")
+    return APIResponse(await rotate_personnel(input.cycles, input.expected_versions))
+
+# --- Calendar Summary ---
+# Month view only needs filled vs required slot counts per duty per day.
+# Summaries are computed a whole month at a time and cached in-process;
+# write routes drop the affected months via invalidate_calendar_summary().
+
+CALENDAR_SUMMARY_MAX_MONTHS = int(os.environ.get('CALENDAR_SUMMARY_MAX_MONTHS', '12'))
+
+calendar_summary_cache: dict = {}
+calendar_summary_generation = 0
+
+def drop_calendar_summary(dates: List[str]):
+    """Drop cached month summaries in this worker only"""
+    global calendar_summary_generation
+    calendar_summary_generation += 1
+    if not dates:
+        calendar_summary_cache.clear()
+        return
+    for d in dates:
+        calendar_summary_cache.pop(d[:7], None)
+
+def invalidate_calendar_summary(*dates: str):
+    """Drop cached month summaries for the given dates (all months if none given), in every worker"""
+    months = sorted({d[:7] for d in dates})
+    drop_calendar_summary(months)
+    cache_bus.publish("calendar_summary", months)
+
+cache_bus.register("calendar_summary", drop_calendar_summary)
+
+def month_bounds(month: str):
+    """First and last date (YYYY-MM-DD) of a YYYY-MM month"""
+    year, mon = int(month[:4]), int(month[5:7])
+    last_day = calendar.monthrange(year, mon)[1]
+    return f"{month}-01", f"{month}-{last_day:02d}"
+
+def months_between(start_date: str, end_date: str) -> List[str]:
+    months = []
+    current = datetime.strptime(start_date[:7], "%Y-%m")
+    end = datetime.strptime(end_date[:7], "%Y-%m")
+    while current <= end:
+        months.append(current.strftime("%Y-%m"))
+        current += relativedelta(months=1)
+    return months
+
+async def compute_month_summary(month: str) -> dict:
+    """Per-day list of duties with filled vs required slot counts for one month.
+
+    One aggregation: each duty joins its assignments and group config on the
+    schedule_duty_id indexes, then duties are grouped by day.
+    """
+    first, last = month_bounds(month)
+    duty_type = {"$ifNull": ["$duty_type", "single"]}
+    rows = await reader("calendar_summary").schedule_duties.aggregate([
+        {"$match": {"date": {"$gte": first, "$lte": last}}},
+        {"$lookup": {"from": "assignments", "localField": "id", "foreignField": "schedule_duty_id", "as": "assignments"}},
+        {"$lookup": {"from": "duty_group_configs", "localField": "id", "foreignField": "schedule_duty_id", "as": "configs"}},
+        {"$sort": {"date": 1, "duty_code": 1}},
+        {"$group": {"_id": "$date", "duties": {"$push": {
+            "schedule_duty_id": "$id",
+            "duty_code": {"$ifNull": ["$duty_code", ""]},
+            "duty_name": {"$ifNull": ["$duty_name", ""]},
+            "duty_type": duty_type,
+            "filled": {"$size": "$assignments"},
+            # 1 for singles, summed config counts for groups (0 until configured)
+            "required": {"$cond": [
+                {"$eq": [duty_type, "group"]},
+                {"$sum": {"$map": {"input": "$configs", "as": "config", "in": {"$sum": "$$config.duties.count"}}}},
+                1,
+            ]},
+        }}}},
+        {"$sort": {"_id": 1}},
+    ]).to_list(None)
+    return {row["_id"]: row["duties"] for row in rows}
+
+async def get_month_summary(month: str) -> dict:
+    cached = calendar_summary_cache.get(month)
+    if cached is not None:
+        return cached
+    generation = calendar_summary_generation
+    days = await compute_month_summary(month)
+    # Skip caching if a write landed while we were reading, or if the read
+    # may have come from a lagging secondary
+    if generation == calendar_summary_generation and reader("calendar_summary") is db:
+        calendar_summary_cache[month] = days
+    return days
+
+@api_router.get("/calendar/summary", response_class=APIResponse)
+async def get_calendar_summary(start_date: str, end_date: str):
+    """Per-day, per-duty filled vs required slot counts for month view"""
+    try:
+        first = datetime.strptime(start_date, "%Y-%m-%d")
+        last = datetime.strptime(end_date, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="start_date and end_date must be YYYY-MM-DD")
+    if first > last:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+    # One aggregation per month, so the span is bounded
+    months = months_between(start_date, end_date)
+    if len(months) > CALENDAR_SUMMARY_MAX_MONTHS:
+        raise HTTPException(status_code=400, detail=f"Range may span at most {CALENDAR_SUMMARY_MAX_MONTHS} months")
+    days = {}
+    for month in months:
+        month_days = await get_month_summary(month)
+        days.update({d: rows for d, rows in month_days.items() if start_date <= d <= end_date})
+    return APIResponse({"start_date": start_date, "end_date": end_date, "days": days})
+
+# --- Day Buckets ---
+# One `day_buckets` document per date (`_id` = "YYYY-MM-DD") holds that day's
+# schedule duties, group configs and assignments as maps keyed by id (group
+# configs by schedule_duty_id), so a day is one _id lookup and a week is
+# seven. Every write reaches the buckets through record_change(); the writer
+# turns each event into a $set/$unset of one map entry and applies them in
+# order with bulk_write, retrying with backoff while Mongo is unavailable.
+# Reads never wait for the writers, so a write shows up in the buckets once
+# its worker has flushed it, normally within milliseconds.
+#
+# Workers flush independently, so events for one row can arrive out of
+# order. Each entry is only replaced by an event with a revision at least as
+# new (`version` for assignments and group configs, `updated_at` for
+# schedule duties), and a removal leaves the removed revision under
+# `removed`, so a late update from another worker cannot bring the row back.
+#
+# Nothing is lost silently: events beyond DAY_BUCKET_QUEUE_SIZE are dropped
+# but their dates are recorded in the `day_buckets_stale` marker, and each
+# writer's lease in `day_bucket_writers` lists the dates of the events it has
+# not applied yet. A worker that stops without flushing (crash, failed final
+# flush) leaves that lease to expire, and whoever removes it marks those dates
+# stale. Writers rebuild stale dates from the source collections as soon as
+# they have caught up, one bucket at a time and only if its `version` (bumped
+# by every event) has not moved meanwhile, so a repair never overwrites a live
+# writer's event. POST /api/jobs/rebuild-day-buckets rebuilds whole ranges by
+# hand.
+
+DAY_BUCKET_FIELDS = {"schedule_duty": "schedule_duties", "duty_group_config": "duty_group_configs", "assignment": "assignments"}
+DAY_BUCKET_MAX_DAYS = int(os.environ.get('DAY_BUCKET_MAX_DAYS', '42'))
+DAY_BUCKET_REBUILD_DAYS = 31  # days rebuilt per chunk
+DAY_BUCKET_QUEUE_SIZE = int(os.environ.get('DAY_BUCKET_QUEUE_SIZE', '10000'))
+DAY_BUCKET_LEASE_SECONDS = int(os.environ.get('DAY_BUCKET_LEASE_SECONDS', '60'))
+DAY_BUCKET_MAX_BACKOFF_SECONDS = 30
+DAY_BUCKET_STALE = "day_buckets_stale"  # marker document in `migrations`
+DAY_BUCKET_REVISIONS = {"schedule_duty": "updated_at", "duty_group_config": "version", "assignment": "version"}
+
+def bucket_revision(entity: str, doc: dict):
+    field = DAY_BUCKET_REVISIONS[entity]
+    return doc.get(field, 0 if field == "version" else "")
+
+def bucket_removal(entity: str, field: str, key: str, revision, now: datetime) -> list:
+    """Pipeline removing one map entry unless a newer revision is stored"""
+    path = f"{field}.{key}"
+    removable = {"$gte": [{"$literal": revision}, f"${path}.{DAY_BUCKET_REVISIONS[entity]}"]}
+    stage = {
+        path: {"$cond": [removable, "$$REMOVE", f"${path}"]},
+        f"removed.{path}": {"$max": [{"$literal": revision}, f"$removed.{path}"]},
+        "updated_at": now,
+        "version": {"$add": [{"$ifNull": ["$version", 0]}, 1]},
+    }
+    if entity == "schedule_duty":
+        stage[f"duty_group_configs.{key}"] = {"$cond": [removable, "$$REMOVE", f"$duty_group_configs.{key}"]}
+    return [{"$set": stage}]
+
+def bucket_upsert(entity: str, field: str, key: str, doc: dict, now: datetime) -> list:
+    """Pipeline setting one map entry unless it holds a newer revision or
+    was removed at this revision or later"""
+    path = f"{field}.{key}"
+    revision = {"$literal": bucket_revision(entity, doc)}
+    newer = {"$and": [
+        {"$gte": [revision, f"${path}.{DAY_BUCKET_REVISIONS[entity]}"]},
+        {"$gt": [revision, f"$removed.{path}"]},
+    ]}
+    return [{"$set": {
+        path: {"$cond": [newer, {"$literal": doc}, f"${path}"]},
+        "updated_at": now,
+        "version": {"$add": [{"$ifNull": ["$version", 0]}, 1]},
+    }}]
+
+class DayBucketWriter:
+    """Applies change events to `day_buckets` in order, in batches"""
+
+    def __init__(self):
+        self.pending: List[tuple] = []
+        self.lock = asyncio.Lock()
+        self.wakeup: Optional[asyncio.Event] = None
+        self.task = None
+        self.lease_task = None
+        # Dropped events not yet recorded in the stale marker
+        self.stale_dates: set = set()
+        self.stale_duty_ids: set = set()
+        self.repair_due = False
+        self.dropped = 0
+
+    def record(self, entity: str, entity_id: str, action: str, before: Optional[dict], after: Optional[dict]):
+        if entity not in DAY_BUCKET_FIELDS:
+            return
+        if len(self.pending) >= DAY_BUCKET_QUEUE_SIZE:
+            self.dropped += 1
+            if entity == "duty_group_config":
+                self.stale_duty_ids.add((after or before)["schedule_duty_id"])
+            else:
+                self.stale_dates.update(doc["date"] for doc in (before, after) if doc)
+        else:
+            self.pending.append((entity, entity_id, action, before, after))
+        if self.wakeup is not None:
+            self.wakeup.set()
+
+    async def wait_for_room(self, count: int):
+        """Backpressure for bulk writers: flush rather than overflow the queue"""
+        if self.task is not None and len(self.pending) + count > DAY_BUCKET_QUEUE_SIZE:
+            await self.flush()
+
+    async def operations(self, events: List[tuple]) -> list:
+        # Group configs carry no date; they live in their duty's bucket
+        config_duty_ids = {
+            (after or before)["schedule_duty_id"] for entity, _, _, before, after in events if entity == "duty_group_config"
+        }
+        duty_dates = {}
+        if config_duty_ids:
+            duty_dates = {d["id"]: d["date"] for d in await db.schedule_duties.find(
+                {"id": {"$in": list(config_duty_ids)}}, {"_id": 0, "id": 1, "date": 1}
+            ).to_list(None)}
+        now = utc_now()
+        operations = []
+        for entity, entity_id, action, before, after in events:
+            field = DAY_BUCKET_FIELDS[entity]
+            if entity == "duty_group_config":
+                key = (after or before)["schedule_duty_id"]
+                old_date = new_date = duty_dates.get(key)
+                if old_date is None:
+                    continue  # duty already deleted, which removed its config entry
+            else:
+                key = entity_id
+                old_date = before["date"] if before else None
+                new_date = after["date"] if after else None
+            if action == "delete" or (old_date and old_date != new_date):
+                operations.append(UpdateOne(
+                    {"_id": old_date}, bucket_removal(entity, field, key, bucket_revision(entity, before), now), upsert=True,
+                ))
+            if action != "delete":
+                doc = {k: v for k, v in after.items() if k != "_id"}
+                operations.append(UpdateOne({"_id": new_date}, bucket_upsert(entity, field, key, doc, now), upsert=True))
+        return operations
+
+    async def flush(self) -> bool:
+        """Apply pending events; False if they had to be kept for a retry"""
+        async with self.lock:
+            while self.pending:
+                events, self.pending = self.pending, []
+                try:
+                    operations = await self.operations(events)
+                    if operations:
+                        await db.day_buckets.bulk_write(operations, ordered=True)
+                except PyMongoError:
+                    # Retry these first; the queue cap still applies to new events
+                    self.pending[:0] = events
+                    logger.exception("Failed to apply %d day bucket events", len(events))
+                    return False
+        return True
+
+    def unapplied(self) -> tuple:
+        """Dates and group-config duty ids of events not yet in the buckets"""
+        dates, duty_ids = set(self.stale_dates), set(self.stale_duty_ids)
+        for entity, _, _, before, after in self.pending:
+            if entity == "duty_group_config":
+                duty_ids.add((after or before)["schedule_duty_id"])
+            else:
+                dates.update(doc["date"] for doc in (before, after) if doc)
+        return dates, duty_ids
+
+    async def mark_stale(self) -> bool:
+        """Record dropped events' dates in the stale marker"""
+        if not (self.stale_dates or self.stale_duty_ids):
+            return True
+        dates, duty_ids = set(self.stale_dates), set(self.stale_duty_ids)
+        try:
+            if duty_ids:
+                dates.update(await db.schedule_duties.distinct("date", {"id": {"$in": list(duty_ids)}}))
+            await db.migrations.update_one(
+                {"_id": DAY_BUCKET_STALE}, {"$addToSet": {"dates": {"$each": sorted(dates)}}}, upsert=True,
+            )
+        except PyMongoError:
+            logger.exception("Failed to record stale day buckets")
+            return False
+        logger.warning("Day bucket events were lost; marked %d days stale", len(dates))
+        self.stale_dates -= dates
+        self.stale_duty_ids -= duty_ids
+        self.repair_due = True
+        return True
+
+    async def repair(self) -> bool:
+        """Rebuild the days in the stale marker, if there is one; False while
+        some of them changed under the rebuild and still need another pass"""
+        if not self.repair_due:
+            return True
+        try:
+            marker = await db.migrations.find_one({"_id": DAY_BUCKET_STALE})
+            if marker:
+                async with distributed_lock("day_buckets", ttl_seconds=600) as acquired:
+                    if not acquired:
+                        return False  # another worker is rebuilding; check again later
+                    dates = marker.get("dates", [])
+                    repaired = await repair_day_buckets(dates)
+                    await db.migrations.update_one({"_id": DAY_BUCKET_STALE}, {"$pull": {"dates": {"$in": repaired}}})
+                    await db.migrations.delete_one({"_id": DAY_BUCKET_STALE, "dates": {"$size": 0}})
+                    logger.info("Rebuilt %d of %d stale day buckets", len(repaired), len(dates))
+                    if len(repaired) < len(dates):
+                        return False
+        except PyMongoError:
+            logger.exception("Failed to rebuild stale day buckets")
+            return False
+        self.repair_due = False
+        return True
+
+    async def run(self):
+        delay = 0
+        while True:
+            if not (self.pending or self.stale_dates or self.stale_duty_ids or self.repair_due):
+                await self.wakeup.wait()
+            self.wakeup.clear()
+            if await self.flush() and await self.mark_stale() and await self.repair():
+                delay = 0
+            else:
+                delay = min(delay * 2 or 0.5, DAY_BUCKET_MAX_BACKOFF_SECONDS)
+                await asyncio.sleep(delay)
+
+    async def hold_lease(self):
+        """Renew this worker's lease with the dates it has not applied yet; an
+        expired lease means a writer died with those events, so its dates are
+        marked stale"""
+        while True:
+            try:
+                now = datetime.now(timezone.utc)
+                dates, duty_ids = self.unapplied()
+                await db.day_bucket_writers.update_one(
+                    {"_id": WORKER_ID},
+                    {"$set": {
+                        "lease_until": (now + timedelta(seconds=DAY_BUCKET_LEASE_SECONDS)).isoformat(),
+                        "dates": sorted(dates),
+                        "duty_ids": sorted(duty_ids),
+                    }},
+                    upsert=True,
+                )
+                expired = await db.day_bucket_writers.find({"lease_until": {"$lt": now.isoformat()}}, {"_id": 1}).to_list(None)
+                for writer in expired:
+                    # Only one worker gets the document, so only one marks its dates
+                    lease = await db.day_bucket_writers.find_one_and_delete({"_id": writer["_id"], "lease_until": {"$lt": now.isoformat()}})
+                    if lease:
+                        logger.warning("Day bucket writer %s stopped without flushing", lease["_id"])
+                        self.stale_dates.update(lease.get("dates", []))
+                        self.stale_duty_ids.update(lease.get("duty_ids", []))
+                        self.wakeup.set()
+            except PyMongoError:
+                logger.exception("Failed to renew the day bucket writer lease")
+            await asyncio.sleep(DAY_BUCKET_LEASE_SECONDS / 3)
+
+    async def start(self):
+        self.wakeup = asyncio.Event()
+        self.repair_due = True  # pick up markers left by earlier runs
+        self.task = asyncio.create_task(self.run())
+        self.lease_task = asyncio.create_task(self.hold_lease())
+        self.wakeup.set()
+
+    async def stop(self):
+        if self.task is None:
+            return
+        for task in (self.task, self.lease_task):
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self.task = None
+        if await self.flush() and await self.mark_stale():
+            await db.day_bucket_writers.delete_one({"_id": WORKER_ID})
+        else:
+            # Leave the lease to expire so another writer rebuilds
+            logger.warning("Stopping with %d unapplied day bucket events", len(self.pending))
+
+day_bucket_writer = DayBucketWriter()
+
+def bucket_view(date: str, bucket: Optional[dict]) -> dict:
+    bucket = bucket or {}
+    return {
+        "date": date,
+        "schedule_duties": list(bucket.get("schedule_duties", {}).values()),
+        "duty_group_configs": list(bucket.get("duty_group_configs", {}).values()),
+        "assignments": list(bucket.get("assignments", {}).values()),
+    }
+
+class PersonnelTable:
+    """Deduplicated personnel referenced by index from grid rows"""
+
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+        self.rows: List[dict] = []
+
+    def add(self, assignment: dict) -> int:
+        pid = assignment["personnel_id"]
+        if pid not in self.index:
+            self.index[pid] = len(self.rows)
+            self.rows.append({"id": pid, "name": assignment["personnel_name"], "callsign": assignment["personnel_callsign"]})
+        return self.index[pid]
+
+def occupancy_grid(view: dict, personnel: PersonnelTable, bucket_minutes: int) -> dict:
+    """Per schedule duty, one lane per person with a packed bit per occupied cell.
+
+    `lanes` is base64 of a (people x bytes_per_lane) byte matrix, each lane
+    padded to whole bytes, most significant bit first; `occupied` is the OR
+    of the lanes. Assignments whose times are not HHMM are left out of the
+    lanes and listed by id in their row's `unparsed`.
+    """
+    window_start, window_end = hhmm_to_minutes(COVERAGE_DAY_START), hhmm_to_minutes(COVERAGE_DAY_END)
+    cells = -(-(window_end - window_start) // bucket_minutes)
+    rows = {d["id"]: {"personnel": [], "lanes": "", "occupied": base64.b64encode(np.packbits(np.zeros(cells, dtype=bool))).decode()}
+            for d in view["schedule_duties"]}
+    assignments = []
+    for a in view["assignments"]:
+        if a["schedule_duty_id"] not in rows:
+            continue
+        if is_hhmm(a.get("start_time")) and is_hhmm(a.get("end_time")):
+            assignments.append(a)
+        else:
+            rows[a["schedule_duty_id"]].setdefault("unparsed", []).append(a["id"])
+    if not assignments:
+        return rows
+    lane_keys = {}
+    lane_of = np.array([
+        lane_keys.setdefault((a["schedule_duty_id"], personnel.add(a)), len(lane_keys)) for a in assignments
+    ])
+    minutes = np.array([[hhmm_to_minutes(a["start_time"]), hhmm_to_minutes(a["end_time"])] for a in assignments])
+    # Overnight shifts run to the end of the grid
+    minutes[:, 1] = np.where(minutes[:, 1] <= minutes[:, 0], window_end, minutes[:, 1])
+    first = np.clip((minutes[:, 0] - window_start) // bucket_minutes, 0, cells)
+    last = np.clip(-(-(minutes[:, 1] - window_start) // bucket_minutes), 0, cells)
+    cell = np.arange(cells)
+    covered = (cell >= first[:, np.newaxis]) & (cell < last[:, np.newaxis])
+    lanes = np.zeros((len(lane_keys), cells), dtype=bool)
+    np.logical_or.at(lanes, lane_of, covered)
+    packed = np.packbits(lanes, axis=1)
+    lane_duties = np.array([duty_id for duty_id, _ in lane_keys])
+    lane_people = np.array([person for _, person in lane_keys])
+    for duty_id, row in rows.items():
+        selected = np.flatnonzero(lane_duties == duty_id)
+        if not len(selected):
+            continue
+        row["personnel"] = lane_people[selected].tolist()
+        row["lanes"] = base64.b64encode(packed[selected].tobytes()).decode()
+        row["occupied"] = base64.b64encode(np.packbits(lanes[selected].any(axis=0))).decode()
+    return rows
+
+def grid_meta(bucket_minutes: int, granularity: str) -> dict:
+    cells = -(-(hhmm_to_minutes(COVERAGE_DAY_END) - hhmm_to_minutes(COVERAGE_DAY_START)) // bucket_minutes)
+    return {"day_start": COVERAGE_DAY_START, "day_end": COVERAGE_DAY_END, "granularity": granularity,
+            "cells": cells, "bytes_per_lane": -(-cells // 8)}
+
+def check_grid_format(format: str, granularity: str):
+    if format not in ("full", "grid"):
+        raise HTTPException(status_code=400, detail="format must be 'full' or 'grid'")
+    if granularity not in COVERAGE_GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of: {', '.join(COVERAGE_GRANULARITIES)}")
+
+async def derive_day_buckets(dates: List[str]) -> List[dict]:
+    """Bucket documents for `dates`, built from the source collections"""
+    in_dates = {"date": {"$in": dates}}
+    duties, assignments = await asyncio.gather(
+        db.schedule_duties.find(in_dates, SCHEDULE_DUTY_PROJECTION).to_list(None),
+        db.assignments.find(in_dates, ASSIGNMENT_PROJECTION).to_list(None),
+    )
+    duty_dates = {d["id"]: d["date"] for d in duties}
+    configs = await db.duty_group_configs.find(
+        {"schedule_duty_id": {"$in": list(duty_dates)}}, {"_id": 0}
+    ).to_list(None)
+    now = utc_now()
+    buckets = {date: {"_id": date, "schedule_duties": {}, "duty_group_configs": {}, "assignments": {}, "updated_at": now}
+               for date in dates}
+    for d in duties:
+        buckets[d["date"]]["schedule_duties"][d["id"]] = d
+    for c in configs:
+        buckets[duty_dates[c["schedule_duty_id"]]]["duty_group_configs"][c["schedule_duty_id"]] = c
+    for a in assignments:
+        buckets[a["date"]]["assignments"][a["id"]] = a
+    return list(buckets.values())
+
+async def rebuild_day_buckets(start_date: Optional[str] = None, end_date: Optional[str] = None, progress=None) -> dict:
+    """Replace the buckets in the range (all if no range) with freshly derived ones.
+
+    Writes landing during a rebuild may be overwritten by the rebuilt copy of
+    their day; run it when the calendar is quiet.
+    """
+    await day_bucket_writer.flush()
+    query = {"date": {"$gte": start_date, "$lte": end_date}} if start_date and end_date else {}
+    duty_dates, assignment_dates = await asyncio.gather(
+        db.schedule_duties.distinct("date", query), db.assignments.distinct("date", query),
+    )
+    dates = sorted(set(duty_dates) | set(assignment_dates))
+    for start in range(0, len(dates), DAY_BUCKET_REBUILD_DAYS):
+        chunk = dates[start:start + DAY_BUCKET_REBUILD_DAYS]
+        await db.day_buckets.bulk_write([
+            UpdateOne({"_id": bucket.pop("_id")}, {"$set": bucket, "$inc": {"version": 1}}, upsert=True)
+            for bucket in await derive_day_buckets(chunk)
+        ], ordered=False)
+        if progress:
+            await progress(start + len(chunk), len(dates))
+    # Buckets of days that no longer hold anything
+    stale = {"_id": {"$nin": dates}}
+    if start_date and end_date:
+        stale["_id"].update({"$gte": start_date, "$lte": end_date})
+    removed = await db.day_buckets.delete_many(stale)
+    return {"days": len(dates), "removed": removed.deleted_count}
+
+async def repair_day_buckets(dates: List[str]) -> List[str]:
+    """Rebuild the buckets of `dates`, each only if no event reached it while
+    it was being derived; returns the dates that were rebuilt"""
+    repaired = []
+    for start in range(0, len(dates), DAY_BUCKET_REBUILD_DAYS):
+        chunk = dates[start:start + DAY_BUCKET_REBUILD_DAYS]
+        # Versions are read before the sources, so any event applied after
+        # the derive read its rows has moved the version on
+        seen = {b["_id"]: b for b in await db.day_buckets.find({"_id": {"$in": chunk}}, {"version": 1, "removed": 1}).to_list(None)}
+        for bucket in await derive_day_buckets(chunk):
+            version = seen.get(bucket["_id"], {}).get("version")
+            bucket["version"] = (version or 0) + 1
+            # Removal revisions still guard against late events
+            bucket["removed"] = seen.get(bucket["_id"], {}).get("removed", {})
+            try:
+                await db.day_buckets.replace_one({"_id": bucket["_id"], "version": version}, bucket, upsert=True)
+            except DuplicateKeyError:
+                continue  # changed since it was read; the next pass retries it
+            repaired.append(bucket["_id"])
+    return repaired
+
+async def build_day_buckets_once():
+    """One-off: derive buckets for data written before they existed"""
+    async with distributed_lock("day_buckets", ttl_seconds=600) as acquired:
+        if not acquired or await db.migrations.find_one({"_id": "day_buckets"}):
+            return
+        result = await rebuild_day_buckets()
+        await db.migrations.insert_one({"_id": "day_buckets", **result, "at": datetime.now(timezone.utc)})
+
+@api_router.get("/calendar/day/{date}", response_class=APIResponse)
+async def get_calendar_day(date: str, format: str = "full", granularity: str = "hour"):
+    """One day's schedule duties, group configs and assignments.
+
+    `format=grid` replaces the assignments with occupancy bitmaps per duty
+    and a deduplicated personnel table (see occupancy_grid).
+    """
+    check_grid_format(format, granularity)
+    view = bucket_view(date, await db.day_buckets.find_one({"_id": date}))
+    if format == "grid":
+        personnel = PersonnelTable()
+        bucket_minutes = COVERAGE_GRANULARITIES[granularity]
+        view["rows"] = occupancy_grid(view, personnel, bucket_minutes)
+        del view["assignments"]
+        view.update(grid_meta(bucket_minutes, granularity), personnel=personnel.rows)
+    return APIResponse(view)
+
+@api_router.get("/calendar/days", response_class=APIResponse)
+async def get_calendar_days(start_date: str, end_date: str, format: str = "full", granularity: str = "hour"):
+    """Day buckets for every date in the range (week view); `format=grid`
+    as for a single day, with one personnel table for the whole range"""
+    check_grid_format(format, granularity)
+    try:
+        first = datetime.strptime(start_date, "%Y-%m-%d")
+        count = (datetime.strptime(end_date, "%Y-%m-%d") - first).days + 1
+    except ValueError:
+        raise HTTPException(status_code=400, detail="start_date and end_date must be YYYY-MM-DD")
+    if not 0 < count <= DAY_BUCKET_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"end_date must be on or after start_date and within {DAY_BUCKET_MAX_DAYS} days")
+    dates = [(first + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(count)]
+    buckets = {b["_id"]: b for b in await db.day_buckets.find({"_id": {"$in": dates}}).to_list(None)}
+    days = [bucket_view(date, buckets.get(date)) for date in dates]
+    result = {"start_date": start_date, "end_date": end_date, "days": days}
+    if format == "grid":
+        personnel = PersonnelTable()
+        bucket_minutes = COVERAGE_GRANULARITIES[granularity]
+        for view in days:
+            view["rows"] = occupancy_grid(view, personnel, bucket_minutes)
+            del view["assignments"]
+        result.update(grid_meta(bucket_minutes, granularity), personnel=personnel.rows)
+    return APIResponse(result)
+
+# --- Published Schedules ---
+# `assignments` is the working draft. Publishing a month validates it and
+# copies its duties, group configs and assignments into one immutable
+# `published_schedules` document; each publish adds a new revision. Readers
+# of the published roster get that document's pre-encoded body from an
+# in-process cache, with an ETag so unchanged rosters revalidate as 304s.
+
+PUBLISH_LIST_PROJECTION = {"_id": 0, "schedule_duties": 0, "group_configs": 0, "assignments": 0}
+
+published_cache: dict = {}
+published_generation = 0
+
+def drop_published(periods: List[str]):
+    """Drop cached published rosters in this worker only"""
+    global published_generation
+    published_generation += 1
+    if not periods:
+        published_cache.clear()
+        return
+    for period in periods:
+        published_cache.pop(period, None)
+
+cache_bus.register("published_schedules", drop_published)
+
+def published_etag(doc: dict) -> str:
+    return f'"{doc["period"]}-r{doc["revision"]}"'
+
+def check_period(period: str):
+    try:
+        valid = datetime.strptime(period, "%Y-%m").strftime("%Y-%m") == period
+    except ValueError:
+        valid = False
+    if not valid:
+        raise HTTPException(status_code=400, detail="period must be YYYY-MM")
+
+async def snapshot_period(period: str, session=None) -> dict:
+    first, last = month_bounds(period)
+    date_range = {"date": {"$gte": first, "$lte": last}}
+    duties = await db.schedule_duties.find(date_range, {"_id": 0}, session=session).sort([("date", 1), ("duty_code", 1)]).to_list(None)
+    configs = await db.duty_group_configs.find(
+        {"schedule_duty_id": {"$in": [d["id"] for d in duties if d.get("duty_type") == "group"]}}, {"_id": 0}, session=session
+    ).to_list(None)
+    assignments = await db.assignments.find(date_range, {"_id": 0}, session=session).sort([("date", 1), ("start_time", 1)]).to_list(None)
+    return {"schedule_duties": duties, "group_configs": configs, "assignments": assignments}
+
+@api_router.post("/publish/{period}")
+async def publish_period(period: str):
+    """Validate a month's draft and publish it as a new immutable revision"""
+    check_period(period)
+    first, last = month_bounds(period)
+    rules = await get_compiled_rules()
+    lo, hi = shift_window([first, last], timeline_margin_days(rules))
+
+    async def publish(session):
+        # One snapshot read inside the transaction keeps the copy consistent,
+        # and the rules are checked against exactly that copy
+        snapshot = await snapshot_period(period, session)
+        neighbours = await db.assignments.find(
+            {"$or": [{"date": {"$gte": lo, "$lt": first}}, {"date": {"$gt": last, "$lte": hi}}]}, SHIFT_PROJECTION, session=session
+        ).to_list(None)
+        report = await evaluate_range(rules, snapshot["assignments"] + neighbours, first, last, snapshot["schedule_duties"])
+        if not report["valid"]:
+            raise HTTPException(status_code=422, detail={
+                "message": "Draft breaks scheduling rules; fix it before publishing",
+                "violations": [v for v in report["violations"] if v["severity"] == "error"][:50],
+            })
+        latest = await db.published_schedules.find_one(
+            {"period": period}, {"_id": 0, "revision": 1}, sort=[("revision", -1)], session=session
+        )
+        doc = {
+            "id": str(uuid.uuid4()),
+            "period": period,
+            "revision": (latest["revision"] if latest else 0) + 1,
+            "start_date": first,
+            "end_date": last,
+            "published_at": datetime.now(timezone.utc).isoformat(),
+            "warnings": report["violations"],
+            "counts": {key: len(rows) for key, rows in snapshot.items()},
+            **snapshot,
+        }
+        await db.published_schedules.insert_one(doc, session=session)
+        return doc
+
+    try:
+        doc = await run_in_transaction(publish)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="This period was published concurrently; reload and retry")
+    drop_published([period])
+    cache_bus.publish("published_schedules", [period])
+    summary = {key: doc[key] for key in ("id", "period", "revision", "start_date", "end_date", "published_at", "counts")}
+    # The snapshot itself stays out of the log; the revision identifies it
+    record_change("published_schedule", doc["id"], "create", after=summary)
+    return {**summary, "warnings": doc["warnings"]}
+
+@api_router.get("/published", response_class=APIResponse)
+async def list_published(period: Optional[str] = None):
+    """Published revisions (without their payload), newest first"""
+    query = {}
+    if period:
+        check_period(period)
+        query["period"] = period
+    docs = await db.published_schedules.find(query, PUBLISH_LIST_PROJECTION).sort([("period", -1), ("revision", -1)]).to_list(500)
+    return APIResponse(docs)
+
+def published_response(request: Request, body: bytes, etag: str, cache_control: str) -> Response:
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@api_router.get("/published/{period}")
+async def get_published(period: str, request: Request):
+    """Latest published revision of a month"""
+    check_period(period)
+    cached = published_cache.get(period)
+    if cached is None:
+        generation = published_generation
+        doc = await db.published_schedules.find_one({"period": period}, {"_id": 0}, sort=[("revision", -1)])
+        if not doc:
+            raise HTTPException(status_code=404, detail="Nothing published for this period")
+        cached = (orjson.dumps(doc), published_etag(doc))
+        if generation == published_generation:
+            published_cache[period] = cached
+    body, etag = cached
+    # "Latest" can move on the next publish, so clients must revalidate
+    return published_response(request, body, etag, "no-cache")
+
+@api_router.get("/published/{period}/revisions/{revision}")
+async def get_published_revision(period: str, revision: int, request: Request):
+    """One specific published revision; these never change"""
+    check_period(period)
+    doc = await db.published_schedules.find_one({"period": period, "revision": revision}, {"_id": 0})
+    if not doc:
+        raise HTTPException(status_code=404, detail="Published revision not found")
+    return published_response(request, orjson.dumps(doc), published_etag(doc), "public, max-age=31536000, immutable")
+
+# --- Incremental Sync ---
+# Calendar clients keep a token and pull only what changed in their range:
+# schedule duties and assignments carry `updated_at`, and deletes leave a
+# tombstone that expires after SYNC_TOMBSTONE_DAYS. The token lags "now" by
+# SYNC_SKEW_SECONDS so writes still in flight when it was issued are picked
+# up next time; clients upsert by id, so resent rows are harmless.
+
+SYNC_SKEW_SECONDS = int(os.environ.get('SYNC_SKEW_SECONDS', '5'))
+SYNC_TOMBSTONE_DAYS = int(os.environ.get('SYNC_TOMBSTONE_DAYS', '7'))
+
+def tombstones_for(entity: str, docs: List[dict]) -> List[dict]:
+    deleted_at = datetime.now(timezone.utc)
+    return [{"entity": entity, "id": d["id"], "date": d["date"], "deleted_at": deleted_at} for d in docs]
+
+def parse_sync_token(token: str) -> datetime:
+    try:
+        since = datetime.fromisoformat(token)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+    if since.tzinfo is None:
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+    return since
+
+@api_router.get("/sync", response_class=APIResponse)
+async def sync_changes(start_date: str, end_date: str, since: Optional[str] = None):
+    """Schedule duties and assignments in the range changed since `since`.
+
+    Without a token, or with one older than the tombstone retention, the
+    whole range is returned with `reset: true` and the client should replace
+    its state rather than merge.
+    """
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+    now = datetime.now(timezone.utc)
+    token = (now - timedelta(seconds=SYNC_SKEW_SECONDS)).isoformat()
+    date_range = {"date": {"$gte": start_date, "$lte": end_date}}
+    since_at = parse_sync_token(since) if since else None
+    reset = since_at is None or since_at < now - timedelta(days=SYNC_TOMBSTONE_DAYS)
+    rdb = reader("sync")
+
+    if reset:
+        duties = await rdb.schedule_duties.find(date_range, SCHEDULE_DUTY_PROJECTION).to_list(None)
+        assignments = await rdb.assignments.find(date_range, ASSIGNMENT_PROJECTION).to_list(None)
+        deleted = {"schedule_duties": [], "assignments": []}
+    else:
+        # updated_at is an ISO string; compare in the same UTC format
+        changed = {**date_range, "updated_at": {"$gt": since_at.astimezone(timezone.utc).isoformat()}}
+        duties = await rdb.schedule_duties.find(changed, SCHEDULE_DUTY_PROJECTION).to_list(None)
+        assignments = await rdb.assignments.find(changed, ASSIGNMENT_PROJECTION).to_list(None)
+        tombstones = await rdb.tombstones.find(
+            {**date_range, "deleted_at": {"$gt": since_at}}, {"_id": 0, "entity": 1, "id": 1}
+        ).to_list(None)
+        # A row moved between two dates of the range is changed, not deleted
+        live = {d["id"] for d in duties} | {a["id"] for a in assignments}
+        deleted = {
+            "schedule_duties": [t["id"] for t in tombstones if t["entity"] == "schedule_duty" and t["id"] not in live],
+            "assignments": [t["id"] for t in tombstones if t["entity"] == "assignment" and t["id"] not in live],
+        }
+    return APIResponse({
+        "token": token,
+        "reset": reset,
+        "schedule_duties": duties,
+        "assignments": assignments,
+        "deleted": deleted,
+    })
+
+# --- Coverage Analysis ---
+# Compares the headcount each scheduled duty needs across the day grid
+# (single duties need one person, groups the sum of their configured
+# counts) against assigned intervals, with a sweep over start/end events.
+
+COVERAGE_DAY_START = "0600"
+COVERAGE_DAY_END = "1800"
+COVERAGE_GRANULARITIES = {"hour": 60, "30min": 30, "15min": 15}
+
+def hhmm_to_minutes(value: str) -> int:
+    return int(value[:2]) * 60 + int(value[2:4])
+
+def is_hhmm(value) -> bool:
+    """Whether a stored time can go through hhmm_to_minutes (rows written
+    before times were validated may hold "" or "08:00")"""
+    return isinstance(value, str) and re.fullmatch(HHMM_PATTERN, value) is not None
+
+def minutes_to_hhmm(value: int) -> str:
+    return f"{value // 60:02d}{value % 60:02d}"
+
+def sweep_coverage(intervals, window_start: int, window_end: int):
+    """Split [window_start, window_end) into (start, end, headcount) segments.
+
+    `intervals` are (start, end) minute pairs; each start adds one person and
+    each end removes one, so sorting the events gives the headcount between
+    consecutive event times in O(n log n). An end at or before its start is an
+    overnight shift and runs to the end of the window.
+    """
+    events = []
+    for start, end in intervals:
+        if end <= start:
+            end = window_end
+        start, end = max(start, window_start), min(end, window_end)
+        if start < end:
+            events.append((start, 1))
+            events.append((end, -1))
+    events.sort()
+    segments = []
+    headcount, cursor = 0, window_start
+    for time_point, delta in events:
+        if time_point > cursor:
+            segments.append((cursor, time_point, headcount))
+            cursor = time_point
+        headcount += delta
+    if cursor < window_end:
+        segments.append((cursor, window_end, headcount))
+    return segments
+
+def coverage_gaps(intervals, required: int, window_start: int, window_end: int):
+    """Merged (start, end, assigned) segments where headcount is below `required`"""
+    gaps = []
+    for start, end, headcount in sweep_coverage(intervals, window_start, window_end):
+        if headcount >= required:
+            continue
+        if gaps and gaps[-1][1] == start and gaps[-1][2] == headcount:
+            gaps[-1] = (gaps[-1][0], end, headcount)
+        else:
+            gaps.append((start, end, headcount))
+    return gaps
+
+def analyse_coverage(duties, required_by_duty: dict, assignments, bucket_minutes: int) -> dict:
+    """Gap list and per-day heatmap from plain duty/assignment dicts"""
+    window_start, window_end = hhmm_to_minutes(COVERAGE_DAY_START), hhmm_to_minutes(COVERAGE_DAY_END)
+    bucket_count = -(-(window_end - window_start) // bucket_minutes)
+    intervals_by_duty: dict = {}
+    for a in assignments:
+        intervals_by_duty.setdefault(a["schedule_duty_id"], []).append(
+            (hhmm_to_minutes(a["start_time"]), hhmm_to_minutes(a["end_time"]))
+        )
+
+    gaps, heatmap = [], {}
+    for duty in sorted(duties, key=lambda d: (d["date"], d.get("duty_code", ""))):
+        required = required_by_duty.get(duty["id"], 0)
+        if required <= 0:
+            continue
+        day_heat = heatmap.setdefault(duty["date"], [0.0] * bucket_count)
+        for start, end, assigned in coverage_gaps(intervals_by_duty.get(duty["id"], []), required, window_start, window_end):
+            missing = required - assigned
+            gaps.append({
+                "date": duty["date"],
+                "schedule_duty_id": duty["id"],
+                "duty_code": duty.get("duty_code", ""),
+                "duty_name": duty.get("duty_name", ""),
+                "start_time": minutes_to_hhmm(start),
+                "end_time": minutes_to_hhmm(end),
+                "required": required,
+                "assigned": assigned,
+                "missing": missing,
+            })
+            # Heat is missing headcount averaged over each bucket
+            for bucket in range((start - window_start) // bucket_minutes, (end - 1 - window_start) // bucket_minutes + 1):
+                bucket_start = window_start + bucket * bucket_minutes
+                overlap = min(end, bucket_start + bucket_minutes) - max(start, bucket_start)
+                day_heat[bucket] += missing * overlap / bucket_minutes
+    for day_heat in heatmap.values():
+        for i, value in enumerate(day_heat):
+            day_heat[i] = round(value, 2)
+    return {"gaps": gaps, "heatmap": heatmap}
+
+async def required_headcounts(rdb, duties) -> dict:
+    """Required people per schedule duty: 1 for singles, summed config counts for groups"""
+    group_ids = [d["id"] for d in duties if d.get("duty_type") == "group"]
+    configs = await rdb.duty_group_configs.find(
+        {"schedule_duty_id": {"$in": group_ids}}, {"_id": 0, "schedule_duty_id": 1, "duties": 1}
+    ).to_list(None) if group_ids else []
+    return required_from_configs(duties, configs)
+
+def required_from_configs(duties, configs) -> dict:
+    required = {d["id"]: 1 for d in duties if d.get("duty_type") != "group"}
+    required.update({c["schedule_duty_id"]: sum(item["count"] for item in c["duties"]) for c in configs})
+    return required
+
+@api_router.get("/coverage", response_class=APIResponse)
+async def get_coverage(start_date: str, end_date: str, granularity: str = "hour"):
+    """Under-staffed intervals across the day grid, plus a per-day heatmap"""
+    if granularity not in COVERAGE_GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of: {', '.join(COVERAGE_GRANULARITIES)}")
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+    rdb = reader("coverage")
+    date_range = {"$gte": start_date, "$lte": end_date}
+    duties = await rdb.schedule_duties.find(
+        {"date": date_range},
+        {"_id": 0, "id": 1, "duty_code": 1, "duty_name": 1, "duty_type": 1, "date": 1},
+    ).to_list(None)
+    assignments = await rdb.assignments.find(
+        {"date": date_range},
+        {"_id": 0, "schedule_duty_id": 1, "start_time": 1, "end_time": 1},
+    ).to_list(None)
+    required = await required_headcounts(rdb, duties)
+    result = analyse_coverage(duties, required, assignments, COVERAGE_GRANULARITIES[granularity])
+    return APIResponse({
+        "start_date": start_date,
+        "end_date": end_date,
+        "granularity": granularity,
+        "day_start": COVERAGE_DAY_START,
+        "day_end": COVERAGE_DAY_END,
+        **result,
+    })
+
+# --- Scenarios ---
+# What-if sandboxes. A scenario loads the schedule duties, assignments and
+# group configs of a date window once and keeps them in this worker's memory;
+# edits go to a copy-on-write overlay, so planners can iterate on coverage
+# and rule checks without touching the database. Commit writes the diff back
+# with one bulk_write per collection, each row conditioned on the version it
+# was loaded at. Idle scenarios are evicted least recently used first.
+# Scenarios are per worker: multi-worker deployments need sticky routing.
+
+SCENARIO_MAX_COUNT = int(os.environ.get('SCENARIO_MAX_COUNT', '20'))
+SCENARIO_IDLE_SECONDS = int(os.environ.get('SCENARIO_IDLE_SECONDS', '1800'))
+SCENARIO_MAX_DAYS = int(os.environ.get('SCENARIO_MAX_DAYS', '92'))
+SCENARIO_ENTITIES = {"schedule_duties": "schedule_duty", "duty_group_configs": "duty_group_config", "assignments": "assignment"}
+
+class Scenario:
+    """Copy-on-write view of one date window.
+
+    `base` holds documents as loaded and is never modified; `overlay` holds
+    every document the scenario created or changed (a new dict) or deleted
+    (None), by collection and id. `context` holds assignments just outside
+    the window, read-only, so rest and weekly rules see neighbouring shifts.
+    """
+
+    def __init__(self, start_date: str, end_date: str, base: dict, context: List[dict]):
+        self.id = str(uuid.uuid4())
+        self.start_date = start_date
+        self.end_date = end_date
+        self.base = base
+        self.context = context
+        self.overlay = {name: {} for name in base}
+        self.created_at = utc_now()
+        self.touched = time.monotonic()
+
+    def get(self, collection: str, doc_id: str) -> Optional[dict]:
+        overlay = self.overlay[collection]
+        if doc_id in overlay:
+            return overlay[doc_id]
+        return self.base[collection].get(doc_id)
+
+    def rows(self, collection: str) -> List[dict]:
+        overlay = self.overlay[collection]
+        rows = [doc for doc_id, doc in self.base[collection].items() if doc_id not in overlay]
+        rows.extend(doc for doc in overlay.values() if doc is not None)
+        return rows
+
+    def put(self, collection: str, doc: dict):
+        self.overlay[collection][doc["id"]] = doc
+
+    def delete(self, collection: str, doc_id: str):
+        if doc_id in self.base[collection]:
+            self.overlay[collection][doc_id] = None
+        else:
+            self.overlay[collection].pop(doc_id, None)
+
+    def in_window(self, date: str) -> bool:
+        return self.start_date <= date <= self.end_date
+
+    def config_for(self, schedule_duty_id: str) -> Optional[dict]:
+        return next((c for c in self.rows("duty_group_configs") if c["schedule_duty_id"] == schedule_duty_id), None)
+
+    def diff(self) -> dict:
+        """{collection: (created docs, [(base, new)] updates, deleted base docs)}"""
+        result = {}
+        for collection, overlay in self.overlay.items():
+            base = self.base[collection]
+            created = [doc for doc_id, doc in overlay.items() if doc is not None and doc_id not in base]
+            updated = [(base[doc_id], doc) for doc_id, doc in overlay.items()
+                       if doc is not None and doc_id in base and doc != base[doc_id]]
+            deleted = [base[doc_id] for doc_id, doc in overlay.items() if doc is None]
+            result[collection] = (created, updated, deleted)
+        return result
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "start_date": self.start_date,
+            "end_date": self.end_date,
+            "created_at": self.created_at,
+            "counts": {name: len(self.rows(name)) for name in self.base},
+            "changes": {
+                name: {"created": len(created), "updated": len(updated), "deleted": len(deleted)}
+                for name, (created, updated, deleted) in self.diff().items()
+            },
+        }
+
+class ScenarioStore:
+    """Scenarios in least-recently-used order, evicted when idle or over capacity"""
+
+    def __init__(self, capacity: int, idle_seconds: int):
+        self.capacity = capacity
+        self.idle_seconds = idle_seconds
+        self.scenarios: OrderedDict = OrderedDict()
+
+    def evict_idle(self):
+        cutoff = time.monotonic() - self.idle_seconds
+        while self.scenarios and next(iter(self.scenarios.values())).touched < cutoff:
+            self.scenarios.popitem(last=False)
+
+    def add(self, scenario: Scenario):
+        self.evict_idle()
+        self.scenarios[scenario.id] = scenario
+        while len(self.scenarios) > self.capacity:
+            self.scenarios.popitem(last=False)
+
+    def get(self, scenario_id: str) -> Scenario:
+        self.evict_idle()
+        scenario = self.scenarios.get(scenario_id)
+        if scenario is None:
+            raise HTTPException(status_code=404, detail="Scenario not found or expired")
+        self.scenarios.move_to_end(scenario_id)
+        scenario.touched = time.monotonic()
+        return scenario
+
+    def drop(self, scenario_id: str) -> bool:
+        return self.scenarios.pop(scenario_id, None) is not None
+
+scenario_store = ScenarioStore(SCENARIO_MAX_COUNT, SCENARIO_IDLE_SECONDS)
+
+async def load_scenario(start_date: str, end_date: str) -> Scenario:
+    lo, hi = shift_window([start_date, end_date], timeline_margin_days(await get_compiled_rules()))
+    window = {"date": {"$gte": start_date, "$lte": end_date}}
+    duties, nearby = await asyncio.gather(
+        db.schedule_duties.find(window, {"_id": 0}).to_list(None),
+        db.assignments.find({"date": {"$gte": lo, "$lte": hi}}, {"_id": 0}).to_list(None),
+    )
+    configs = await db.duty_group_configs.find(
+        {"schedule_duty_id": {"$in": [d["id"] for d in duties]}}, {"_id": 0}
+    ).to_list(None)
+    base = {
+        "schedule_duties": {d["id"]: d for d in duties},
+        "duty_group_configs": {c["id"]: c for c in configs},
+        "assignments": {a["id"]: a for a in nearby if start_date <= a["date"] <= end_date},
+    }
+    context = [a for a in nearby if not start_date <= a["date"] <= end_date]
+    return Scenario(start_date, end_date, base, context)
+
+def filter_dates(rows: List[dict], date: Optional[str], start_date: Optional[str], end_date: Optional[str]) -> List[dict]:
+    if date:
+        return [r for r in rows if r["date"] == date]
+    if start_date and end_date:
+        return [r for r in rows if start_date <= r["date"] <= end_date]
+    return rows
+
+def scenario_doc(scenario: Scenario, collection: str, doc_id: str, label: str) -> dict:
+    doc = scenario.get(collection, doc_id)
+    if doc is None:
+        raise HTTPException(status_code=404, detail=f"{label} not found")
+    return doc
+
+def check_in_window(scenario: Scenario, date: str):
+    if not scenario.in_window(date):
+        raise HTTPException(status_code=400, detail=f"date must be within the scenario ({scenario.start_date} to {scenario.end_date})")
+
+async def validate_scenario(scenario: Scenario, rules: list) -> dict:
+    return await evaluate_range(
+        rules, [*scenario.context, *scenario.rows("assignments")], scenario.start_date, scenario.end_date,
+        schedule_duties=scenario.rows("schedule_duties"),
+    )
+
+def scenario_commit_filter(collection: str, base: dict) -> dict:
+    """Match the row as it was loaded, so concurrent edits turn into a 409"""
+    if collection == "schedule_duties":
+        return {"id": base["id"], "updated_at": base.get("updated_at")}
+    return {"id": base["id"], **version_filter(base.get("version", 0))}
+
+async def commit_scenario(scenario: Scenario) -> dict:
+    diff = scenario.diff()
+    created_assignments, updated_assignments, deleted_assignments = diff["assignments"]
+    rules = await get_compiled_rules()
+    changed = {a["id"] for a in created_assignments} | {new["id"] for _, new in updated_assignments}
+    if rules and changed:
+        report = await validate_scenario(scenario, rules)
+        errors = [v for v in report["violations"] if v["severity"] == "error" and v["assignment_id"] in changed]
+        if errors:
+            raise HTTPException(status_code=422, detail={
+                "message": "Scenario breaks scheduling rules",
+                "violations": errors[:50],
+            })
+
+    now = utc_now()
+    writes, events, dates = {}, [], set()
+    for collection, (created, updated, deleted) in diff.items():
+        entity = SCENARIO_ENTITIES[collection]
+        operations = []
+        for doc in created:
+            doc = {**doc, "updated_at": now} if "updated_at" in doc else {**doc}
+            operations.append(InsertOne(doc))
+            events.append((entity, doc["id"], "create", None, doc))
+        for base, new in updated:
+            new = {**new}
+            if "updated_at" in new:
+                new["updated_at"] = now
+            if entity in VERSIONED_ENTITIES:
+                new["version"] = base.get("version", 0) + 1
+            operations.append(ReplaceOne(scenario_commit_filter(collection, base), new))
+            events.append((entity, new["id"], "update", base, new))
+        for base in deleted:
+            operations.append(DeleteOne(scenario_commit_filter(collection, base)))
+            events.append((entity, base["id"], "delete", base, None))
+        if operations:
+            writes[collection] = (operations, len(updated), len(deleted))
+        for doc in [*created, *deleted, *(d for pair in updated for d in pair)]:
+            if "date" in doc:
+                dates.add(doc["date"])
+            else:  # group configs count towards their duty's day
+                duty = scenario.base["schedule_duties"].get(doc["schedule_duty_id"]) or scenario.get("schedule_duties", doc["schedule_duty_id"])
+                if duty:
+                    dates.add(duty["date"])
+
+    counters = Counter()
+    for a in created_assignments:
+        counters[a["personnel_id"]] += 1
+    for a in deleted_assignments:
+        counters[a["personnel_id"]] -= 1
+    for base, new in updated_assignments:
+        counters[base["personnel_id"]] -= 1
+        counters[new["personnel_id"]] += 1
+    tombstones = [
+        *tombstones_for("schedule_duty", diff["schedule_duties"][2]),
+        *tombstones_for("assignment", deleted_assignments),
+        # Rows moved to another date disappear from syncs of their old date
+        *tombstones_for("assignment", [base for base, new in updated_assignments if base["date"] != new["date"]]),
+    ]
+
+    async def write(session):
+        for collection, (operations, replaced, removed) in writes.items():
+            try:
+                result = await db[collection].bulk_write(operations, ordered=True, session=session)
+            except BulkWriteError:
+                raise HTTPException(status_code=409, detail="The schedule changed since the scenario was loaded; reload and retry")
+            if result.matched_count != replaced or result.deleted_count != removed:
+                raise HTTPException(status_code=409, detail="The schedule changed since the scenario was loaded; reload and retry")
+        if tombstones:
+            await db.tombstones.insert_many(tombstones, session=session)
+        updates = [UpdateOne({"id": pid}, {"$inc": {"total_duties": delta}}) for pid, delta in counters.items() if delta]
+        if updates:
+            await db.personnel.bulk_write(updates, ordered=False, session=session)
+
+    if writes:
+        await run_in_transaction(write)
+    for entity, entity_id, action, before, after in events:
+        record_change(entity, entity_id, action, before=before, after=after)
+    if dates:
+        invalidate_calendar_summary(*dates)
+    scenario_store.drop(scenario.id)
+    return {"committed": True, "changes": {
+        name: {"created": len(created), "updated": len(updated), "deleted": len(deleted)}
+        for name, (created, updated, deleted) in diff.items()
+    }}
+
+@api_router.post("/scenarios", response_class=APIResponse)
+async def create_scenario(input: ScenarioCreate):
+    """Load a date window into a new in-memory scenario"""
+    try:
+        days = (datetime.strptime(input.end_date, "%Y-%m-%d") - datetime.strptime(input.start_date, "%Y-%m-%d")).days + 1
+    except ValueError:
+        raise HTTPException(status_code=400, detail="start_date and end_date must be YYYY-MM-DD")
+    if not 0 < days <= SCENARIO_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"end_date must be on or after start_date and within {SCENARIO_MAX_DAYS} days")
+    scenario = await load_scenario(input.start_date, input.end_date)
+    scenario_store.add(scenario)
+    return APIResponse(scenario.summary())
+
+@api_router.get("/scenarios/{scenario_id}", response_class=APIResponse)
+async def get_scenario(scenario_id: str):
+    return APIResponse(scenario_store.get(scenario_id).summary())
+
+@api_router.delete("/scenarios/{scenario_id}")
+async def discard_scenario(scenario_id: str):
+    if not scenario_store.drop(scenario_id):
+        raise HTTPException(status_code=404, detail="Scenario not found or expired")
+    return {"deleted": True}
+
+@api_router.get("/scenarios/{scenario_id}/schedule-duties", response_class=APIResponse)
+async def get_scenario_schedule_duties(scenario_id: str, date: Optional[str] = None,
+                                       start_date: Optional[str] = None, end_date: Optional[str] = None):
+    scenario = scenario_store.get(scenario_id)
+    return APIResponse(filter_dates(scenario.rows("schedule_duties"), date, start_date, end_date))
+
+@api_router.post("/scenarios/{scenario_id}/schedule-duties", response_class=APIResponse)
+async def add_scenario_schedule_duty(scenario_id: str, input: ScheduleDutyCreate):
+    scenario = scenario_store.get(scenario_id)
+    check_in_window(scenario, input.date)
+    duty = ScheduleDuty(**input.model_dump()).model_dump()
+    key = schedule_duty_key(duty)
+    existing = next((d for d in scenario.rows("schedule_duties") if schedule_duty_key(d) == key), None)
+    if existing:
+        return APIResponse(existing)
+    scenario.put("schedule_duties", duty)
+    return APIResponse(duty)
+
+@api_router.delete("/scenarios/{scenario_id}/schedule-duties/{duty_id}")
+async def remove_scenario_schedule_duty(scenario_id: str, duty_id: str):
+    scenario = scenario_store.get(scenario_id)
+    scenario_doc(scenario, "schedule_duties", duty_id, "Schedule duty")
+    assignments = [a["id"] for a in scenario.rows("assignments") if a["schedule_duty_id"] == duty_id]
+    for assignment_id in assignments:
+        scenario.delete("assignments", assignment_id)
+    config = scenario.config_for(duty_id)
+    if config:
+        scenario.delete("duty_group_configs", config["id"])
+    scenario.delete("schedule_duties", duty_id)
+    return {"deleted": True, "assignments": len(assignments)}
+
+@api_router.get("/scenarios/{scenario_id}/duty-group-configs/{schedule_duty_id}", response_model=Optional[DutyGroupConfig])
+async def get_scenario_duty_group_config(scenario_id: str, schedule_duty_id: str):
+    return scenario_store.get(scenario_id).config_for(schedule_duty_id)
+
+@api_router.post("/scenarios/{scenario_id}/duty-group-configs", response_model=DutyGroupConfig)
+async def save_scenario_duty_group_config(scenario_id: str, input: DutyGroupConfigCreate):
+    scenario = scenario_store.get(scenario_id)
+    scenario_doc(scenario, "schedule_duties", input.schedule_duty_id, "Schedule duty")
+    config = scenario.config_for(input.schedule_duty_id)
+    if input.expected_version and (not config or config.get("version", 0) != input.expected_version):
+        raise HTTPException(status_code=409, detail="Duty group config was modified by another user; reload and retry")
+    if config is None:
+        config = DutyGroupConfig(schedule_duty_id=input.schedule_duty_id).model_dump()
+    config = {**config, "duties": [d.model_dump() for d in input.duties]}
+    scenario.put("duty_group_configs", config)
+    return config
+
+@api_router.get("/scenarios/{scenario_id}/assignments", response_class=APIResponse)
+async def get_scenario_assignments(scenario_id: str, date: Optional[str] = None,
+                                   start_date: Optional[str] = None, end_date: Optional[str] = None):
+    scenario = scenario_store.get(scenario_id)
+    return APIResponse(filter_dates(scenario.rows("assignments"), date, start_date, end_date))
+
+@api_router.post("/scenarios/{scenario_id}/assignments", response_class=APIResponse)
+async def create_scenario_assignment(scenario_id: str, input: AssignmentCreate):
+    """Add an assignment to the scenario; rules are reported by /validate, not enforced"""
+    scenario = scenario_store.get(scenario_id)
+    scenario_doc(scenario, "schedule_duties", input.schedule_duty_id, "Schedule duty")
+    check_in_window(scenario, input.date)
+    assignment = Assignment(**input.model_dump()).model_dump()
+    scenario.put("assignments", assignment)
+    return APIResponse(assignment)
+
+@api_router.put("/scenarios/{scenario_id}/assignments/{assignment_id}", response_class=APIResponse)
+async def update_scenario_assignment(scenario_id: str, assignment_id: str, input: AssignmentUpdate):
+    scenario = scenario_store.get(scenario_id)
+    old = scenario_doc(scenario, "assignments", assignment_id, "Assignment")
+    if input.expected_version is not None and old.get("version", 0) != input.expected_version:
+        raise HTTPException(status_code=409, detail="Assignment was modified by another user; reload and retry")
+    assignment = {**old, **input.model_dump(include=set(PERSONNEL_FIELDS))}
+    scenario.put("assignments", assignment)
+    return APIResponse(assignment)
+
+def move_scenario_assignments(scenario: Scenario, moves: List[AssignmentMoveItem]) -> List[dict]:
+    ids = [m.id for m in moves]
+    if len(set(ids)) != len(ids):
+        raise HTTPException(status_code=400, detail="Each assignment may only be moved once per request")
+    planned = []
+    for move in moves:
+        old = scenario_doc(scenario, "assignments", move.id, "Assignment")
+        if date_only_move(old, move):
+            source = scenario.get("schedule_duties", old["schedule_duty_id"])
+            key = source and schedule_duty_key({**source, "date": move.date})
+            target = next((d for d in scenario.rows("schedule_duties") if key and schedule_duty_key(d) == key), None)
+        else:
+            target = scenario.get("schedule_duties", move.schedule_duty_id) if move.schedule_duty_id else None
+        moved = {**old, **move_changes(old, move, target)}
+        check_in_window(scenario, moved["date"])
+        planned.append(moved)
+    for moved in planned:
+        scenario.put("assignments", moved)
+    return planned
+
+@api_router.patch("/scenarios/{scenario_id}/assignments/move", response_class=APIResponse)
+async def move_scenario_assignment_batch(scenario_id: str, input: AssignmentMoveBatch):
+    if not input.moves:
+        raise HTTPException(status_code=400, detail="No moves given")
+    return APIResponse(move_scenario_assignments(scenario_store.get(scenario_id), input.moves))
+
+@api_router.patch("/scenarios/{scenario_id}/assignments/{assignment_id}/move", response_class=APIResponse)
+async def move_scenario_assignment(scenario_id: str, assignment_id: str, input: AssignmentMove):
+    moves = [AssignmentMoveItem(id=assignment_id, **input.model_dump())]
+    return APIResponse(move_scenario_assignments(scenario_store.get(scenario_id), moves)[0])
+
+@api_router.delete("/scenarios/{scenario_id}/assignments/{assignment_id}")
+async def delete_scenario_assignment(scenario_id: str, assignment_id: str):
+    scenario = scenario_store.get(scenario_id)
+    scenario_doc(scenario, "assignments", assignment_id, "Assignment")
+    scenario.delete("assignments", assignment_id)
+    return {"deleted": True}
+
+@api_router.get("/scenarios/{scenario_id}/coverage", response_class=APIResponse)
+async def get_scenario_coverage(scenario_id: str, granularity: str = "hour"):
+    """Coverage gaps and heatmap for the scenario, as GET /api/coverage"""
+    if granularity not in COVERAGE_GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of: {', '.join(COVERAGE_GRANULARITIES)}")
+    scenario = scenario_store.get(scenario_id)
+    duties = scenario.rows("schedule_duties")
+    required = required_from_configs(duties, scenario.rows("duty_group_configs"))
+    result = analyse_coverage(duties, required, scenario.rows("assignments"), COVERAGE_GRANULARITIES[granularity])
+    return APIResponse({
+        "start_date": scenario.start_date,
+        "end_date": scenario.end_date,
+        "granularity": granularity,
+        "day_start": COVERAGE_DAY_START,
+        "day_end": COVERAGE_DAY_END,
+        **result,
+    })
+
+@api_router.get("/scenarios/{scenario_id}/validate", response_class=APIResponse)
+async def validate_scenario_route(scenario_id: str):
+    """Rule violations in the scenario, as GET /api/validate"""
+    scenario = scenario_store.get(scenario_id)
+    return APIResponse(await validate_scenario(scenario, await get_compiled_rules()))
+
+@api_router.get("/scenarios/{scenario_id}/diff", response_class=APIResponse)
+async def get_scenario_diff(scenario_id: str):
+    """Created and deleted documents, and changed fields as [old, new]"""
+    diff = scenario_store.get(scenario_id).diff()
+    return APIResponse({
+        name: {
+            "created": created,
+            "updated": [{"id": new["id"], "changes": diff_documents(base, new)} for base, new in updated],
+            "deleted": [base["id"] for base in deleted],
+        }
+        for name, (created, updated, deleted) in diff.items()
+    })
+
+@api_router.post("/scenarios/{scenario_id}/commit", response_class=APIResponse)
+async def commit_scenario_route(scenario_id: str):
+    """Write the scenario's changes; 422 if a changed assignment breaks an
+    error rule, 409 if any touched row changed since the scenario was loaded"""
+    return APIResponse(await commit_scenario(scenario_store.get(scenario_id)))
+
+# --- Background Jobs ---
+# Long-running bulk operations run in-process on an asyncio runner and are
+# tracked in the `jobs` collection. Each running job holds a lease that it
+# renews while alive; on startup, queued jobs and jobs whose lease expired
+# (their worker died) are claimed and restarted when safe to re-run.
+
+JOB_CONCURRENCY = int(os.environ.get('JOB_CONCURRENCY', '2'))
+JOB_LEASE_SECONDS = int(os.environ.get('JOB_LEASE_SECONDS', '60'))
+JOB_PROGRESS_INTERVAL = 0.5  # seconds between progress writes
+
+class JobCancelled(Exception):
+    pass
+
+def utc_now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+def lease_deadline() -> str:
+    return (datetime.now(timezone.utc) + timedelta(seconds=JOB_LEASE_SECONDS)).isoformat()
+
+class JobRunner:
+    """Bounded-concurrency asyncio runner for registered job kinds"""
+
+    def __init__(self, concurrency: int):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.handlers = {}
+        self.tasks = {}
+
+    def register(self, kind: str, restartable: bool = False):
+        """Register a handler `async fn(payload, progress) -> dict`.
+
+        Only restartable (idempotent) kinds are re-run when a worker died
+        mid-job; others are marked failed so they are never half-applied twice.
+        """
+        def decorator(fn):
+            self.handlers[kind] = (fn, restartable)
+            return fn
+        return decorator
+
+    async def submit(self, kind: str, payload: dict) -> Job:
+        job = Job(kind=kind, payload=payload)
+        await db.jobs.insert_one(job.model_dump())
+        self.start(job.id)
+        return job
+
+    def start(self, job_id: str):
+        task = asyncio.create_task(self.run(job_id))
+        self.tasks[job_id] = task
+        task.add_done_callback(lambda _: self.tasks.pop(job_id, None))
+
+    async def run(self, job_id: str):
+        async with self.semaphore:
+            job = await db.jobs.find_one_and_update(
+                {"id": job_id, "status": "queued"},
+                {"$set": {"status": "running", "started_at": utc_now(), "lease_until": lease_deadline()}},
+                {"_id": 0},
+                return_document=ReturnDocument.AFTER,
+            )
+            if not job:
+                return  # cancelled while queued, or claimed elsewhere
+            handler, _ = self.handlers[job["kind"]]
+            heartbeat = asyncio.create_task(self.heartbeat(job_id))
+            last_write = 0.0
+
+            async def progress(done: int, total: int):
+                nonlocal last_write
+                now = asyncio.get_running_loop().time()
+                if now - last_write < JOB_PROGRESS_INTERVAL and done < total:
+                    return
+                last_write = now
+                updated = await db.jobs.find_one_and_update(
+                    {"id": job_id},
+                    {"$set": {"done": done, "total": total}},
+                    {"_id": 0, "cancel_requested": 1},
+                )
+                if updated and updated.get("cancel_requested"):
+                    raise JobCancelled()
+
+            try:
+                result = await handler(job["payload"], progress)
+                await self.finish(job_id, "succeeded", result=result)
+            except (JobCancelled, asyncio.CancelledError) as exc:
+                cancelled = await db.jobs.find_one({"id": job_id}, {"_id": 0, "cancel_requested": 1})
+                if cancelled and cancelled.get("cancel_requested"):
+                    await self.finish(job_id, "cancelled")
+                elif isinstance(exc, asyncio.CancelledError):
+                    raise  # shutdown: leave the lease to expire for recovery
+            except Exception as exc:
+                logger.exception(f"Job {job_id} ({job['kind']}) failed")
+                await self.finish(job_id, "failed", error=str(exc))
+            finally:
+                heartbeat.cancel()
+
+    async def heartbeat(self, job_id: str):
+        while True:
+            await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+            await db.jobs.update_one({"id": job_id, "status": "running"}, {"$set": {"lease_until": lease_deadline()}})
+
+    async def finish(self, job_id: str, status: str, result: Optional[dict] = None, error: Optional[str] = None):
+        await db.jobs.update_one({"id": job_id}, {"$set": {
+            "status": status, "result": result, "error": error,
+            "finished_at": utc_now(), "lease_until": None,
+        }})
+
+    async def cancel(self, job_id: str) -> Optional[dict]:
+        job = await db.jobs.find_one_and_update(
+            {"id": job_id, "status": {"$in": ["queued", "running"]}},
+            {"$set": {"cancel_requested": True}},
+            {"_id": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+        if not job:
+            return await db.jobs.find_one({"id": job_id}, {"_id": 0})
+        if job["status"] == "queued":
+            await db.jobs.update_one({"id": job_id, "status": "queued"}, {"$set": {"status": "cancelled", "finished_at": utc_now()}})
+        elif job_id in self.tasks:
+            self.tasks[job_id].cancel()
+        # A job running on another worker stops at its next progress report
+        return await db.jobs.find_one({"id": job_id}, {"_id": 0})
+
+    async def recover(self):
+        """Claim queued jobs and jobs whose worker died (expired lease)"""
+        stale = {"status": "running", "lease_until": {"$lt": utc_now()}}
+        async for job in db.jobs.find({"$or": [{"status": "queued"}, stale]}, {"_id": 0, "id": 1, "kind": 1, "status": 1}):
+            handler = self.handlers.get(job["kind"])
+            if job["status"] == "running":
+                if handler and handler[1]:
+                    claimed = await db.jobs.update_one({"id": job["id"], **stale}, {"$set": {"status": "queued"}})
+                else:
+                    claimed = await db.jobs.update_one({"id": job["id"], **stale}, {"$set": {
+                        "status": "failed", "error": "Interrupted by worker restart", "finished_at": utc_now(),
+                    }})
+                    continue
+                if not claimed.modified_count:
+                    continue
+            elif not handler:
+                continue
+            self.start(job["id"])
+            logger.info(f"Recovered job {job['id']} ({job['kind']})")
+
+job_runner = JobRunner(JOB_CONCURRENCY)
+
+@job_runner.register("recurring_assignments")
+async def recurring_assignments_job(payload: dict, progress) -> dict:
+    result = await apply_recurring_assignments(RecurringAssignmentCreate(**payload), progress)
+    # The job result only carries counts; clients re-read the calendar
+    return {"created_count": result["created_count"], "dates": result["dates"]}
+
+@job_runner.register("rotations")
+async def rotations_job(payload: dict, progress) -> dict:
+    result = await apply_rotation(RotationCreate(**payload), progress)
+    return {k: v for k, v in result.items() if k != "schedule_duty_ids"}
+
+async def reconcile_total_duties(progress=None) -> dict:
+    """Recompute personnel.total_duties from the assignments collection"""
+    counts = await db.assignments.aggregate([
+        {"$group": {"_id": "$personnel_id", "count": {"$sum": 1}}},
+    ]).to_list(None)
+    by_person = {row["_id"]: row["count"] for row in counts}
+    personnel = await db.personnel.find({}, {"_id": 0, "id": 1, "total_duties": 1}).to_list(None)
+    updates = [
+        UpdateOne({"id": p["id"]}, {"$set": {"total_duties": by_person.get(p["id"], 0)}})
+        for p in personnel if p.get("total_duties") != by_person.get(p["id"], 0)
+    ]
+    if updates:
+        await db.personnel.bulk_write(updates, ordered=False)
+    if progress:
+        await progress(len(personnel), len(personnel))
+    return {"checked": len(personnel), "corrected": len(updates)}
+
+@job_runner.register("reconcile_counters", restartable=True)
+async def reconcile_counters_job(payload: dict, progress) -> dict:
+    return await reconcile_total_duties(progress)
+
+@job_runner.register("rebuild_day_buckets", restartable=True)
+async def rebuild_day_buckets_job(payload: dict, progress) -> dict:
+    return await rebuild_day_buckets(payload.get("start_date"), payload.get("end_date"), progress)
+
+@job_runner.register("cascade_delete", restartable=True)
+async def cascade_delete_job(payload: dict, progress) -> dict:
+    query = cascade_delete_query(ScheduleDutyCascadeDelete(**payload))
+    return await cascade_delete_schedule_duties(query, progress)
+
+def job_accepted(job: Job):
+    return APIResponse({"job_id": job.id, "status": job.status}, status_code=202)
+
+@api_router.post("/jobs/recurring-assignments", status_code=202)
+async def submit_recurring_assignments_job(input: RecurringAssignmentCreate):
+    """Queue a recurrence expansion; poll GET /api/jobs/{id} for progress"""
+    return job_accepted(await job_runner.submit("recurring_assignments", input.model_dump()))
+
+@api_router.post("/jobs/rotations", status_code=202)
+async def submit_rotations_job(input: RotationCreate):
+    """Queue a rotation expansion; poll GET /api/jobs/{id} for progress"""
+    rotation_cycle(input)  # reject bad patterns up front
+    return job_accepted(await job_runner.submit("rotations", input.model_dump()))
+
+@api_router.post("/jobs/reconcile-counters", status_code=202)
+async def submit_reconcile_counters_job():
+    """Queue a recount of personnel total_duties from assignments"""
+    return job_accepted(await job_runner.submit("reconcile_counters", {}))
+
+@api_router.post("/jobs/rebuild-day-buckets", status_code=202)
+async def submit_rebuild_day_buckets_job(input: DayBucketRebuild):
+    """Queue a rebuild of the day buckets in `start_date` + `end_date` (all days if omitted)"""
+    if bool(input.start_date) != bool(input.end_date):
+        raise HTTPException(status_code=400, detail="Provide both start_date and end_date, or neither")
+    return job_accepted(await job_runner.submit("rebuild_day_buckets", {"start_date": input.start_date, "end_date": input.end_date}))
+
+@api_router.post("/jobs/cascade-delete", status_code=202)
+async def submit_cascade_delete_job(input: ScheduleDutyCascadeDelete):
+    """Queue a cascade delete for large id lists or date ranges"""
+    cascade_delete_query(input)  # reject empty/partial filters up front
+    return job_accepted(await job_runner.submit("cascade_delete", input.model_dump()))
+
+@api_router.get("/jobs/{job_id}", response_model=Job)
+async def get_job(job_id: str):
+    job = await db.jobs.find_one({"id": job_id}, {"_id": 0, "payload": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@api_router.post("/jobs/{job_id}/cancel", response_model=Job)
+async def cancel_job(job_id: str):
+    job = await job_runner.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+# --- Request Batching ---
+# POST /api/batch runs an ordered list of sub-requests against the other
+# routes in-process, so a panel interaction costs one network round trip.
+# Runs of consecutive GETs execute concurrently; writes run one at a time
+# in order. In atomic mode the first failed sub-request stops the batch and
+# the writes before it are undone from the change events they recorded.
+# Each undo only applies while the row still holds what the batch wrote; rows
+# someone else changed in between are left alone and listed in `conflicts`.
+# Atomic batches may not include writes that record no change events (job
+# submissions, in-memory scenarios), since those could not be undone.
+
+BATCH_MAX_REQUESTS = int(os.environ.get('BATCH_MAX_REQUESTS', '50'))
+BATCH_METHODS = {"GET", "POST", "PUT", "PATCH", "DELETE"}
+BATCH_NOT_REVERTIBLE = ("/api/jobs", "/api/scenarios")
+
+batch_client = httpx.AsyncClient(
+    transport=httpx.ASGITransport(app=app, raise_app_exceptions=False),
+    base_url="http://batch",
+    # Responses stay in-process; compressing them would only cost CPU
+    headers={"Accept-Encoding": "identity"},
+    timeout=None,
+)
+
+def batch_result(response: httpx.Response) -> dict:
+    if not response.content:
+        body = None
+    elif response.headers.get("content-type", "").startswith("application/json"):
+        body = response.json()
+    else:
+        body = response.text
+    return {"status": response.status_code, "body": body}
+
+async def run_sub_request(item: BatchItem) -> dict:
+    response = await batch_client.request(
+        item.method,
+        item.path,
+        params=item.params or None,
+        json=item.body,
+        headers={"X-Actor": current_actor.get()},
+    )
+    return batch_result(response)
+
+async def run_write(item: BatchItem, events: list) -> dict:
+    """Run one write sub-request, collecting the change events it records"""
+    token = change_capture.set([])
+    try:
+        result = await run_sub_request(item)
+        events.extend(change_capture.get())
+    finally:
+        change_capture.reset(token)
+    return result
+
+@api_router.post("/batch")
+async def run_batch(input: BatchRequest):
+    """Execute sub-requests in order; see the section comment for semantics"""
+    if not input.requests:
+        raise HTTPException(status_code=400, detail="No requests given")
+    if len(input.requests) > BATCH_MAX_REQUESTS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_REQUESTS} requests per batch")
+    for item in input.requests:
+        if item.method not in BATCH_METHODS:
+            raise HTTPException(status_code=400, detail=f"Unsupported method: {item.method}")
+        if not item.path.startswith("/api/") or item.path.startswith("/api/batch"):
+            raise HTTPException(status_code=400, detail=f"Unsupported path: {item.path}")
+        if input.atomic and item.method != "GET" and item.path.startswith(BATCH_NOT_REVERTIBLE):
+            raise HTTPException(status_code=400, detail=f"{item.path} cannot be undone, so it cannot run in an atomic batch")
+
+    results: List[Optional[dict]] = [None] * len(input.requests)
+    events: list = []
+    failed = None
+    index = 0
+    while index < len(input.requests) and failed is None:
+        if input.requests[index].method == "GET":
+            end = index
+            while end < len(input.requests) and input.requests[end].method == "GET":
+                end += 1
+            results[index:end] = await asyncio.gather(*(run_sub_request(item) for item in input.requests[index:end]))
+        else:
+            end = index + 1
+            results[index] = await run_write(input.requests[index], events)
+        if input.atomic:
+            failed = next((i for i in range(index, end) if results[i]["status"] >= 400), None)
+        index = end
+
+    rolled_back = False
+    conflicts = []
+    if failed is not None:
+        written: dict = {}
+        for event in reversed(events):
+            if not await revert_change(event, written):
+                conflicts.append({"entity": event["entity"], "entity_id": event["entity_id"], "action": event["action"]})
+        if events:
+            invalidate_calendar_summary()
+        rolled_back = not conflicts
+    return {
+        "responses": [r for r in results if r is not None],
+        "failed_index": failed,
+        "rolled_back": rolled_back,
+        "conflicts": conflicts,
+    }
+
+# --- Response Compression ---
+# Week/month payloads repeat the same duty names, callsigns and timestamps,
+# so they compress very well. Responses are buffered, then encoded with
+# Brotli (when installed and accepted) or gzip once they pass the threshold.
+
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', '6'))
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', '4'))
+COMPRESSIBLE_TYPES = ("application/json", MSGPACK_MEDIA_TYPE, "text/")
+
+compression_stats: dict = {}
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick br or gzip from an Accept-Encoding header, honouring q=0"""
+    accepted = set()
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(token.strip().lower())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL)
+
+def record_compression(route_key: str, raw_size: int, sent_size: int, compressed: bool):
+    stats = compression_stats.setdefault(route_key, {
+        "responses": 0, "compressed": 0, "bytes_in": 0, "bytes_out": 0,
+    })
+    stats["responses"] += 1
+    stats["compressed"] += int(compressed)
+    stats["bytes_in"] += raw_size
+    stats["bytes_out"] += sent_size
+
+class CompressionMiddleware:
+    """ASGI middleware applying gzip/Brotli to responses above a minimum size"""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            # Still varies: a gzip client asking for this URL would get a different body
+            async def send_with_vary(message):
+                if message["type"] == "http.response.start":
+                    MutableHeaders(scope=message).add_vary_header("Accept-Encoding")
+                await send(message)
+
+            await self.app(scope, receive, send_with_vary)
+            return
+
+        start_message = None
+        chunks = []
+
+        async def send_buffered(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            await self.send_response(scope, start_message, b"".join(chunks), encoding, send)
+
+        await self.app(scope, receive, send_buffered)
+
+    async def send_response(self, scope, start_message, body, encoding, send):
+        headers = MutableHeaders(raw=start_message["headers"])
+        content_type = headers.get("content-type", "")
+        compress = (
+            len(body) >= self.minimum_size
+            and "content-encoding" not in headers
+            and content_type.startswith(COMPRESSIBLE_TYPES)
+        )
+        raw_size = len(body)
+        headers.add_vary_header("Accept-Encoding")
+        if compress:
+            body = compress_body(body, encoding)
+            headers["content-encoding"] = encoding
+            headers["content-length"] = str(len(body))
+
+        route = scope.get("route")
+        # Unmatched paths (404s, scanners) share one key so the table stays bounded
+        route_key = f"{scope['method']} {route.path}" if route else "<unmatched>"
+        record_compression(route_key, raw_size, len(body), compress)
+
+        await send(start_message)
+        await send({"type": "http.response.body", "body": body})
+
+@api_router.get("/metrics/db-pool")
+async def get_db_pool_metrics():
+    """Connection pool checkout counts and wait times, for sizing workers"""
+    return {
+        **pool_stats.snapshot(),
+        "options": mongo_client_options(),
+        "secondary_read_routes": sorted(SECONDARY_READ_ROUTES),
+    }
+
+@api_router.get("/metrics/compression")
+async def get_compression_metrics():
+    """Per-route compression counters and ratio (bytes_in / bytes_out)"""
+    return {
+        route: {**stats, "ratio": round(stats["bytes_in"] / stats["bytes_out"], 2) if stats["bytes_out"] else None}
+        for route, stats in sorted(compression_stats.items())
+    }
+
+# --- Indexes ---
+
+# Unique indexes added after data existed: (collection, key field, newest-first sort)
+DEDUPED_UNIQUE_INDEXES = [
+    ("duty_group_configs", "duty_group_config", "schedule_duty_id", {"version": -1, "created_at": -1}),
+    ("assignments", "assignment", "id", {"version": -1, "updated_at": -1}),
+]
+
+async def dedupe_unique_chunk(collection: str, entity: str, groups: List[dict], session) -> int:
+    """Delete all but the first (newest) row of each group of duplicates"""
+    keepers = [group["ids"][0] for group in groups]
+    duplicates = [oid for group in groups for oid in group["ids"][1:]]
+    removed = await db[collection].find({"_id": {"$in": duplicates}}, session=session).to_list(None)
+    await db[collection].delete_many({"_id": {"$in": duplicates}}, session=session)
+    kept = await db[collection].find({"_id": {"$in": keepers}}, session=session).to_list(None)
+    restored = kept
+    if entity == "assignment":
+        # Resend the survivors to /sync clients; a removed copy's date that the
+        # survivor doesn't share is dropped by its tombstone
+        now = datetime.now(timezone.utc).isoformat()
+        await db.assignments.update_many({"_id": {"$in": keepers}}, {"$set": {"updated_at": now}}, session=session)
+        await db.tombstones.insert_many(tombstones_for("assignment", removed), session=session)
+        restored = [{**doc, "updated_at": now} for doc in kept]
+    for doc in removed:
+        record_change(entity, doc["id"], "delete", before=doc)
+    # The deletes also clear the survivors' day bucket entries, which share their key
+    for before, after in zip(kept, restored):
+        record_change(entity, after["id"], "update", before=before, after=after)
+    return len(removed)
+
+async def migrate_unique_indexes():
+    """One-off: drop duplicate rows that would block the unique indexes, keeping the newest"""
+    async with distributed_lock("unique_indexes", ttl_seconds=600) as acquired:
+        if not acquired:
+            logger.info("Another worker is deduplicating before unique indexes; skipping")
+            return
+        if not await db.migrations.find_one({"_id": "unique_indexes"}):
+            removed = {}
+            for collection, entity, field, newest_first in DEDUPED_UNIQUE_INDEXES:
+                groups = await db[collection].aggregate([
+                    {"$sort": newest_first},
+                    {"$group": {"_id": f"${field}", "ids": {"$push": "$_id"}}},
+                    {"$match": {"ids.1": {"$exists": True}}},
+                ], allowDiskUse=True).to_list(None)
+                removed[collection] = 0
+                for start in range(0, len(groups), CASCADE_BATCH_SIZE):
+                    chunk = groups[start:start + CASCADE_BATCH_SIZE]
+                    removed[collection] += await run_in_transaction(
+                        lambda session: dedupe_unique_chunk(collection, entity, chunk, session)
+                    )
+            if any(removed.values()):
+                logger.info(f"Removed duplicates before creating unique indexes: {removed}")
+                invalidate_calendar_summary()
+            if removed.get("assignments"):
+                reconciled = await reconcile_total_duties()
+                logger.info(f"Reconciled total_duties after removing duplicate assignments: {reconciled}")
+            await db.migrations.insert_one({"_id": "unique_indexes", "removed": removed, "at": datetime.now(timezone.utc)})
+        for collection, _, field, _ in DEDUPED_UNIQUE_INDEXES:
+            await db[collection].create_index(field, unique=True)
+
+async def ensure_indexes():
+    """Create the indexes the hot paths and uniqueness guarantees rely on"""
+    # Unique assignments.id and duty_group_configs.schedule_duty_id are
+    # created by migrate_unique_indexes()
+    await db.assignments.create_index("date")
+    await db.assignments.create_index("schedule_duty_id")
+    await db.assignments.create_index([("date", 1), ("start_time", 1)])
+    await db.assignments.create_index([("personnel_id", 1), ("date", 1)])
+    await db.schedule_duties.create_index("id", unique=True)
+    await db.schedule_duties.create_index("date")
+    # The unique (duty_id, date, duty_type) key is created by migrate_schedule_duty_key()
+    await db.schedule_duties.create_index("updated_at")
+    await db.assignments.create_index("updated_at")
+    await db.tombstones.create_index("deleted_at", expireAfterSeconds=SYNC_TOMBSTONE_DAYS * 86400)
+    await db.jobs.create_index("id", unique=True)
+    await db.published_schedules.create_index([("period", 1), ("revision", 1)], unique=True)
+    await db.availability.create_index("id", unique=True)
+    await db.availability.create_index([("personnel_id", 1), ("start", 1)])
+
+# --- App Setup ---
+
+app.include_router(api_router)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_credentials=True,
+    allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+app.add_middleware(CompressionMiddleware, minimum_size=COMPRESSION_MIN_SIZE)
+
+app.add_middleware(ActorMiddleware)
 
 logging.basicConfig(
     level=logging.INFO,
@@ -463,9 +4384,21 @@ logger = logging.getLogger(__name__)
 
 @app.on_event("startup")
 async def startup():
-    await seed_duties()
-    await seed_personnel()
+    # Started before the migrations so the events they record are kept
+    await change_log.start()
+    await migrate_unique_indexes()
+    await ensure_indexes()
+    await migrate_schedule_duty_key()
+    await seed_data()
+    await build_day_buckets_once()
+    await cache_bus.start()
+    await day_bucket_writer.start()
+    await job_runner.recover()
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await batch_client.aclose()
+    await day_bucket_writer.stop()
+    await change_log.stop()
+    await cache_bus.stop()
     client.close()
@@ -0,0 +1,109 @@
+"""
+Shared fixtures for the API tests.
+
+Most tests need a schedule duty on a test-only date, often with someone
+assigned to it. `schedule` creates them through the API and cascade-deletes
+everything it created afterwards, assignments included.
+"""
+
+import pytest
+import requests
+import os
+import time
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL').rstrip('/')
+
+
+def wait_for_job(job_id, timeout=15):
+    """Poll a background job until it finishes"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        response = requests.get(f"{BASE_URL}/api/jobs/{job_id}")
+        assert response.status_code == 200
+        job = response.json()
+        if job["status"] in ("succeeded", "failed", "cancelled"):
+            return job
+        time.sleep(0.3)
+    raise AssertionError(f"Job {job_id} did not finish in {timeout}s")
+
+
+class ScheduleFactory:
+    """Creates schedule duties and assignments for one test"""
+
+    def __init__(self):
+        self.duty_ids = []
+        self.ranges = []
+        self.personnel_ids = []
+
+    def person(self, callsign, **fields):
+        """Personnel owned by the test, so counters it bumps are thrown away"""
+        response = requests.post(f"{BASE_URL}/api/personnel", json={
+            "callsign": f"TEST-{callsign}",
+            "name": f"TEST {callsign}",
+            **fields,
+        })
+        assert response.status_code == 200
+        person = response.json()
+        self.personnel_ids.append(person["id"])
+        return person
+
+    def duty(self, date, code, name=None, duty_type="single", duty_id=None, **fields):
+        response = requests.post(f"{BASE_URL}/api/schedule-duties", json={
+            "duty_id": duty_id or f"TEST-{code}",
+            "duty_name": name or f"TEST {code}",
+            "duty_code": code,
+            "duty_type": duty_type,
+            "date": date,
+            **fields,
+        })
+        assert response.status_code == 200
+        duty = response.json()
+        self.duty_ids.append(duty["id"])
+        return duty
+
+    def assignment_body(self, duty, person, start_time="0800", end_time="1000", **fields):
+        return {
+            "schedule_duty_id": duty["id"],
+            "duty_code": duty["duty_code"],
+            "duty_name": duty["duty_name"],
+            "personnel_id": person["id"],
+            "personnel_name": person["name"],
+            "personnel_callsign": person["callsign"],
+            "date": duty["date"],
+            "start_time": start_time,
+            "end_time": end_time,
+            **fields,
+        }
+
+    def assignment(self, duty, person, start_time="0800", end_time="1000", **fields):
+        response = requests.post(f"{BASE_URL}/api/assignments",
+                                 json=self.assignment_body(duty, person, start_time, end_time, **fields))
+        assert response.status_code == 200
+        return response.json()
+
+    def clear(self, start_date, end_date):
+        """Also cascade-delete a date range, for duties created indirectly (recurrences, rotations)"""
+        self.ranges.append((start_date, end_date))
+
+    def cleanup(self):
+        if self.duty_ids:
+            requests.post(f"{BASE_URL}/api/schedule-duties/cascade-delete", json={"ids": self.duty_ids})
+        for start_date, end_date in self.ranges:
+            requests.post(f"{BASE_URL}/api/schedule-duties/cascade-delete", json={
+                "start_date": start_date,
+                "end_date": end_date,
+            })
+        for personnel_id in self.personnel_ids:
+            requests.delete(f"{BASE_URL}/api/personnel/{personnel_id}")
+
+
+@pytest.fixture
+def schedule():
+    factory = ScheduleFactory()
+    yield factory
+    factory.cleanup()
+
+
+@pytest.fixture
+def person():
+    return requests.get(f"{BASE_URL}/api/personnel").json()[0]
@@ -0,0 +1,134 @@
+"""
+Test file for drag-and-drop assignment moves.
+Tests:
+1. Moving a block keeps its id and bumps its version
+2. Moves onto an overlapping slot of the same person are rejected
+3. Batch moves are checked against each other's new positions
+4. Stale expected_version returns 409
+5. Malformed HHMM times return 422
+6. Date-only moves resolve the same duty on the new date and tombstone the old one
+7. A batch with one stale move leaves the stored rows and the change log in agreement
+"""
+
+import time
+
+import pytest
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL').rstrip('/')
+
+TEST_DATE = "2032-02-10"
+# Change events are written in batches; wait past the flush interval
+FLUSH_WAIT = 1.5
+
+
+class TestAssignmentMove:
+    """PATCH /api/assignments/{id}/move and PATCH /api/assignments/move"""
+
+    @pytest.fixture
+    def board(self, schedule, person):
+        duty = schedule.duty(TEST_DATE, "TM1", "TEST Move Duty", duty_id="TEST-move-duty")
+        return [schedule.assignment(duty, person, start, end) for start, end in (("0800", "1000"), ("1000", "1200"))]
+
+    def test_move_block(self, board):
+        """A move returns the new state with a bumped version"""
+        first, _ = board
+        response = requests.patch(f"{BASE_URL}/api/assignments/{first['id']}/move", json={
+            "start_time": "0600",
+            "end_time": "0800",
+            "expected_version": first["version"],
+        })
+        assert response.status_code == 200
+        moved = response.json()
+        assert moved["id"] == first["id"]
+        assert moved["start_time"] == "0600"
+        assert moved["version"] == first["version"] + 1
+        print("SUCCESS: Block moved in place")
+
+    def test_overlap_rejected(self, board):
+        """Moving onto the person's other block is rejected"""
+        first, _ = board
+        response = requests.patch(f"{BASE_URL}/api/assignments/{first['id']}/move", json={
+            "start_time": "0900",
+            "end_time": "1100",
+        })
+        assert response.status_code == 422
+        assert response.json()["detail"]["violations"][0]["type"] == "no_overlap"
+        print("SUCCESS: Overlapping move rejected")
+
+    def test_batch_swap(self, board):
+        """Two blocks can trade places in one batch"""
+        first, second = board
+        response = requests.patch(f"{BASE_URL}/api/assignments/move", json={"moves": [
+            {"id": first["id"], "start_time": "1000", "end_time": "1200"},
+            {"id": second["id"], "start_time": "0800", "end_time": "1000"},
+        ]})
+        assert response.status_code == 200
+        assert [a["start_time"] for a in response.json()] == ["1000", "0800"]
+        print("SUCCESS: Batch move swapped blocks")
+
+    def test_stale_version(self, board):
+        """A stale expected_version returns 409"""
+        first, _ = board
+        response = requests.patch(f"{BASE_URL}/api/assignments/{first['id']}/move", json={
+            "start_time": "1300",
+            "end_time": "1500",
+            "expected_version": first["version"] + 5,
+        })
+        assert response.status_code == 409
+        print("SUCCESS: Stale move rejected")
+
+    def test_malformed_times_rejected(self, board):
+        """Times that are not HHMM are rejected with 422 before any rule runs"""
+        first, _ = board
+        for start_time in ("6:00", "abc", "2460"):
+            response = requests.patch(f"{BASE_URL}/api/assignments/{first['id']}/move", json={"start_time": start_time})
+            assert response.status_code == 422
+        response = requests.post(f"{BASE_URL}/api/assignments", json={
+            **{k: first[k] for k in ("schedule_duty_id", "duty_code", "duty_name", "personnel_id",
+                                     "personnel_name", "personnel_callsign", "date")},
+            "start_time": "0600",
+            "end_time": "7pm",
+        })
+        assert response.status_code == 422
+        print("SUCCESS: Malformed times rejected")
+
+    def test_date_only_move(self, board, schedule):
+        """A date-only move lands on the same duty's occurrence that day and
+        leaves a tombstone for syncs of the old date"""
+        first, _ = board
+        other_day = "2032-02-11"
+        token = requests.get(f"{BASE_URL}/api/sync", params={"start_date": TEST_DATE, "end_date": TEST_DATE}).json()["token"]
+        response = requests.patch(f"{BASE_URL}/api/assignments/{first['id']}/move", json={"date": other_day})
+        assert response.status_code == 400
+
+        duty = schedule.duty(other_day, "TM1", "TEST Move Duty", duty_id="TEST-move-duty")
+        response = requests.patch(f"{BASE_URL}/api/assignments/{first['id']}/move", json={"date": other_day})
+        assert response.status_code == 200
+        moved = response.json()
+        assert (moved["schedule_duty_id"], moved["date"]) == (duty["id"], other_day)
+
+        sync = requests.get(f"{BASE_URL}/api/sync", params={
+            "start_date": TEST_DATE, "end_date": TEST_DATE, "since": token,
+        }).json()
+        assert first["id"] in sync["deleted"]["assignments"]
+        print("SUCCESS: Date-only move follows the duty")
+
+    def test_partially_stale_batch(self, board):
+        """A batch whose second move is stale returns 409; a first move that was
+        applied anyway (no transactions) still has its change event"""
+        first, second = board
+        response = requests.patch(f"{BASE_URL}/api/assignments/move", json={"moves": [
+            {"id": first["id"], "start_time": "1300", "end_time": "1400", "expected_version": first["version"]},
+            {"id": second["id"], "start_time": "1500", "end_time": "1600", "expected_version": second["version"] + 5},
+        ]})
+        assert response.status_code == 409
+        time.sleep(FLUSH_WAIT)
+
+        stored = {a["id"]: a for a in requests.get(f"{BASE_URL}/api/assignments", params={"date": TEST_DATE}).json()}
+        assert stored[second["id"]]["start_time"] == "1000"
+        events = requests.get(f"{BASE_URL}/api/history", params={"entity_id": first["id"]}).json()
+        updated = any(e["action"] == "update" for e in events)
+        assert updated == (stored[first["id"]]["start_time"] == "1300")
+        print("SUCCESS: Stale batch left rows and history consistent")
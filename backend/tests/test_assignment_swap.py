@@ -0,0 +1,76 @@
+"""
+Test file for personnel swaps and rotations.
+Tests:
+1. Swapping two assignments exchanges their people and leaves counters alone
+2. Rotation along a cycle of three
+3. Repeated ids and stale versions are rejected
+"""
+
+import pytest
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL').rstrip('/')
+
+TEST_DATE = "2032-03-16"
+
+
+class TestAssignmentSwap:
+    """POST /api/assignments/swap and POST /api/assignments/rotate"""
+
+    @pytest.fixture
+    def shifts(self, schedule):
+        duty = schedule.duty(TEST_DATE, "TW1", "TEST Swap Duty", duty_id="TEST-swap-duty")
+        people = requests.get(f"{BASE_URL}/api/personnel").json()[:3]
+        return [
+            schedule.assignment(duty, person, start, end)
+            for person, (start, end) in zip(people, (("0800", "1000"), ("1000", "1200"), ("1200", "1400")))
+        ]
+
+    def _counters(self, shifts):
+        ids = {s["personnel_id"] for s in shifts}
+        return {p["id"]: p["total_duties"] for p in requests.get(f"{BASE_URL}/api/personnel").json() if p["id"] in ids}
+
+    def test_swap(self, shifts):
+        """Two people trade shifts; total_duties is unchanged"""
+        first, second, _ = shifts
+        before = self._counters(shifts)
+        response = requests.post(f"{BASE_URL}/api/assignments/swap", json={
+            "first_id": first["id"],
+            "second_id": second["id"],
+            "expected_versions": {first["id"]: first["version"], second["id"]: second["version"]},
+        })
+        assert response.status_code == 200
+        swapped = response.json()
+        assert swapped[0]["personnel_id"] == second["personnel_id"]
+        assert swapped[1]["personnel_id"] == first["personnel_id"]
+        assert self._counters(shifts) == before
+        print("SUCCESS: Swap exchanged personnel")
+
+    def test_rotate(self, shifts):
+        """Each person moves one step along the cycle"""
+        response = requests.post(f"{BASE_URL}/api/assignments/rotate", json={
+            "cycles": [[s["id"] for s in shifts]],
+        })
+        assert response.status_code == 200
+        rotated = response.json()
+        assert [r["personnel_id"] for r in rotated] == [
+            shifts[2]["personnel_id"], shifts[0]["personnel_id"], shifts[1]["personnel_id"]
+        ]
+        print("SUCCESS: Rotation moved everyone one step")
+
+    def test_invalid_requests(self, shifts):
+        """Repeated ids return 400; stale versions return 409"""
+        first, second, _ = shifts
+        response = requests.post(f"{BASE_URL}/api/assignments/swap", json={
+            "first_id": first["id"],
+            "second_id": first["id"],
+        })
+        assert response.status_code == 400
+        response = requests.post(f"{BASE_URL}/api/assignments/swap", json={
+            "first_id": first["id"],
+            "second_id": second["id"],
+            "expected_versions": {first["id"]: first["version"] + 3},
+        })
+        assert response.status_code == 409
+        print("SUCCESS: Invalid swaps rejected")
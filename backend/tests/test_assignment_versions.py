@@ -0,0 +1,75 @@
+"""
+Test file for optimistic concurrency on assignments and group configs.
+Tests:
+1. Updates bump the version
+2. Stale expected_version returns 409
+3. Group config versions
+"""
+
+import pytest
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL').rstrip('/')
+
+
+class TestAssignmentVersions:
+    """version / expected_version on PUT /api/assignments/{id}"""
+
+    @pytest.fixture
+    def assignment(self, schedule, person):
+        duty = schedule.duty("2031-09-01", "TV1", "TEST Version Duty", duty_id="TEST-version")
+        return schedule.assignment(duty, person)
+
+    def test_reassign_bumps_version(self, assignment):
+        """Reassignment with the current version succeeds and bumps it"""
+        assert assignment["version"] == 0
+        person = requests.get(f"{BASE_URL}/api/personnel").json()[1]
+        response = requests.put(f"{BASE_URL}/api/assignments/{assignment['id']}", json={
+            "personnel_id": person["id"],
+            "personnel_name": person["name"],
+            "personnel_callsign": person["callsign"],
+            "expected_version": 0,
+        })
+        assert response.status_code == 200
+        data = response.json()
+        assert data["version"] == 1
+        assert data["personnel_id"] == person["id"]
+        print("SUCCESS: Reassignment bumped version to 1")
+
+    def test_stale_version_conflict(self, assignment):
+        """A second writer holding the old version gets 409"""
+        personnel = requests.get(f"{BASE_URL}/api/personnel").json()
+        for person in personnel[1:3]:
+            response = requests.put(f"{BASE_URL}/api/assignments/{assignment['id']}", json={
+                "personnel_id": person["id"],
+                "personnel_name": person["name"],
+                "personnel_callsign": person["callsign"],
+                "expected_version": 0,
+            })
+        assert response.status_code == 409
+        print("SUCCESS: Stale version rejected with 409")
+
+    def test_group_config_versions(self, assignment):
+        """Group config saves bump version and reject stale versions"""
+        schedule_duty_id = assignment["schedule_duty_id"]
+        first = requests.post(f"{BASE_URL}/api/duty-group-configs", json={
+            "schedule_duty_id": schedule_duty_id,
+            "duties": [{"name": "Pilot", "count": 1}],
+        })
+        assert first.status_code == 200
+        version = first.json()["version"]
+        second = requests.post(f"{BASE_URL}/api/duty-group-configs", json={
+            "schedule_duty_id": schedule_duty_id,
+            "duties": [{"name": "Pilot", "count": 2}],
+            "expected_version": version,
+        })
+        assert second.status_code == 200
+        assert second.json()["version"] == version + 1
+        stale = requests.post(f"{BASE_URL}/api/duty-group-configs", json={
+            "schedule_duty_id": schedule_duty_id,
+            "duties": [{"name": "Pilot", "count": 3}],
+            "expected_version": version,
+        })
+        assert stale.status_code == 409
+        print("SUCCESS: Group config versioning works")
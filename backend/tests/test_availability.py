@@ -0,0 +1,145 @@
+"""
+Test file for personnel availability periods.
+Tests:
+1. Period validation (reason, end after start)
+2. available_at on /api/personnel reflects periods covering that moment
+3. Candidates overlapping a period are ranked as unavailable
+4. The availability rule rejects assignments during leave
+5. Assignments during leave are rejected without any rules, and the
+   person's slot frees up as soon as the period is deleted
+"""
+
+import pytest
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL').rstrip('/')
+
+TEST_DATE = "2031-10-07"
+
+
+class TestAvailability:
+    """/api/availability and its use in personnel lookups and rules"""
+
+    @pytest.fixture
+    def person(self):
+        return requests.get(f"{BASE_URL}/api/personnel", params={"available": True}).json()[0]
+
+    @pytest.fixture
+    def leave(self, person):
+        response = requests.post(f"{BASE_URL}/api/availability", json={
+            "personnel_id": person["id"],
+            "start": f"{TEST_DATE}T0800",
+            "end": f"{TEST_DATE}T12:00",
+            "reason": "course",
+        })
+        assert response.status_code == 200
+        period = response.json()
+        yield period
+        requests.delete(f"{BASE_URL}/api/availability/{period['id']}")
+
+    @pytest.fixture
+    def duty(self, schedule):
+        return schedule.duty(TEST_DATE, "TAV", "TEST Availability Duty", duty_id="TEST-availability-duty")
+
+    def test_invalid_periods_rejected(self, person):
+        """Unknown reasons and empty intervals return 400"""
+        response = requests.post(f"{BASE_URL}/api/availability", json={
+            "personnel_id": person["id"], "start": f"{TEST_DATE}T0800", "end": f"{TEST_DATE}T0900", "reason": "holiday",
+        })
+        assert response.status_code == 400
+        response = requests.post(f"{BASE_URL}/api/availability", json={
+            "personnel_id": person["id"], "start": f"{TEST_DATE}T0900", "end": f"{TEST_DATE}T0900",
+        })
+        assert response.status_code == 400
+        print("SUCCESS: Invalid periods rejected")
+
+    def test_available_at(self, person, leave):
+        """Periods are normalised and mark the person unavailable only inside them"""
+        assert leave["end"] == f"{TEST_DATE}T1200"
+
+        def ids(at, available):
+            response = requests.get(f"{BASE_URL}/api/personnel", params={"available_at": at, "available": available})
+            assert response.status_code == 200
+            return {p["id"] for p in response.json()}
+
+        assert person["id"] not in ids(f"{TEST_DATE}T0800", True)
+        assert person["id"] in ids(f"{TEST_DATE}T0800", False)
+        assert person["id"] in ids(f"{TEST_DATE}T1200", True)
+
+        everyone = requests.get(f"{BASE_URL}/api/personnel", params={"available_at": f"{TEST_DATE}T1000"}).json()
+        assert next(p for p in everyone if p["id"] == person["id"])["available"] is False
+
+        listed = requests.get(f"{BASE_URL}/api/availability", params={
+            "personnel_id": person["id"], "start_date": TEST_DATE, "end_date": TEST_DATE,
+        }).json()
+        assert [p["id"] for p in listed] == [leave["id"]]
+        print("SUCCESS: available_at follows the period")
+
+    def test_invalid_available_at(self):
+        """Malformed available_at returns 400"""
+        response = requests.get(f"{BASE_URL}/api/personnel", params={"available_at": "tomorrow"})
+        assert response.status_code == 400
+
+    def test_candidates_respect_periods(self, person, leave, duty):
+        """Only slots overlapping the period rank the person as unavailable"""
+        def candidate(start_time, end_time):
+            response = requests.get(f"{BASE_URL}/api/schedule-duties/{duty['id']}/candidates", params={
+                "start_time": start_time, "end_time": end_time,
+            })
+            assert response.status_code == 200
+            return next(c for c in response.json() if c["id"] == person["id"])
+
+        assert candidate("1100", "1300")["available"] is False
+        assert candidate("1200", "1400")["available"] is True
+        print("SUCCESS: Candidate availability follows the slot")
+
+    def test_availability_rule(self, person, leave, duty):
+        """With an availability rule, assignments during the period are rejected"""
+        rule = requests.post(f"{BASE_URL}/api/constraint-rules", json={"type": "availability"}).json()
+        try:
+            body = {
+                "schedule_duty_id": duty["id"],
+                "duty_code": "TAV",
+                "duty_name": "TEST Availability Duty",
+                "personnel_id": person["id"],
+                "personnel_name": person["name"],
+                "personnel_callsign": person["callsign"],
+                "date": TEST_DATE,
+                "start_time": "1000",
+                "end_time": "1400",
+            }
+            response = requests.post(f"{BASE_URL}/api/assignments", json=body)
+            assert response.status_code == 422
+            assert response.json()["detail"]["violations"][0]["type"] == "availability"
+
+            response = requests.post(f"{BASE_URL}/api/assignments", json={**body, "start_time": "1200"})
+            assert response.status_code == 200
+        finally:
+            requests.delete(f"{BASE_URL}/api/constraint-rules/{rule['id']}")
+        print("SUCCESS: Availability rule enforced")
+
+    def test_assignments_checked_without_rules(self, schedule, person, duty):
+        """Creating or reassigning into a period is rejected with no rules configured"""
+        other = schedule.person("TAV2")
+        period = requests.post(f"{BASE_URL}/api/availability", json={
+            "personnel_id": person["id"], "start": f"{TEST_DATE}T0800", "end": f"{TEST_DATE}T1200",
+        }).json()
+        body = schedule.assignment_body(duty, person, "1000", "1400")
+        try:
+            response = requests.post(f"{BASE_URL}/api/assignments", json=body)
+            assert response.status_code == 422
+            assert response.json()["detail"]["violations"][0]["type"] == "availability"
+
+            assignment = schedule.assignment(duty, other, "1000", "1400")
+            response = requests.put(f"{BASE_URL}/api/assignments/{assignment['id']}", json={
+                "personnel_id": person["id"], "personnel_name": person["name"], "personnel_callsign": person["callsign"],
+            })
+            assert response.status_code == 422
+        finally:
+            requests.delete(f"{BASE_URL}/api/availability/{period['id']}")
+
+        # Deleting the period reloads that person's entry in the index
+        response = requests.post(f"{BASE_URL}/api/assignments", json=body)
+        assert response.status_code == 200
+        print("SUCCESS: Availability enforced without rules")
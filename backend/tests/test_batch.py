@@ -0,0 +1,130 @@
+"""
+Test file for request batching.
+Tests:
+1. Sub-requests run in order and each gets its own status and body
+2. Atomic batches undo earlier writes when a later sub-request fails
+3. Nested batches and non-API paths are rejected
+4. Rows edited by someone else before the rollback are reported, not reverted
+5. Atomic batches reject writes that cannot be undone
+"""
+
+import pytest
+import requests
+import os
+import threading
+import time
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL').rstrip('/')
+
+TEST_DATE = "2032-04-07"
+
+
+class TestBatch:
+    """POST /api/batch"""
+
+    @pytest.fixture
+    def duty(self, schedule):
+        return schedule.duty(TEST_DATE, "TB1", "TEST Batch Duty", "group", duty_id="TEST-batch-duty")
+
+    def test_write_then_read(self, duty):
+        """A config save followed by a read sees the saved config"""
+        response = requests.post(f"{BASE_URL}/api/batch", json={"requests": [
+            {"method": "POST", "path": "/api/duty-group-configs",
+             "body": {"schedule_duty_id": duty["id"], "duties": [{"name": "Pilot", "count": 2}]}},
+            {"method": "GET", "path": f"/api/duty-group-configs/{duty['id']}"},
+            {"method": "GET", "path": "/api/assignments", "params": {"date": TEST_DATE}},
+        ]})
+        assert response.status_code == 200
+        data = response.json()
+        assert [r["status"] for r in data["responses"]] == [200, 200, 200]
+        assert data["responses"][1]["body"]["duties"] == [{"name": "Pilot", "count": 2}]
+        assert data["rolled_back"] is False
+        print("SUCCESS: Batch ran write then reads")
+
+    def test_atomic_rollback(self, duty, schedule, person):
+        """A failing sub-request undoes the assignments created before it"""
+        before = person["total_duties"]
+        response = requests.post(f"{BASE_URL}/api/batch", json={"atomic": True, "requests": [
+            {"method": "POST", "path": "/api/assignments", "body": schedule.assignment_body(duty, person, sub_duty_name="Pilot", slot_index=0)},
+            {"method": "POST", "path": "/api/assignments", "body": schedule.assignment_body(duty, person, sub_duty_name="Pilot", slot_index=1)},
+            {"method": "DELETE", "path": "/api/assignments/TEST-missing"},
+        ]})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["failed_index"] == 2
+        assert data["rolled_back"] is True
+
+        assignments = requests.get(f"{BASE_URL}/api/assignments", params={"date": TEST_DATE}).json()
+        assert not [a for a in assignments if a["schedule_duty_id"] == duty["id"]]
+        after = next(p for p in requests.get(f"{BASE_URL}/api/personnel").json() if p["id"] == person["id"])
+        assert after["total_duties"] == before
+        print("SUCCESS: Atomic batch rolled back")
+
+    def test_invalid_paths(self):
+        """Nested batches and paths outside /api are rejected"""
+        for path in ("/api/batch", "/docs"):
+            response = requests.post(f"{BASE_URL}/api/batch", json={"requests": [{"method": "GET", "path": path}]})
+            assert response.status_code == 400
+        print("SUCCESS: Invalid batch paths rejected")
+
+    def test_rollback_skips_concurrent_edits(self, duty, schedule, person):
+        """An edit landing between the batch write and the rollback is kept
+        and reported as a conflict"""
+        first, second = schedule.person("TBA1"), schedule.person("TBA2")
+
+        def reassign(to, **fields):
+            return {"personnel_id": to["id"], "personnel_name": to["name"], "personnel_callsign": to["callsign"], **fields}
+
+        def current(assignment_id):
+            assignments = requests.get(f"{BASE_URL}/api/assignments", params={"date": TEST_DATE}).json()
+            return next(a for a in assignments if a["id"] == assignment_id)
+
+        # The edit has to land while the batch is still running, so retry a
+        # few times rather than depend on timing once
+        for slot in range(5):
+            assignment = schedule.assignment(duty, person, sub_duty_name="Pilot", slot_index=slot)
+            edit = {}
+            done = threading.Event()
+
+            def edit_after_batch_write():
+                while not done.is_set():
+                    if current(assignment["id"])["version"] == 1:
+                        edit["status"] = requests.put(f"{BASE_URL}/api/assignments/{assignment['id']}",
+                                                      json=reassign(second, expected_version=1)).status_code
+                        return
+
+            editor = threading.Thread(target=edit_after_batch_write)
+            editor.start()
+            reads = [{"method": "GET", "path": "/api/calendar/days", "params": {"start_date": "2032-03-01", "end_date": "2032-04-11"}}] * 47
+            response = requests.post(f"{BASE_URL}/api/batch", json={"atomic": True, "requests": [
+                {"method": "PUT", "path": f"/api/assignments/{assignment['id']}", "body": reassign(first)},
+                *reads,
+                {"method": "DELETE", "path": "/api/assignments/TEST-missing"},
+            ]})
+            done.set()
+            editor.join()
+            assert response.status_code == 200
+            data = response.json()
+            assert data["failed_index"] == 48
+
+            if edit.get("status") == 200:
+                assert data["rolled_back"] is False
+                assert data["conflicts"] == [{"entity": "assignment", "entity_id": assignment["id"], "action": "update"}]
+                assert current(assignment["id"])["personnel_id"] == second["id"]
+                break
+            # The edit missed the window; the rollback went through instead
+            assert data["rolled_back"] is True and data["conflicts"] == []
+            assert current(assignment["id"])["personnel_id"] == person["id"]
+            time.sleep(0.1)
+        else:
+            pytest.fail("The concurrent edit never landed before the rollback")
+        print("SUCCESS: Concurrent edit kept and reported")
+
+    def test_atomic_rejects_irreversible_writes(self):
+        """Job submissions and scenario writes cannot join an atomic batch"""
+        for path in ("/api/jobs/reconcile-counters", "/api/scenarios"):
+            response = requests.post(f"{BASE_URL}/api/batch", json={"atomic": True, "requests": [
+                {"method": "POST", "path": path, "body": {}},
+            ]})
+            assert response.status_code == 400
+        print("SUCCESS: Irreversible writes rejected in atomic batches")
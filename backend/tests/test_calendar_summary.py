@@ -0,0 +1,78 @@
+"""
+Test file for the month-view calendar summary endpoint.
+Tests:
+1. Summary shape for a month range
+2. Required slots for single and group duties
+3. Cached summaries are invalidated by assignment writes
+4. Malformed, reversed and oversized ranges return 400
+"""
+
+import pytest
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL').rstrip('/')
+
+TEST_DATE = "2031-05-14"
+
+
+class TestCalendarSummary:
+    """GET /api/calendar/summary"""
+
+    @pytest.fixture
+    def single_duty(self, schedule):
+        return schedule.duty(TEST_DATE, "TS1", "TEST Summary Single", duty_id="TEST-summary-single")
+
+    @pytest.fixture
+    def group_duty(self, schedule):
+        return schedule.duty(TEST_DATE, "", "TEST Summary Group", "group", duty_id="TEST-summary-group")
+
+    def _summary_row(self, schedule_duty_id):
+        response = requests.get(f"{BASE_URL}/api/calendar/summary", params={
+            "start_date": "2031-05-01",
+            "end_date": "2031-05-31",
+        })
+        assert response.status_code == 200
+        data = response.json()
+        assert data["start_date"] == "2031-05-01"
+        rows = data["days"].get(TEST_DATE, [])
+        return next(r for r in rows if r["schedule_duty_id"] == schedule_duty_id)
+
+    def test_single_duty_filled_after_assignment(self, single_duty, schedule, person):
+        """Single duties require one slot; assignment writes invalidate the cache"""
+        row = self._summary_row(single_duty["id"])
+        assert row["required"] == 1
+        assert row["filled"] == 0
+
+        schedule.assignment(single_duty, person)
+
+        row = self._summary_row(single_duty["id"])
+        assert row["filled"] == 1
+        print("SUCCESS: Summary reflects new assignment")
+
+    def test_group_duty_required_from_config(self, group_duty):
+        """Group duties require the sum of their configured counts"""
+        response = requests.post(f"{BASE_URL}/api/duty-group-configs", json={
+            "schedule_duty_id": group_duty["id"],
+            "duties": [{"name": "Pilot", "count": 2}, {"name": "Tower", "count": 1}],
+        })
+        assert response.status_code == 200
+        row = self._summary_row(group_duty["id"])
+        assert row["required"] == 3
+        assert row["duty_type"] == "group"
+        print("SUCCESS: Group duty requires 3 slots")
+
+    def test_invalid_range(self):
+        """start_date after end_date returns 400"""
+        response = requests.get(f"{BASE_URL}/api/calendar/summary", params={
+            "start_date": "2031-06-01",
+            "end_date": "2031-05-01",
+        })
+        assert response.status_code == 400
+
+    def test_malformed_and_oversized_ranges(self):
+        """Unparseable dates and spans over the month cap return 400"""
+        for params in ({"start_date": "2031-6-1x", "end_date": "2031-06-30"},
+                       {"start_date": "2031-01-01", "end_date": "2035-01-01"}):
+            response = requests.get(f"{BASE_URL}/api/calendar/summary", params=params)
+            assert response.status_code == 400
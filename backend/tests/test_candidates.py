@@ -0,0 +1,75 @@
+"""
+Test file for qualification-aware candidate ranking.
+Tests:
+1. Candidates are sorted by score
+2. Personnel with overlapping assignments rank below free ones
+3. Overnight shifts and slots clash across midnight
+4. Unknown schedule duty returns 404
+"""
+
+import pytest
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL').rstrip('/')
+
+TEST_DATE = "2031-11-03"
+PREVIOUS_DATE = "2031-11-02"
+NEXT_DATE = "2031-11-04"
+
+
+class TestCandidates:
+    """GET /api/schedule-duties/{id}/candidates"""
+
+    @pytest.fixture
+    def schedule_duty(self, schedule):
+        return schedule.duty(TEST_DATE, "TCA", "TEST Candidates Duty", duty_id="TEST-candidates",
+                             qualifications=["Security L1"])
+
+    def test_candidates_sorted_by_score(self, schedule_duty):
+        response = requests.get(f"{BASE_URL}/api/schedule-duties/{schedule_duty['id']}/candidates", params={
+            "start_time": "0800", "end_time": "1000",
+        })
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data) > 0
+        scores = [c["score"] for c in data]
+        assert scores == sorted(scores, reverse=True)
+        for c in data:
+            if "Security L1" in c["qualifications"]:
+                assert c["missing_qualifications"] == []
+        print(f"SUCCESS: {len(data)} candidates ranked")
+
+    def test_overlapping_person_flagged(self, schedule_duty, schedule, person):
+        schedule.assignment(schedule_duty, person)
+        data = requests.get(f"{BASE_URL}/api/schedule-duties/{schedule_duty['id']}/candidates", params={
+            "start_time": "0900", "end_time": "1100",
+        }).json()
+        busy = next(c for c in data if c["id"] == person["id"])
+        assert busy["overlap_free"] is False
+        print("SUCCESS: Overlapping person flagged")
+
+    def _overlap_free(self, schedule_duty, person, start_time, end_time):
+        data = requests.get(f"{BASE_URL}/api/schedule-duties/{schedule_duty['id']}/candidates", params={
+            "start_time": start_time, "end_time": end_time,
+        }).json()
+        return next(c for c in data if c["id"] == person["id"])["overlap_free"]
+
+    def test_previous_overnight_shift_flagged(self, schedule_duty, schedule, person):
+        night = schedule.duty(PREVIOUS_DATE, "TCN", "TEST Candidates Night", duty_id="TEST-candidates-night")
+        schedule.assignment(night, person, "2200", "0700")
+        assert self._overlap_free(schedule_duty, person, "0600", "0800") is False
+        print("SUCCESS: Shift running past midnight flagged")
+
+    def test_overnight_slot_flagged(self, schedule_duty, schedule, person):
+        early = schedule.duty(NEXT_DATE, "TCE", "TEST Candidates Early", duty_id="TEST-candidates-early")
+        schedule.assignment(early, person, "0000", "0100")
+        assert self._overlap_free(schedule_duty, person, "2200", "0200") is False
+        assert self._overlap_free(schedule_duty, person, "1800", "2200") is True
+        print("SUCCESS: Overnight slot flagged against next-day shift")
+
+    def test_unknown_duty(self):
+        response = requests.get(f"{BASE_URL}/api/schedule-duties/does-not-exist/candidates", params={
+            "start_time": "0800", "end_time": "1000",
+        })
+        assert response.status_code == 404
@@ -0,0 +1,70 @@
+"""
+Test file for cascade delete of schedule duties.
+Tests:
+1. Deleting one duty removes its assignments and restores counters
+2. Date-range cascade delete returns counts
+3. Empty filters are rejected
+"""
+
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL').rstrip('/')
+
+
+def total_duties(person_id):
+    personnel = requests.get(f"{BASE_URL}/api/personnel").json()
+    return next(p["total_duties"] for p in personnel if p["id"] == person_id)
+
+
+class TestCascadeDelete:
+    """DELETE /api/schedule-duties/{id} and POST /api/schedule-duties/cascade-delete"""
+
+    def _duty_with_assignment(self, schedule, date, person):
+        duty = schedule.duty(date, "TC1", "TEST Cascade Duty", duty_id="TEST-cascade")
+        schedule.assignment(duty, person)
+        return duty
+
+    def test_delete_single_duty_restores_counter(self, schedule, person):
+        """Deleting a duty removes its assignment and decrements total_duties"""
+        duty = self._duty_with_assignment(schedule, "2031-08-01", person)
+        before = total_duties(person["id"])
+
+        response = requests.delete(f"{BASE_URL}/api/schedule-duties/{duty['id']}")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["deleted"] is True
+        assert data["assignments"] == 1
+        assert total_duties(person["id"]) == before - 1
+
+        remaining = requests.get(f"{BASE_URL}/api/assignments", params={"date": "2031-08-01"}).json()
+        assert all(a["schedule_duty_id"] != duty["id"] for a in remaining)
+        print("SUCCESS: Cascade delete restored counter")
+
+    def test_date_range_cascade_delete(self, schedule):
+        """A date range clears every duty and assignment in it"""
+        person = requests.get(f"{BASE_URL}/api/personnel").json()[1]
+        for date in ("2031-08-10", "2031-08-11", "2031-08-12"):
+            self._duty_with_assignment(schedule, date, person)
+
+        response = requests.post(f"{BASE_URL}/api/schedule-duties/cascade-delete", json={
+            "start_date": "2031-08-10",
+            "end_date": "2031-08-12",
+        })
+        assert response.status_code == 200
+        data = response.json()
+        assert data["schedule_duties"] >= 3
+        assert data["assignments"] >= 3
+        remaining = requests.get(f"{BASE_URL}/api/schedule-duties", params={
+            "start_date": "2031-08-10", "end_date": "2031-08-12",
+        }).json()
+        assert remaining == []
+        print(f"SUCCESS: Cleared {data['schedule_duties']} duties")
+
+    def test_missing_duty_returns_404(self):
+        response = requests.delete(f"{BASE_URL}/api/schedule-duties/does-not-exist")
+        assert response.status_code == 404
+
+    def test_empty_filter_rejected(self):
+        response = requests.post(f"{BASE_URL}/api/schedule-duties/cascade-delete", json={})
+        assert response.status_code == 400
@@ -0,0 +1,64 @@
+"""
+Test file for API response compression.
+Tests:
+1. gzip / Brotli negotiation via Accept-Encoding
+2. Small responses are sent uncompressed
+3. Every response varies on Accept-Encoding
+4. Per-route compression metrics
+"""
+
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL').rstrip('/')
+
+
+class TestCompression:
+    """Compression middleware on api_router responses"""
+
+    def test_gzip_personnel(self):
+        """Personnel list is gzip-encoded when the client accepts gzip"""
+        response = requests.get(f"{BASE_URL}/api/personnel", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers.get("content-encoding") == "gzip"
+        assert isinstance(response.json(), list)
+        print("SUCCESS: Personnel list gzip-encoded")
+
+    def test_identity_uncompressed(self):
+        """No compression without an accepted encoding"""
+        response = requests.get(f"{BASE_URL}/api/personnel", headers={"Accept-Encoding": "identity"})
+        assert response.status_code == 200
+        assert "content-encoding" not in response.headers
+        print("SUCCESS: identity response uncompressed")
+
+    def test_small_response_uncompressed(self):
+        """Responses below the minimum size are sent as-is"""
+        response = requests.get(f"{BASE_URL}/api/", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert "content-encoding" not in response.headers
+        print("SUCCESS: Small response left uncompressed")
+
+    def test_vary_on_every_response(self):
+        """Compressed and uncompressed responses both carry Vary: Accept-Encoding"""
+        for path, encoding in (("/api/personnel", "gzip"), ("/api/personnel", "identity"), ("/api/", "gzip")):
+            response = requests.get(f"{BASE_URL}{path}", headers={"Accept-Encoding": encoding})
+            assert "accept-encoding" in response.headers.get("vary", "").lower()
+        print("SUCCESS: Vary set on all responses")
+
+    def test_compression_metrics(self):
+        """Metrics report per-route byte counts and ratio"""
+        requests.get(f"{BASE_URL}/api/personnel", headers={"Accept-Encoding": "gzip"})
+        response = requests.get(f"{BASE_URL}/api/metrics/compression")
+        assert response.status_code == 200
+        stats = response.json()["GET /api/personnel"]
+        assert stats["compressed"] >= 1
+        assert stats["ratio"] > 1
+        print(f"SUCCESS: Personnel compression ratio {stats['ratio']}")
+
+    def test_unmatched_paths_share_key(self):
+        """404 paths are counted under one key instead of one per path"""
+        for path in ("/api/no-such-route-a", "/api/no-such-route-b"):
+            requests.get(f"{BASE_URL}{path}", headers={"Accept-Encoding": "gzip"})
+        stats = requests.get(f"{BASE_URL}/api/metrics/compression").json()
+        assert not any("no-such-route" in key for key in stats)
+        assert "<unmatched>" in stats
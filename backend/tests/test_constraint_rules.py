@@ -0,0 +1,117 @@
+"""
+Test file for the scheduling rules engine.
+Tests:
+1. Rule CRUD and validation of rule types
+2. min_rest_hours rejects assignments with too little rest (overnight shifts)
+3. max_consecutive_days checks a recurring series against itself
+4. Warning rules are reported by /api/validate without blocking writes
+5. Malformed dates return 400 from /api/validate and rule-checked writes
+"""
+
+import pytest
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL').rstrip('/')
+
+
+class TestConstraintRules:
+    """/api/constraint-rules and /api/validate"""
+
+    @pytest.fixture
+    def make_rule(self):
+        created = []
+
+        def _make(**body):
+            response = requests.post(f"{BASE_URL}/api/constraint-rules", json=body)
+            assert response.status_code == 200
+            created.append(response.json())
+            return created[-1]
+
+        yield _make
+        for rule in created:
+            requests.delete(f"{BASE_URL}/api/constraint-rules/{rule['id']}")
+
+    @pytest.fixture
+    def duty(self, schedule):
+        return schedule.duty("2031-09-01", "TR1", "TEST Rules Duty", duty_id="TEST-rules-duty",
+                             qualifications=["TEST-unobtainable"])
+
+    def test_unknown_rule_type_rejected(self):
+        """Unknown rule types return 400"""
+        response = requests.post(f"{BASE_URL}/api/constraint-rules", json={"type": "max_coffee"})
+        assert response.status_code == 400
+        print("SUCCESS: Unknown rule type rejected")
+
+    def test_rule_listed_and_deleted(self, make_rule):
+        """Created rules are listed; deleting twice returns 404"""
+        rule = make_rule(type="max_weekly_hours", value=48, severity="warning")
+        rules = requests.get(f"{BASE_URL}/api/constraint-rules").json()
+        assert any(r["id"] == rule["id"] for r in rules)
+        assert requests.delete(f"{BASE_URL}/api/constraint-rules/{rule['id']}").status_code == 200
+        assert requests.delete(f"{BASE_URL}/api/constraint-rules/{rule['id']}").status_code == 404
+        print("SUCCESS: Rule listed and deleted")
+
+    def test_min_rest_after_overnight_shift(self, make_rule, schedule, duty, person):
+        """A shift starting 4h after an overnight shift ends is rejected"""
+        make_rule(type="min_rest_hours", value=11)
+        response = requests.post(f"{BASE_URL}/api/assignments",
+                                 json=schedule.assignment_body(duty, person, "1800", "0600", date="2031-09-01"))
+        assert response.status_code == 200
+
+        response = requests.post(f"{BASE_URL}/api/assignments",
+                                 json=schedule.assignment_body(duty, person, "1000", "1400", date="2031-09-02"))
+        assert response.status_code == 422
+        violations = response.json()["detail"]["violations"]
+        assert violations[0]["type"] == "min_rest_hours"
+
+        response = requests.post(f"{BASE_URL}/api/assignments",
+                                 json=schedule.assignment_body(duty, person, "1800", "2200", date="2031-09-02"))
+        assert response.status_code == 200
+        print("SUCCESS: Rest period enforced across midnight")
+
+    def test_recurring_series_checked_as_batch(self, make_rule, schedule, duty, person):
+        """A daily series longer than the consecutive-day limit is rejected whole"""
+        make_rule(type="max_consecutive_days", value=3)
+        body = schedule.assignment_body(duty, person, "0800", "1000", date="2031-09-10")
+        body["start_date"] = body.pop("date")
+        body["recurrence"] = {"frequency": "daily", "interval": 1, "end_type": "occurrences", "occurrences": 5}
+        response = requests.post(f"{BASE_URL}/api/recurring-assignments", json=body)
+        assert response.status_code == 422
+
+        assignments = requests.get(f"{BASE_URL}/api/assignments", params={
+            "start_date": "2031-09-10",
+            "end_date": "2031-09-14",
+        }).json()
+        assert not [a for a in assignments if a["personnel_id"] == person["id"]]
+        print("SUCCESS: Recurring series rejected without partial writes")
+
+    def test_warning_reported_by_validate(self, make_rule, schedule, duty, person):
+        """Warning rules do not block writes but show up in /api/validate"""
+        make_rule(type="qualification_required", severity="warning")
+        response = requests.post(f"{BASE_URL}/api/assignments",
+                                 json=schedule.assignment_body(duty, person, "0800", "1000", date="2031-09-20"))
+        assert response.status_code == 200
+
+        response = requests.get(f"{BASE_URL}/api/validate", params={
+            "start_date": "2031-09-20",
+            "end_date": "2031-09-20",
+        })
+        assert response.status_code == 200
+        data = response.json()
+        assert data["valid"] is True
+        assert any(v["type"] == "qualification_required" for v in data["violations"])
+        print(f"SUCCESS: {len(data['violations'])} warnings reported")
+
+    def test_malformed_dates_rejected(self, make_rule, schedule, duty, person):
+        """Unparseable dates are a 400, not a 500 from the rules engine"""
+        response = requests.get(f"{BASE_URL}/api/validate", params={
+            "start_date": "2031-13-45",
+            "end_date": "2031-13-46",
+        })
+        assert response.status_code == 400
+        make_rule(type="min_rest_hours", value=8)
+        response = requests.post(f"{BASE_URL}/api/assignments",
+                                 json=schedule.assignment_body(duty, person, date="2031-9-x"))
+        assert response.status_code == 400
+        print("SUCCESS: Malformed dates rejected")
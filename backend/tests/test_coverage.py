@@ -0,0 +1,62 @@
+"""
+Test file for the coverage gap analysis endpoint.
+Tests:
+1. Unassigned single duty is one full-day gap
+2. Partially covered duty yields the uncovered intervals
+3. Overnight shifts cover the rest of the day
+4. Heatmap buckets follow granularity
+"""
+
+import pytest
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL').rstrip('/')
+
+TEST_DATE = "2031-10-06"
+
+
+class TestCoverage:
+    """GET /api/coverage"""
+
+    @pytest.fixture
+    def schedule_duty(self, schedule):
+        return schedule.duty(TEST_DATE, "TCV", "TEST Coverage Duty", duty_id="TEST-coverage")
+
+    def _gaps_for(self, duty_id, granularity="hour"):
+        response = requests.get(f"{BASE_URL}/api/coverage", params={
+            "start_date": TEST_DATE, "end_date": TEST_DATE, "granularity": granularity,
+        })
+        assert response.status_code == 200
+        data = response.json()
+        return data, [g for g in data["gaps"] if g["schedule_duty_id"] == duty_id]
+
+    def test_unassigned_duty_full_gap(self, schedule_duty):
+        _, gaps = self._gaps_for(schedule_duty["id"])
+        assert len(gaps) == 1
+        assert (gaps[0]["start_time"], gaps[0]["end_time"]) == ("0600", "1800")
+        assert gaps[0]["missing"] == 1
+        print("SUCCESS: Unassigned duty is one full-day gap")
+
+    def test_partial_assignment_gaps(self, schedule_duty, schedule, person):
+        schedule.assignment(schedule_duty, person, "0900", "1200")
+        _, gaps = self._gaps_for(schedule_duty["id"])
+        assert [(g["start_time"], g["end_time"]) for g in gaps] == [("0600", "0900"), ("1200", "1800")]
+        print("SUCCESS: Gaps exclude the assigned interval")
+
+    def test_overnight_assignment_covers_to_day_end(self, schedule_duty, schedule, person):
+        schedule.assignment(schedule_duty, person, "1600", "0200")
+        _, gaps = self._gaps_for(schedule_duty["id"])
+        assert [(g["start_time"], g["end_time"]) for g in gaps] == [("0600", "1600")]
+        print("SUCCESS: Overnight shift covers 1600-1800")
+
+    def test_heatmap_granularity(self, schedule_duty):
+        data, _ = self._gaps_for(schedule_duty["id"], granularity="30min")
+        assert len(data["heatmap"][TEST_DATE]) == 24
+        assert all(v >= 1 for v in data["heatmap"][TEST_DATE])
+
+    def test_invalid_granularity(self):
+        response = requests.get(f"{BASE_URL}/api/coverage", params={
+            "start_date": TEST_DATE, "end_date": TEST_DATE, "granularity": "minute",
+        })
+        assert response.status_code == 400
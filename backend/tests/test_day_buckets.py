@@ -0,0 +1,127 @@
+"""
+Test file for the day-bucket read model.
+Tests:
+1. Duty, group config and assignment writes show up in the day's bucket
+2. Moving an assignment moves it between buckets; deleting a duty empties its day
+3. The days endpoint returns one entry per date in the range
+4. The rebuild job re-derives buckets from the source collections
+5. format=grid returns packed occupancy lanes and a personnel table
+"""
+
+import pytest
+import requests
+import os
+import time
+import base64
+
+from conftest import wait_for_job
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL').rstrip('/')
+
+TEST_DATE = "2032-01-13"
+NEXT_DATE = "2032-01-14"
+
+
+def bits(data):
+    return "".join(f"{byte:08b}" for byte in data)
+
+
+class TestDayBuckets:
+    """/api/calendar/day and /api/calendar/days"""
+
+    @pytest.fixture
+    def duties(self, schedule):
+        return [
+            schedule.duty(date, "TBK", f"TEST Bucket {duty_type}", duty_type, duty_id=f"TEST-bucket-{duty_type}")
+            for date, duty_type in ((TEST_DATE, "group"), (NEXT_DATE, "single"))
+        ]
+
+    def _day(self, date, until=None, timeout=5):
+        """The day's bucket; with `until`, poll until it holds, as reads do
+        not wait for the writer"""
+        deadline = time.time() + timeout
+        while True:
+            response = requests.get(f"{BASE_URL}/api/calendar/day/{date}")
+            assert response.status_code == 200
+            day = response.json()
+            if until is None or until(day) or time.time() > deadline:
+                return day
+            time.sleep(0.1)
+
+    def test_writes_update_buckets(self, duties, schedule, person):
+        """Writes land in their day's bucket and follow moves and deletes"""
+        group, single = duties
+        requests.post(f"{BASE_URL}/api/duty-group-configs", json={
+            "schedule_duty_id": group["id"],
+            "duties": [{"name": "Pilot", "count": 2}],
+        })
+        assignment = schedule.assignment(group, person, sub_duty_name="Pilot")
+
+        day = self._day(TEST_DATE, until=lambda d: d["assignments"] and d["duty_group_configs"])
+        assert [d["id"] for d in day["schedule_duties"]] == [group["id"]]
+        assert day["duty_group_configs"][0]["duties"] == [{"name": "Pilot", "count": 2}]
+        assert [a["id"] for a in day["assignments"]] == [assignment["id"]]
+
+        response = requests.patch(f"{BASE_URL}/api/assignments/{assignment['id']}/move", json={"schedule_duty_id": single["id"]})
+        assert response.status_code == 200
+        assert self._day(TEST_DATE, until=lambda d: not d["assignments"])["assignments"] == []
+        moved = self._day(NEXT_DATE, until=lambda d: d["assignments"])["assignments"]
+        assert [(a["id"], a["date"], a["version"]) for a in moved] == [(assignment["id"], NEXT_DATE, 1)]
+
+        requests.delete(f"{BASE_URL}/api/schedule-duties/{group['id']}")
+        day = self._day(TEST_DATE, until=lambda d: not d["schedule_duties"])
+        assert day["schedule_duties"] == [] and day["duty_group_configs"] == []
+        print("SUCCESS: Buckets follow writes")
+
+    def test_days_range(self, duties):
+        """One entry per date, empty days included"""
+        self._day(TEST_DATE, until=lambda d: d["schedule_duties"])
+        response = requests.get(f"{BASE_URL}/api/calendar/days", params={"start_date": "2032-01-12", "end_date": "2032-01-18"})
+        assert response.status_code == 200
+        days = response.json()["days"]
+        assert [d["date"] for d in days] == [f"2032-01-{n}" for n in range(12, 19)]
+        assert days[0]["schedule_duties"] == []
+        assert len(days[1]["schedule_duties"]) == 1
+
+        response = requests.get(f"{BASE_URL}/api/calendar/days", params={"start_date": "2032-01-12", "end_date": "2032-06-12"})
+        assert response.status_code == 400
+
+    def test_rebuild_job(self, duties):
+        """Rebuilding a range reproduces the incrementally maintained buckets"""
+        before = self._day(TEST_DATE, until=lambda d: d["schedule_duties"])
+        response = requests.post(f"{BASE_URL}/api/jobs/rebuild-day-buckets", json={
+            "start_date": TEST_DATE, "end_date": NEXT_DATE,
+        })
+        assert response.status_code == 202
+        job = wait_for_job(response.json()["job_id"])
+        assert job["status"] == "succeeded"
+        assert job["result"]["days"] == 2
+        assert self._day(TEST_DATE) == before
+        print("SUCCESS: Rebuild matches incremental buckets")
+
+    def test_grid_format(self, duties, schedule):
+        """Each person gets a lane of occupied cells; people are listed once"""
+        group, single = duties
+        people = requests.get(f"{BASE_URL}/api/personnel").json()[:2]
+        for person, start_time, end_time in ((people[0], "0600", "0700"), (people[0], "0900", "1030"), (people[1], "0630", "0800")):
+            schedule.assignment(group, person, start_time, end_time)
+        self._day(TEST_DATE, until=lambda d: len(d["assignments"]) == 3)
+
+        response = requests.get(f"{BASE_URL}/api/calendar/day/{TEST_DATE}", params={"format": "grid", "granularity": "30min"})
+        assert response.status_code == 200
+        grid = response.json()
+        assert "assignments" not in grid
+        assert grid["cells"] == 24 and grid["bytes_per_lane"] == 3
+        assert [p["id"] for p in grid["personnel"]] == [people[0]["id"], people[1]["id"]]
+
+        row = grid["rows"][group["id"]]
+        assert row["personnel"] == [0, 1]
+        lanes = base64.b64decode(row["lanes"])
+        assert bits(lanes[:3]) == "110000111000000000000000"   # 0600-0700, 0900-1030
+        assert bits(lanes[3:]) == "011100000000000000000000"   # 0630-0800
+        assert bits(base64.b64decode(row["occupied"])) == "111100111000000000000000"
+        assert list(grid["rows"]) == [group["id"]]
+
+        response = requests.get(f"{BASE_URL}/api/calendar/day/{TEST_DATE}", params={"format": "xml"})
+        assert response.status_code == 400
+        print("SUCCESS: Grid format packs occupancy per person")
@@ -0,0 +1,30 @@
+"""
+Test file for MongoDB connection pool metrics.
+Tests:
+1. Pool metrics shape
+2. Checkout counters advance with traffic
+"""
+
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL').rstrip('/')
+
+
+class TestDbPoolMetrics:
+    """GET /api/metrics/db-pool"""
+
+    def test_pool_metrics_shape(self):
+        response = requests.get(f"{BASE_URL}/api/metrics/db-pool")
+        assert response.status_code == 200
+        data = response.json()
+        for key in ("checkouts", "checked_out", "wait_ms_avg", "wait_ms_max", "secondary_read_routes"):
+            assert key in data
+        print(f"SUCCESS: Pool metrics {data}")
+
+    def test_checkouts_advance(self):
+        before = requests.get(f"{BASE_URL}/api/metrics/db-pool").json()["checkouts"]
+        requests.get(f"{BASE_URL}/api/personnel")
+        after = requests.get(f"{BASE_URL}/api/metrics/db-pool").json()["checkouts"]
+        assert after > before
+        print(f"SUCCESS: Checkouts advanced {before} -> {after}")
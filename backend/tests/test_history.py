@@ -0,0 +1,72 @@
+"""
+Test file for the change log.
+Tests:
+1. Assignment create/update/delete events with actor from X-Actor
+2. Updates store only the changed fields as [old, new]
+3. Publishing a month is recorded
+4. /api/history requires a filter
+"""
+
+import time
+
+import pytest
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL').rstrip('/')
+
+TEST_DATE = "2031-11-05"
+PUBLISH_PERIOD = "2031-12"
+# Events are written in batches; wait past the flush interval
+FLUSH_WAIT = 1.5
+
+
+class TestHistory:
+    """GET /api/history"""
+
+    @pytest.fixture
+    def duty(self, schedule):
+        return schedule.duty(TEST_DATE, "TH1", "TEST History Duty", duty_id="TEST-history-duty")
+
+    def test_assignment_lifecycle_recorded(self, duty, schedule):
+        """Create, reassign and delete each leave one event, newest first"""
+        first, second = requests.get(f"{BASE_URL}/api/personnel").json()[:2]
+        headers = {"X-Actor": "TEST-history-actor"}
+        assignment = requests.post(f"{BASE_URL}/api/assignments", headers=headers,
+                                   json=schedule.assignment_body(duty, first)).json()
+        requests.put(f"{BASE_URL}/api/assignments/{assignment['id']}", headers=headers, json={
+            "personnel_id": second["id"],
+            "personnel_name": second["name"],
+            "personnel_callsign": second["callsign"],
+        })
+        requests.delete(f"{BASE_URL}/api/assignments/{assignment['id']}", headers=headers)
+        time.sleep(FLUSH_WAIT)
+
+        response = requests.get(f"{BASE_URL}/api/history", params={"entity_id": assignment["id"]})
+        assert response.status_code == 200
+        events = response.json()
+        assert [e["action"] for e in events] == ["delete", "update", "create"]
+        assert all(e["actor"] == "TEST-history-actor" for e in events)
+
+        update = events[1]
+        assert update["changes"]["personnel_id"] == [first["id"], second["id"]]
+        assert "date" not in update["changes"]
+        assert events[0]["before"]["personnel_id"] == second["id"]
+        print("SUCCESS: Assignment history recorded")
+
+    def test_publish_recorded(self):
+        """A publish leaves a create event with the revision, not the snapshot"""
+        published = requests.post(f"{BASE_URL}/api/publish/{PUBLISH_PERIOD}").json()
+        time.sleep(FLUSH_WAIT)
+
+        events = requests.get(f"{BASE_URL}/api/history", params={"entity_id": published["id"]}).json()
+        assert [(e["entity"], e["action"]) for e in events] == [("published_schedule", "create")]
+        assert events[0]["after"]["revision"] == published["revision"]
+        assert "assignments" not in events[0]["after"]
+        print("SUCCESS: Publish recorded")
+
+    def test_filter_required(self):
+        """An unfiltered history request returns 400"""
+        response = requests.get(f"{BASE_URL}/api/history")
+        assert response.status_code == 400
+        print("SUCCESS: Unfiltered history rejected")
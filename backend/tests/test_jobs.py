@@ -0,0 +1,60 @@
+"""
+Test file for background jobs.
+Tests:
+1. Recurring assignments as a background job
+2. Counter reconciliation job
+3. Job lookup and cancellation
+"""
+
+import pytest
+import requests
+import os
+
+from conftest import wait_for_job
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL').rstrip('/')
+
+
+class TestJobs:
+    """Job submission, progress and cancellation"""
+
+    @pytest.fixture
+    def schedule_duty(self, schedule):
+        # The recurrence adds an occurrence of the duty for each day
+        schedule.clear("2031-07-01", "2031-07-04")
+        return schedule.duty("2031-07-01", "TJ1", "TEST Job Duty", duty_id="TEST-job-duty")
+
+    def test_recurring_assignments_job(self, schedule_duty, schedule, person):
+        """Recurrence expansion runs as a job and reports progress"""
+        body = schedule.assignment_body(schedule_duty, person)
+        body["start_date"] = body.pop("date")
+        body["recurrence"] = {"frequency": "daily", "interval": 1, "end_type": "occurrences", "occurrences": 4}
+        response = requests.post(f"{BASE_URL}/api/jobs/recurring-assignments", json=body)
+        assert response.status_code == 202
+        job = wait_for_job(response.json()["job_id"])
+        assert job["status"] == "succeeded"
+        assert job["done"] == job["total"] == 4
+        assert job["result"]["created_count"] == 4
+        print(f"SUCCESS: Recurring job created {job['result']['created_count']} assignments")
+
+    def test_reconcile_counters_job(self):
+        """Counter reconciliation completes and reports corrections"""
+        response = requests.post(f"{BASE_URL}/api/jobs/reconcile-counters")
+        assert response.status_code == 202
+        job = wait_for_job(response.json()["job_id"])
+        assert job["status"] == "succeeded"
+        assert "corrected" in job["result"]
+        print(f"SUCCESS: Reconciled {job['result']['checked']} personnel")
+
+    def test_cancel_finished_job_is_noop(self):
+        """Cancelling a finished job leaves its status unchanged"""
+        job_id = requests.post(f"{BASE_URL}/api/jobs/reconcile-counters").json()["job_id"]
+        wait_for_job(job_id)
+        response = requests.post(f"{BASE_URL}/api/jobs/{job_id}/cancel")
+        assert response.status_code == 200
+        assert response.json()["status"] == "succeeded"
+
+    def test_unknown_job(self):
+        """Unknown job ids return 404"""
+        response = requests.get(f"{BASE_URL}/api/jobs/does-not-exist")
+        assert response.status_code == 404
@@ -0,0 +1,64 @@
+"""
+Test file for MessagePack content negotiation.
+Tests:
+1. Accept: application/msgpack returns a MessagePack list with the JSON content
+2. Calendar routes negotiate too; JSON stays the default and wins on higher q
+3. MessagePack request bodies are accepted on bulk write routes
+"""
+
+import pytest
+import requests
+import os
+
+msgpack = pytest.importorskip("msgpack")
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL').rstrip('/')
+
+MSGPACK = {"Accept": "application/msgpack"}
+
+
+class TestMessagePack:
+    """Accept / Content-Type negotiation on api_router routes"""
+
+    def test_list_route(self):
+        """Personnel list decodes to the same rows as the JSON response"""
+        response = requests.get(f"{BASE_URL}/api/personnel", headers=MSGPACK)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/msgpack"
+        assert "Accept" in response.headers["vary"]
+        assert msgpack.unpackb(response.content) == requests.get(f"{BASE_URL}/api/personnel").json()
+        print("SUCCESS: Personnel list packed as MessagePack")
+
+    def test_calendar_route(self):
+        """Calendar days negotiate; JSON is the default and honours q-values"""
+        params = {"start_date": "2032-02-02", "end_date": "2032-02-04"}
+        response = requests.get(f"{BASE_URL}/api/calendar/days", params=params, headers=MSGPACK)
+        assert response.status_code == 200
+        days = msgpack.unpackb(response.content)["days"]
+        assert [d["date"] for d in days] == ["2032-02-02", "2032-02-03", "2032-02-04"]
+
+        response = requests.get(f"{BASE_URL}/api/calendar/days", params=params)
+        assert response.headers["content-type"].startswith("application/json")
+        response = requests.get(f"{BASE_URL}/api/calendar/days", params=params, headers={
+            "Accept": "application/json, application/msgpack;q=0.5",
+        })
+        assert response.headers["content-type"].startswith("application/json")
+        print("SUCCESS: Calendar days negotiated")
+
+    def test_msgpack_request_body(self):
+        """A MessagePack batch body runs like its JSON equivalent"""
+        body = {"requests": [
+            {"method": "GET", "path": "/api/personnel"},
+            {"method": "GET", "path": "/api/duties"},
+        ]}
+        response = requests.post(f"{BASE_URL}/api/batch", data=msgpack.packb(body), headers={
+            "Content-Type": "application/msgpack", **MSGPACK,
+        })
+        assert response.status_code == 200
+        result = msgpack.unpackb(response.content)
+        assert [r["status"] for r in result["responses"]] == [200, 200]
+        assert isinstance(result["responses"][0]["body"], list)
+
+        response = requests.post(f"{BASE_URL}/api/batch", data=b"\xc1", headers={"Content-Type": "application/msgpack"})
+        assert response.status_code == 400
+        print("SUCCESS: MessagePack request body accepted")
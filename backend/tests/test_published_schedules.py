@@ -0,0 +1,73 @@
+"""
+Test file for the draft/publish workflow.
+Tests:
+1. Publishing a month snapshots its draft as a new revision
+2. Later draft edits do not change the published roster until republished
+3. ETag revalidation returns 304 for an unchanged roster
+4. Malformed periods are rejected
+"""
+
+import pytest
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL').rstrip('/')
+
+PERIOD = "2031-10"
+TEST_DATE = "2031-10-08"
+
+
+class TestPublishedSchedules:
+    """/api/publish and /api/published"""
+
+    @pytest.fixture
+    def assignment(self, schedule, person):
+        duty = schedule.duty(TEST_DATE, "TP1", "TEST Publish Duty", duty_id="TEST-publish-duty")
+        return schedule.assignment(duty, person)
+
+    def test_publish_creates_revision(self, assignment):
+        """Each publish adds a revision with the month's assignments"""
+        response = requests.post(f"{BASE_URL}/api/publish/{PERIOD}")
+        assert response.status_code == 200
+        published = response.json()
+        assert published["period"] == PERIOD
+        assert published["start_date"] == "2031-10-01"
+        assert published["end_date"] == "2031-10-31"
+
+        roster = requests.get(f"{BASE_URL}/api/published/{PERIOD}").json()
+        assert roster["revision"] == published["revision"]
+        assert any(a["id"] == assignment["id"] for a in roster["assignments"])
+        print(f"SUCCESS: Published revision {published['revision']}")
+
+    def test_draft_edits_do_not_touch_published(self, assignment):
+        """Deleting a draft assignment leaves the published roster intact"""
+        revision = requests.post(f"{BASE_URL}/api/publish/{PERIOD}").json()["revision"]
+        requests.delete(f"{BASE_URL}/api/assignments/{assignment['id']}")
+
+        roster = requests.get(f"{BASE_URL}/api/published/{PERIOD}").json()
+        assert roster["revision"] == revision
+        assert any(a["id"] == assignment["id"] for a in roster["assignments"])
+
+        republished = requests.post(f"{BASE_URL}/api/publish/{PERIOD}").json()
+        assert republished["revision"] == revision + 1
+        roster = requests.get(f"{BASE_URL}/api/published/{PERIOD}").json()
+        assert not any(a["id"] == assignment["id"] for a in roster["assignments"])
+
+        old = requests.get(f"{BASE_URL}/api/published/{PERIOD}/revisions/{revision}").json()
+        assert any(a["id"] == assignment["id"] for a in old["assignments"])
+        print("SUCCESS: Published roster only changes on publish")
+
+    def test_etag_revalidation(self, assignment):
+        """If-None-Match with the current ETag returns 304"""
+        requests.post(f"{BASE_URL}/api/publish/{PERIOD}")
+        response = requests.get(f"{BASE_URL}/api/published/{PERIOD}")
+        etag = response.headers["ETag"]
+        response = requests.get(f"{BASE_URL}/api/published/{PERIOD}", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        print("SUCCESS: Unchanged roster revalidates as 304")
+
+    def test_invalid_period(self):
+        """Periods must be YYYY-MM"""
+        assert requests.post(f"{BASE_URL}/api/publish/2031-7").status_code == 400
+        assert requests.get(f"{BASE_URL}/api/published/october").status_code == 400
+        print("SUCCESS: Malformed periods rejected")
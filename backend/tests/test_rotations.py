@@ -0,0 +1,103 @@
+"""
+Test file for team rotation generation.
+Tests:
+1. A 4-on/4-off rotation with offsets creates the expected days per member
+2. Personnel counters are incremented by each member's working days
+3. Rotations of several insert chunks reach /sync deltas in full
+4. Unknown patterns and empty cycles are rejected
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL').rstrip('/')
+
+# Rows per insert chunk on the server (ROTATION_INSERT_CHUNK)
+INSERT_CHUNK = int(os.environ.get('ROTATION_INSERT_CHUNK', '1000'))
+
+
+class TestRotations:
+    """POST /api/rotations"""
+
+    @pytest.fixture
+    def schedule_duty(self, schedule):
+        # Rotations add an occurrence of the duty for each working day
+        schedule.clear("2031-11-01", "2031-11-30")
+        return schedule.duty("2031-11-01", "TRO", "TEST Rotation Duty", duty_id="TEST-rotation-duty")
+
+    def test_four_on_four_off(self, schedule_duty, schedule):
+        """Two members offset by four days cover every day between them"""
+        first, second = schedule.person("rotation-1"), schedule.person("rotation-2")
+        response = requests.post(f"{BASE_URL}/api/rotations", json={
+            "schedule_duty_id": schedule_duty["id"],
+            "members": [{"personnel_id": first["id"]}, {"personnel_id": second["id"], "offset": 4}],
+            "pattern": "4on4off",
+            "start_date": "2031-11-01",
+            "end_date": "2031-11-16",
+            "start_time": "0800",
+            "end_time": "1600",
+        })
+        assert response.status_code == 200
+        data = response.json()
+        assert data["created_count"] == 16
+        assert data["per_person"] == {first["id"]: 8, second["id"]: 8}
+
+        assignments = requests.get(f"{BASE_URL}/api/assignments", params={
+            "start_date": "2031-11-01", "end_date": "2031-11-16",
+        }).json()
+        first_days = sorted(a["date"][-2:] for a in assignments if a["personnel_id"] == first["id"])
+        assert first_days == ["01", "02", "03", "04", "09", "10", "11", "12"]
+        second_days = sorted(a["date"][-2:] for a in assignments if a["personnel_id"] == second["id"])
+        assert second_days == ["05", "06", "07", "08", "13", "14", "15", "16"]
+        assert all(a["duty_code"] == "TRO" for a in assignments if a["personnel_id"] == first["id"])
+
+        person = next(p for p in requests.get(f"{BASE_URL}/api/personnel", params={"search": first["callsign"]}).json()
+                      if p["id"] == first["id"])
+        assert person["total_duties"] == 8
+        print("SUCCESS: 4-on/4-off rotation expanded")
+
+    def test_multi_chunk_rotation_in_sync_delta(self, schedule):
+        """Every chunk's rows are newer than a token taken before the rotation"""
+        members = [schedule.person(f"rotation-chunk-{i}") for i in range(2)]
+        days = INSERT_CHUNK // 2 + 100  # everyone works every day: more than one chunk
+        start_date, end_date = "2041-01-01", (datetime(2041, 1, 1) + timedelta(days=days - 1)).strftime("%Y-%m-%d")
+        schedule.clear(start_date, end_date)
+        duty = schedule.duty(start_date, "TRC", "TEST Rotation Chunks", duty_id="TEST-rotation-chunks")
+        sync_range = {"start_date": start_date, "end_date": end_date}
+        token = requests.get(f"{BASE_URL}/api/sync", params=sync_range).json()["token"]
+
+        response = requests.post(f"{BASE_URL}/api/rotations", json={
+            "schedule_duty_id": duty["id"],
+            "members": [{"personnel_id": p["id"]} for p in members],
+            "cycle": [1],
+            "start_date": start_date,
+            "end_date": end_date,
+            "start_time": "0800",
+            "end_time": "1600",
+        })
+        assert response.status_code == 200
+        assert response.json()["created_count"] == 2 * days > INSERT_CHUNK
+
+        delta = requests.get(f"{BASE_URL}/api/sync", params={**sync_range, "since": token}).json()
+        member_ids = {p["id"] for p in members}
+        rows = [a for a in delta["assignments"] if a["personnel_id"] in member_ids]
+        assert len(rows) == 2 * days
+        assert len({a["updated_at"] for a in rows}) >= 2  # stamped per chunk
+        print(f"SUCCESS: {len(rows)} rotation rows in the delta")
+
+    def test_invalid_cycles_rejected(self, schedule_duty, person):
+        """Unknown pattern names and all-off cycles return 400"""
+        body = {
+            "schedule_duty_id": schedule_duty["id"],
+            "members": [{"personnel_id": person["id"]}],
+            "start_date": "2031-11-01",
+            "end_date": "2031-11-07",
+            "start_time": "0800",
+            "end_time": "1600",
+        }
+        assert requests.post(f"{BASE_URL}/api/rotations", json={**body, "pattern": "9on1off"}).status_code == 400
+        assert requests.post(f"{BASE_URL}/api/rotations", json={**body, "cycle": [0, 0]}).status_code == 400
+        print("SUCCESS: Invalid cycles rejected")
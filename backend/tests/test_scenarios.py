@@ -0,0 +1,129 @@
+"""
+Test file for what-if scenarios.
+Tests:
+1. Scenario edits are visible in the scenario but not in the live schedule
+2. Coverage and diff are computed from the overlay
+3. Commit writes the diff back and removes the scenario
+4. Commit after a concurrent live edit returns 409
+5. Committed moves across dates leave a tombstone on the old date
+"""
+
+import pytest
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL').rstrip('/')
+
+TEST_DATE = "2031-12-03"
+
+
+class TestScenarios:
+    """/api/scenarios"""
+
+    @pytest.fixture
+    def duty(self, schedule):
+        # Commits add duties through the scenario that the factory does not know about
+        schedule.clear("2031-12-01", "2031-12-31")
+        return schedule.duty(TEST_DATE, "TSC", "TEST Scenario Duty", duty_id="TEST-scenario-duty")
+
+    @pytest.fixture
+    def assignment(self, schedule, duty, person):
+        return schedule.assignment(duty, person, "0600", "1000")
+
+    @pytest.fixture
+    def scenario(self, assignment):
+        response = requests.post(f"{BASE_URL}/api/scenarios", json={"start_date": "2031-12-01", "end_date": "2031-12-07"})
+        assert response.status_code == 200
+        scenario = response.json()
+        yield scenario
+        requests.delete(f"{BASE_URL}/api/scenarios/{scenario['id']}")
+
+    def _live_assignment(self, assignment_id):
+        rows = requests.get(f"{BASE_URL}/api/assignments", params={"date": TEST_DATE}).json()
+        return next((a for a in rows if a["id"] == assignment_id), None)
+
+    def test_edits_stay_in_scenario(self, scenario, assignment):
+        """Moves change scenario reads, coverage and diff but not the database"""
+        assert scenario["counts"]["assignments"] >= 1
+        url = f"{BASE_URL}/api/scenarios/{scenario['id']}"
+        response = requests.patch(f"{url}/assignments/{assignment['id']}/move", json={"start_time": "1400", "end_time": "1800"})
+        assert response.status_code == 200
+        assert response.json()["start_time"] == "1400"
+
+        moved = next(a for a in requests.get(f"{url}/assignments", params={"date": TEST_DATE}).json()
+                     if a["id"] == assignment["id"])
+        assert moved["start_time"] == "1400"
+        assert self._live_assignment(assignment["id"])["start_time"] == "0600"
+
+        gaps = [g for g in requests.get(f"{url}/coverage").json()["gaps"]
+                if g["schedule_duty_id"] == assignment["schedule_duty_id"]]
+        assert [(g["start_time"], g["end_time"]) for g in gaps] == [("0600", "1400")]
+
+        diff = requests.get(f"{url}/diff").json()
+        assert diff["assignments"]["updated"] == [
+            {"id": assignment["id"], "changes": {"start_time": ["0600", "1400"], "end_time": ["1000", "1800"]}}
+        ]
+        print("SUCCESS: Scenario edits isolated from the live schedule")
+
+    def test_commit(self, scenario, assignment, duty):
+        """Commit writes moves and deletes back and drops the scenario"""
+        url = f"{BASE_URL}/api/scenarios/{scenario['id']}"
+        requests.patch(f"{url}/assignments/{assignment['id']}/move", json={"start_time": "1200", "end_time": "1400"})
+        response = requests.post(f"{url}/schedule-duties", json={
+            "duty_id": "TEST-scenario-extra",
+            "duty_name": "TEST Scenario Extra",
+            "duty_code": "TSX",
+            "duty_type": "single",
+            "date": "2031-12-04",
+        })
+        extra = response.json()
+
+        response = requests.post(f"{url}/commit")
+        assert response.status_code == 200
+        changes = response.json()["changes"]
+        assert changes["assignments"]["updated"] == 1
+        assert changes["schedule_duties"]["created"] == 1
+
+        live = self._live_assignment(assignment["id"])
+        assert live["start_time"] == "1200"
+        assert live["version"] == assignment["version"] + 1
+        duties = requests.get(f"{BASE_URL}/api/schedule-duties", params={"date": "2031-12-04"}).json()
+        assert any(d["id"] == extra["id"] for d in duties)
+        assert requests.get(url).status_code == 404
+        print("SUCCESS: Scenario committed")
+
+    def test_commit_move_across_dates(self, scenario, assignment):
+        """A committed move to another date tombstones the old date for /sync"""
+        url = f"{BASE_URL}/api/scenarios/{scenario['id']}"
+        token = requests.get(f"{BASE_URL}/api/sync", params={"start_date": TEST_DATE, "end_date": TEST_DATE}).json()["token"]
+        requests.post(f"{url}/schedule-duties", json={
+            "duty_id": "TEST-scenario-duty",
+            "duty_name": "TEST Scenario Duty",
+            "duty_code": "TSC",
+            "duty_type": "single",
+            "date": "2031-12-04",
+        })
+        response = requests.patch(f"{url}/assignments/{assignment['id']}/move", json={"date": "2031-12-04"})
+        assert response.status_code == 200
+        assert requests.post(f"{url}/commit").status_code == 200
+
+        sync = requests.get(f"{BASE_URL}/api/sync", params={
+            "start_date": TEST_DATE, "end_date": TEST_DATE, "since": token,
+        }).json()
+        assert assignment["id"] in sync["deleted"]["assignments"]
+        print("SUCCESS: Cross-date scenario move tombstoned")
+
+    def test_commit_conflict(self, scenario, assignment):
+        """A live edit to a row the scenario changed turns commit into a 409"""
+        url = f"{BASE_URL}/api/scenarios/{scenario['id']}"
+        requests.patch(f"{url}/assignments/{assignment['id']}/move", json={"start_time": "1200", "end_time": "1400"})
+        response = requests.patch(f"{BASE_URL}/api/assignments/{assignment['id']}/move", json={"start_time": "0700"})
+        assert response.status_code == 200
+        response = requests.post(f"{url}/commit")
+        assert response.status_code == 409
+        assert self._live_assignment(assignment["id"])["start_time"] == "0700"
+        print("SUCCESS: Stale scenario commit rejected")
+
+    def test_unknown_scenario(self):
+        """Unknown scenario ids return 404"""
+        assert requests.get(f"{BASE_URL}/api/scenarios/nope/assignments").status_code == 404
@@ -0,0 +1,57 @@
+"""
+Test file for the schedule duty natural key (duty_id, date, duty_type).
+Tests:
+1. Adding an existing occurrence returns it instead of a duplicate
+2. Re-running a recurrence reuses the schedule duties it created
+"""
+
+import pytest
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL').rstrip('/')
+
+START_DATE = "2032-01-05"
+
+
+class TestScheduleDutyKey:
+    """POST /api/schedule-duties and /api/recurring-assignments"""
+
+    @pytest.fixture
+    def duty(self, schedule):
+        # Recurrences add an occurrence of the duty for each week
+        schedule.clear("2032-01-01", "2032-01-31")
+        return schedule.duty(START_DATE, "TK1", "TEST Key Duty", duty_id="TEST-key-duty")
+
+    def _duties(self):
+        duties = requests.get(f"{BASE_URL}/api/schedule-duties", params={
+            "start_date": "2032-01-01",
+            "end_date": "2032-01-31",
+        }).json()
+        return [d for d in duties if d["duty_id"] == "TEST-key-duty"]
+
+    def test_add_existing_occurrence(self, duty):
+        """The same duty, date and type maps to one row"""
+        response = requests.post(f"{BASE_URL}/api/schedule-duties", json={
+            "duty_id": "TEST-key-duty",
+            "duty_name": "TEST Key Duty",
+            "duty_code": "TK1",
+            "duty_type": "single",
+            "date": START_DATE,
+        })
+        assert response.status_code == 200
+        assert response.json()["id"] == duty["id"]
+        assert len(self._duties()) == 1
+        print("SUCCESS: Existing occurrence returned")
+
+    def test_recurrence_reuses_occurrences(self, duty, schedule, person):
+        """Two identical recurrences create each occurrence once"""
+        body = schedule.assignment_body(duty, person)
+        body["start_date"] = body.pop("date")
+        body["recurrence"] = {"frequency": "weekly", "interval": 1, "end_type": "occurrences", "occurrences": 3}
+        first = requests.post(f"{BASE_URL}/api/recurring-assignments", json=body).json()
+        second = requests.post(f"{BASE_URL}/api/recurring-assignments", json=body).json()
+        assert len(self._duties()) == 3
+        assert first["assignments"][0]["schedule_duty_id"] == duty["id"]
+        assert [a["schedule_duty_id"] for a in first["assignments"]] == [a["schedule_duty_id"] for a in second["assignments"]]
+        print("SUCCESS: Recurrence reuses schedule duties")
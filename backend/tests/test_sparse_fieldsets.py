@@ -0,0 +1,58 @@
+"""
+Test file for field projection on read endpoints.
+Tests:
+1. fields= returns only the requested fields (plus id)
+2. view=summary presets for month view
+3. Unknown fields / views are rejected
+"""
+
+import requests
+import os
+from datetime import datetime
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL').rstrip('/')
+
+
+class TestSparseFieldsets:
+    """fields= and view= on list routes"""
+
+    def test_personnel_fields(self):
+        """Only requested personnel fields are returned"""
+        response = requests.get(f"{BASE_URL}/api/personnel", params={"fields": "callsign,total_duties"})
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data) > 0
+        for person in data:
+            assert set(person.keys()) == {"id", "callsign", "total_duties"}
+        print(f"SUCCESS: Got {len(data)} sparse personnel rows")
+
+    def test_assignments_summary_view(self):
+        """view=summary drops personnel and timestamp fields from assignments"""
+        today = datetime.now().strftime("%Y-%m-%d")
+        response = requests.get(f"{BASE_URL}/api/assignments", params={"date": today, "view": "summary"})
+        assert response.status_code == 200
+        for a in response.json():
+            assert set(a.keys()) <= {"id", "schedule_duty_id", "duty_code", "date"}
+        print("SUCCESS: Summary view returns month-grid fields only")
+
+    def test_schedule_duties_summary_view(self):
+        """view=summary drops qualifications and created_at from schedule duties"""
+        today = datetime.now().strftime("%Y-%m-%d")
+        response = requests.get(f"{BASE_URL}/api/schedule-duties", params={"date": today, "view": "summary"})
+        assert response.status_code == 200
+        for duty in response.json():
+            assert "qualifications" not in duty
+            assert "created_at" not in duty
+        print("SUCCESS: Summary view trims schedule duties")
+
+    def test_unknown_field_rejected(self):
+        """Unknown fields return 400"""
+        response = requests.get(f"{BASE_URL}/api/assignments", params={"fields": "id,password"})
+        assert response.status_code == 400
+        print("SUCCESS: Unknown field rejected")
+
+    def test_unknown_view_rejected(self):
+        """Unknown views return 400"""
+        response = requests.get(f"{BASE_URL}/api/personnel", params={"view": "tiny"})
+        assert response.status_code == 400
+        print("SUCCESS: Unknown view rejected")
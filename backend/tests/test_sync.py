@@ -0,0 +1,55 @@
+"""
+Test file for the incremental sync endpoint.
+Tests:
+1. No token returns the whole range with reset=true
+2. A token returns only rows changed since, plus tombstones for deletes
+3. Invalid and expired tokens
+"""
+
+import pytest
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL').rstrip('/')
+
+RANGE = {"start_date": "2031-12-01", "end_date": "2031-12-31"}
+TEST_DATE = "2031-12-09"
+
+
+class TestSync:
+    """GET /api/sync"""
+
+    @pytest.fixture
+    def duty(self, schedule):
+        return schedule.duty(TEST_DATE, "TY1", "TEST Sync Duty", duty_id="TEST-sync-duty")
+
+    def test_full_then_delta(self, duty, schedule, person):
+        """A delta after one create and one delete carries just those rows"""
+        full = requests.get(f"{BASE_URL}/api/sync", params=RANGE).json()
+        assert full["reset"] is True
+        assert any(d["id"] == duty["id"] for d in full["schedule_duties"])
+
+        assignment = schedule.assignment(duty, person)
+
+        delta = requests.get(f"{BASE_URL}/api/sync", params={**RANGE, "since": full["token"]}).json()
+        assert delta["reset"] is False
+        assert [a["id"] for a in delta["assignments"]] == [assignment["id"]]
+
+        requests.delete(f"{BASE_URL}/api/assignments/{assignment['id']}")
+        delta = requests.get(f"{BASE_URL}/api/sync", params={**RANGE, "since": full["token"]}).json()
+        assert assignment["id"] in delta["deleted"]["assignments"]
+        assert not any(a["id"] == assignment["id"] for a in delta["assignments"])
+        print("SUCCESS: Delta carries created and deleted rows only")
+
+    def test_invalid_token(self):
+        """Unparseable tokens return 400"""
+        response = requests.get(f"{BASE_URL}/api/sync", params={**RANGE, "since": "yesterday"})
+        assert response.status_code == 400
+        print("SUCCESS: Invalid token rejected")
+
+    def test_expired_token_resets(self):
+        """Tokens older than the tombstone retention force a full reload"""
+        response = requests.get(f"{BASE_URL}/api/sync", params={**RANGE, "since": "2020-01-01T00:00:00+00:00"})
+        assert response.status_code == 200
+        assert response.json()["reset"] is True
+        print("SUCCESS: Expired token resets")
@@ -59,12 +59,18 @@ function ReassignPopover({ assignment, onReassign, onClose }) {
         personnel_id: person.id,
         personnel_name: person.name,
         personnel_callsign: person.callsign,
+        expected_version: assignment.version,
       });
       toast.success(`Reassigned to ${person.name}`);
       onReassign();
       onClose();
     } catch (e) {
-      toast.error("Failed to reassign");
+      if (e.response?.status === 409) {
+        toast.error("Someone else changed this assignment. Refreshed.");
+        onReassign();
+      } else {
+        toast.error("Failed to reassign");
+      }
       console.error(e);
     }
   };
@@ -131,6 +137,8 @@ export default function CalendarGrid({
   onAssignmentUpdated,
   activeView = "Day",
   baseDate = new Date(),
+  monthSummary = {},
+  onDaySelect,
 }) {
   const [reassignBlock, setReassignBlock] = useState(null);
 
@@ -156,18 +164,6 @@ export default function CalendarGrid({
     return days;
   };
 
-  // Get duties for a specific date
-  const getDutiesForDate = (date) => {
-    const dateStr = format(date, "yyyy-MM-dd");
-    return scheduleDuties.filter((d) => d.date === dateStr);
-  };
-
-  // Get assignments for a specific date
-  const getAssignmentsForDate = (date) => {
-    const dateStr = format(date, "yyyy-MM-dd");
-    return assignments.filter((a) => a.date === dateStr);
-  };
-
   // Render Daily View
   if (activeView === "Day") {
     return (
@@ -322,8 +318,7 @@ export default function CalendarGrid({
           <div className="grid grid-cols-7">
             {monthDays.map((day, idx) => {
               const dateStr = format(day, "yyyy-MM-dd");
-              const dayDuties = getDutiesForDate(day);
-              const dayAssignments = getAssignmentsForDate(day);
+              const dayDuties = monthSummary[dateStr] || [];
               const isCurrentMonth = isSameMonth(day, baseDate);
               const isSelectedDay = isSameDay(day, new Date(selectedDate));
 
@@ -335,11 +330,7 @@ export default function CalendarGrid({
                   } ${isToday(day) ? "bg-blue-50/50" : ""} ${
                     isSelectedDay ? "ring-2 ring-blue-500 ring-inset" : ""
                   } hover:bg-slate-50 cursor-pointer`}
-                  onClick={() => {
-                    if (dayDuties.length > 0) {
-                      onCellClick(dayDuties[0], "0800");
-                    }
-                  }}
+                  onClick={() => onDaySelect?.(day)}
                   data-testid={`month-cell-${dateStr}`}
                 >
                   <div className={`text-sm font-medium mb-1 ${
@@ -350,20 +341,17 @@ export default function CalendarGrid({
                   
                   {/* Duties & Assignments */}
                   <div className="space-y-0.5">
-                    {dayDuties.slice(0, 3).map((duty) => {
-                      const dutyAssignments = dayAssignments.filter(
-                        (a) => a.schedule_duty_id === duty.id
-                      );
-                      return (
-                        <div
-                          key={duty.id}
-                          className="text-[9px] px-1 py-0.5 rounded truncate bg-blue-100 text-blue-700"
-                          title={`${duty.duty_code}: ${dutyAssignments.length} assigned`}
-                        >
-                          {duty.duty_code} ({dutyAssignments.length})
-                        </div>
-                      );
-                    })}
+                    {dayDuties.slice(0, 3).map((duty) => (
+                      <div
+                        key={duty.schedule_duty_id}
+                        className={`text-[9px] px-1 py-0.5 rounded truncate ${
+                          duty.filled < duty.required ? "bg-amber-100 text-amber-700" : "bg-blue-100 text-blue-700"
+                        }`}
+                        title={`${duty.duty_code}: ${duty.filled} of ${duty.required} assigned`}
+                      >
+                        {duty.duty_code} ({duty.filled}/{duty.required})
+                      </div>
+                    ))}
                     {dayDuties.length > 3 && (
                       <div className="text-[9px] text-slate-400 px-1">
                         +{dayDuties.length - 3} more
@@ -403,6 +391,38 @@ function DayView({
   reassignBlock,
   setReassignBlock,
 }) {
+  // Drop a dragged block onto an empty cell: same length, new duty/start
+  const handleDrop = async (e, duty, colIdx) => {
+    e.preventDefault();
+    const assignment = assignments.find((a) => a.id === e.dataTransfer.getData("text/plain"));
+    const blockSpan = assignment && getBlockSpan(assignment.start_time, assignment.end_time);
+    if (!blockSpan) return;
+    const endIdx = colIdx + blockSpan.span;
+    if (endIdx >= TIME_SLOTS.length) {
+      toast.error("Not enough room in that slot");
+      return;
+    }
+    try {
+      await axios.patch(`${API}/assignments/${assignment.id}/move`, {
+        schedule_duty_id: duty.id,
+        start_time: TIME_SLOTS[colIdx],
+        end_time: TIME_SLOTS[endIdx],
+        expected_version: assignment.version,
+      });
+      onAssignmentUpdated?.();
+    } catch (err) {
+      const detail = err.response?.data?.detail;
+      if (err.response?.status === 409) {
+        toast.error("Someone else changed this assignment. Refreshed.");
+        onAssignmentUpdated?.();
+      } else if (detail?.violations?.length) {
+        toast.error(detail.violations[0].message);
+      } else {
+        toast.error("Failed to move assignment");
+      }
+      console.error(err);
+    }
+  };
 
   return (
     <div className="calendar-scroll overflow-x-auto" data-testid="calendar-grid">
@@ -487,6 +507,11 @@ function DayView({
                           key={block.id}
                           className="absolute inset-y-0.5 left-0 bg-blue-50 border border-blue-200 rounded px-1.5 py-0.5 flex flex-col justify-center z-[5] cursor-pointer hover:bg-blue-100 transition-colors"
                           style={{ width: `calc(${block.span * 100}% - 2px)` }}
+                          draggable
+                          onDragStart={(e) => {
+                            e.dataTransfer.setData("text/plain", block.id);
+                            e.dataTransfer.effectAllowed = "move";
+                          }}
                           onClick={(e) => {
                             e.stopPropagation();
                             onCellClick(duty, t);
@@ -534,6 +559,8 @@ function DayView({
                   <div
                     key={t}
                     onClick={() => onCellClick(duty, t)}
+                    onDragOver={(e) => e.preventDefault()}
+                    onDrop={(e) => handleDrop(e, duty, colIdx)}
                     className={`border-r border-gray-50 grid-cell min-h-[44px] cursor-pointer transition-colors ${
                       isSelected ? "bg-blue-50" : "bg-white hover:bg-slate-50"
                     }`}
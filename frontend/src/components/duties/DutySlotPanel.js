@@ -53,23 +53,26 @@ export default function DutySlotPanel({
     }
   }, [clickedTimeSlot]);
 
-  // Fetch personnel
+  // Fetch personnel, ranked for this duty and time slot
   useEffect(() => {
-    if (!open || !dropdownOpen) return;
+    if (!open || !dropdownOpen || !duty) return;
     const fetchPersonnel = async () => {
       try {
-        const params = {};
+        const params = {
+          start_time: allDay ? "0600" : startTime,
+          end_time: allDay ? "1800" : endTime,
+        };
         if (searchQuery) params.search = searchQuery;
         if (activeTab === "available") params.available = true;
         if (activeTab === "unavailable") params.available = false;
-        const res = await axios.get(`${API}/personnel`, { params });
+        const res = await axios.get(`${API}/schedule-duties/${duty.id}/candidates`, { params });
         setPersonnel(res.data);
       } catch (e) {
         console.error("Failed to fetch personnel", e);
       }
     };
     fetchPersonnel();
-  }, [open, dropdownOpen, searchQuery, activeTab]);
+  }, [open, dropdownOpen, searchQuery, activeTab, duty, startTime, endTime, allDay]);
 
   // Reset on close
   useEffect(() => {
@@ -94,12 +94,21 @@ export default function GroupDutyPanel({
 
   const handleConfigSave = async (duties) => {
     try {
-      await axios.post(`${API}/duty-group-configs`, {
-        schedule_duty_id: duty.id,
-        duties: duties,
+      // Save and re-read the config in one round trip
+      const res = await axios.post(`${API}/batch`, {
+        requests: [
+          {
+            method: "POST",
+            path: "/api/duty-group-configs",
+            body: { schedule_duty_id: duty.id, duties: duties },
+          },
+          { method: "GET", path: `/api/duty-group-configs/${duty.id}` },
+        ],
       });
+      const [saved, refreshed] = res.data.responses;
+      if (saved.status !== 200) throw new Error(`Config save failed with ${saved.status}`);
       toast.success("Duties configured");
-      fetchConfig();
+      setConfig(refreshed.body);
     } catch (e) {
       toast.error("Failed to save configuration");
       console.error(e);
@@ -123,25 +132,40 @@ export default function GroupDutyPanel({
     try {
       const effectiveStart = allDay ? "0600" : startTime;
       const effectiveEnd = allDay ? "1800" : endTime;
-      let created = 0;
-
-      for (const [key, slot] of Object.entries(slotAssignments)) {
-        if (slot.assignmentId) continue; // Already saved
-        const [subDutyName, slotIdx] = key.split("-");
-        await axios.post(`${API}/assignments`, {
-          schedule_duty_id: duty.id,
-          duty_code: duty.duty_code || duty.duty_name,
-          duty_name: duty.duty_name,
-          personnel_id: slot.personnelId,
-          personnel_name: slot.name,
-          personnel_callsign: slot.callsign,
-          date: selectedDate,
-          start_time: effectiveStart,
-          end_time: effectiveEnd,
-          sub_duty_name: subDutyName,
-          slot_index: parseInt(slotIdx),
+      // All new slots go in one atomic batch: either every slot is
+      // filled or none are
+      const requests = Object.entries(slotAssignments)
+        .filter(([, slot]) => !slot.assignmentId) // Already saved
+        .map(([key, slot]) => {
+          const [subDutyName, slotIdx] = key.split("-");
+          return {
+            method: "POST",
+            path: "/api/assignments",
+            body: {
+              schedule_duty_id: duty.id,
+              duty_code: duty.duty_code || duty.duty_name,
+              duty_name: duty.duty_name,
+              personnel_id: slot.personnelId,
+              personnel_name: slot.name,
+              personnel_callsign: slot.callsign,
+              date: selectedDate,
+              start_time: effectiveStart,
+              end_time: effectiveEnd,
+              sub_duty_name: subDutyName,
+              slot_index: parseInt(slotIdx),
+            },
+          };
         });
-        created++;
+      let created = 0;
+      if (requests.length > 0) {
+        const res = await axios.post(`${API}/batch`, { requests, atomic: true });
+        if (res.data.rolled_back) {
+          const failure = res.data.responses[res.data.failed_index];
+          const message = failure.body?.detail?.violations?.[0]?.message;
+          toast.error(message || "Failed to assign personnel");
+          return;
+        }
+        created = requests.length;
       }
       if (created > 0) {
         toast.success(`${created} personnel assigned to ${duty.duty_name}`);
@@ -304,6 +328,7 @@ export default function GroupDutyPanel({
                           value={assigned}
                           onSelect={(person) => handleSlotAssign(dutyItem.name, slotIdx, person)}
                           testId={`slot-${dutyItem.name}-${slotIdx}`}
+                          availableAt={`${selectedDate}T${allDay ? "0600" : startTime}`}
                         />
                       </div>
                     );
@@ -5,7 +5,7 @@ import { ChevronDown, Search } from "lucide-react";
 
 const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
 
-export default function PersonnelDropdown({ value, onSelect, testId, showTabs = true }) {
+export default function PersonnelDropdown({ value, onSelect, testId, showTabs = true, availableAt }) {
   const [open, setOpen] = useState(false);
   const [search, setSearch] = useState("");
   const [personnel, setPersonnel] = useState([]);
@@ -23,6 +23,8 @@ export default function PersonnelDropdown({ value, onSelect, testId, showTabs =
         } else {
           params.available = true;
         }
+        // Leave, courses and sick days at the slot's start count as unavailable
+        if (availableAt) params.available_at = availableAt;
         const res = await axios.get(`${API}/personnel`, { params });
         setPersonnel(res.data);
       } catch (e) {
@@ -30,7 +32,7 @@ export default function PersonnelDropdown({ value, onSelect, testId, showTabs =
       }
     };
     fetchPersonnel();
-  }, [open, search, activeTab, showTabs]);
+  }, [open, search, activeTab, showTabs, availableAt]);
 
   // Close on outside click
   useEffect(() => {
@@ -1,4 +1,4 @@
-import { useState, useCallback, useEffect } from "react";
+import { useState, useCallback, useEffect, useRef } from "react";
 import axios from "axios";
 import Sidebar from "@/components/layout/Sidebar";
 import Header from "@/components/layout/Header";
@@ -6,14 +6,22 @@ import CalendarControls from "@/components/calendar/CalendarControls";
 import CalendarGrid from "@/components/calendar/CalendarGrid";
 import DutySlotPanel from "@/components/duties/DutySlotPanel";
 import GroupDutyPanel from "@/components/duties/GroupDutyPanel";
-import { format, startOfWeek, endOfWeek, startOfMonth, endOfMonth } from "date-fns";
+import { format, startOfWeek, endOfWeek, startOfMonth, endOfMonth, addDays } from "date-fns";
 
 const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
 
+// Merge a /sync delta into a list: replace changed rows by id, drop deleted ones
+const mergeChanges = (rows, changed, deletedIds) => {
+  const drop = new Set([...deletedIds, ...changed.map((r) => r.id)]);
+  return [...rows.filter((r) => !drop.has(r.id)), ...changed];
+};
+
 export default function SchedulerPage() {
   const [selectedDate, setSelectedDate] = useState(new Date());
   const [scheduleDuties, setScheduleDuties] = useState([]);
   const [assignments, setAssignments] = useState([]);
+  // Month view only shows filled vs required counts: { "yyyy-MM-dd": [rows] }
+  const [monthSummary, setMonthSummary] = useState({});
   const [activeView, setActiveView] = useState("Day");
 
   // Side panel state
@@ -45,30 +53,81 @@ export default function SchedulerPage() {
 
   const dateStr = format(selectedDate, "yyyy-MM-dd");
 
-  const fetchScheduleDuties = useCallback(async () => {
+  // /sync covers an explicit date range, including the single-day view
+  const getSyncRange = useCallback(() => {
+    const range = getDateRange();
+    return range.date
+      ? { start_date: range.date, end_date: range.date }
+      : { start_date: range.start_date, end_date: range.end_date };
+  }, [getDateRange]);
+
+  // Range and token of the last /sync response; after a mutation only the
+  // rows changed since then are pulled
+  const syncState = useRef({ key: null, token: null });
+
+  const syncRange = useCallback(async ({ full = false } = {}) => {
+    const params = getSyncRange();
+    const key = `${params.start_date}:${params.end_date}`;
+    if (!full && syncState.current.key === key && syncState.current.token) {
+      params.since = syncState.current.token;
+    }
     try {
-      const params = getDateRange();
-      const res = await axios.get(`${API}/schedule-duties`, { params });
-      setScheduleDuties(res.data);
+      const res = await axios.get(`${API}/sync`, { params });
+      // The view may have moved to another range while this was in flight
+      if (syncState.current.key !== key) return;
+      const { token, reset, schedule_duties, assignments: changed, deleted } = res.data;
+      syncState.current = { key, token };
+      if (reset) {
+        setScheduleDuties(schedule_duties);
+        setAssignments(changed);
+      } else {
+        setScheduleDuties((rows) => mergeChanges(rows, schedule_duties, deleted.schedule_duties));
+        setAssignments((rows) => mergeChanges(rows, changed, deleted.assignments));
+      }
     } catch (e) {
-      console.error("Failed to fetch schedule duties", e);
+      console.error("Failed to sync schedule", e);
     }
-  }, [getDateRange]);
+  }, [getSyncRange]);
+
+  // Month view reads /calendar/summary instead of /sync, for the six weeks
+  // its grid shows from the Monday before the 1st
+  const summaryKey = useRef(null);
 
-  const fetchAssignments = useCallback(async () => {
+  const fetchMonthSummary = useCallback(async () => {
+    const gridStart = startOfWeek(startOfMonth(selectedDate), { weekStartsOn: 1 });
+    const params = {
+      start_date: format(gridStart, "yyyy-MM-dd"),
+      end_date: format(addDays(gridStart, 41), "yyyy-MM-dd"),
+    };
+    const key = `${params.start_date}:${params.end_date}`;
+    summaryKey.current = key;
     try {
-      const params = getDateRange();
-      const res = await axios.get(`${API}/assignments`, { params });
-      setAssignments(res.data);
+      const res = await axios.get(`${API}/calendar/summary`, { params });
+      if (summaryKey.current !== key) return;
+      setMonthSummary(res.data.days);
     } catch (e) {
-      console.error("Failed to fetch assignments", e);
+      console.error("Failed to fetch month summary", e);
     }
-  }, [getDateRange]);
+  }, [selectedDate]);
+
+  const refresh = useCallback(
+    () => (activeView === "Month" ? fetchMonthSummary() : syncRange()),
+    [activeView, fetchMonthSummary, syncRange]
+  );
+  const fetchScheduleDuties = refresh;
+  const fetchAssignments = refresh;
 
   useEffect(() => {
-    fetchScheduleDuties();
-    fetchAssignments();
-  }, [fetchScheduleDuties, fetchAssignments]);
+    if (activeView === "Month") {
+      syncState.current = { key: null, token: null };
+      fetchMonthSummary();
+      return;
+    }
+    summaryKey.current = null;
+    const { start_date, end_date } = getSyncRange();
+    syncState.current = { key: `${start_date}:${end_date}`, token: null };
+    syncRange({ full: true });
+  }, [activeView, getSyncRange, syncRange, fetchMonthSummary]);
 
   const handleDutyAdded = () => {
     fetchScheduleDuties();
@@ -78,7 +137,6 @@ export default function SchedulerPage() {
     try {
       await axios.delete(`${API}/schedule-duties/${dutyId}`);
       fetchScheduleDuties();
-      fetchAssignments();
       if (selectedDuty?.id === dutyId) {
         setPanelOpen(false);
         setSelectedDuty(null);
@@ -95,6 +153,12 @@ export default function SchedulerPage() {
     setPanelOpen(true);
   };
 
+  // Month cells only carry counts; open the day to work on it
+  const handleDaySelect = (day) => {
+    setSelectedDate(day);
+    setActiveView("Day");
+  };
+
   const handlePanelClose = () => {
     setPanelOpen(false);
     setSelectedDuty(null);
@@ -131,6 +195,8 @@ export default function SchedulerPage() {
               onAssignmentUpdated={fetchAssignments}
               activeView={activeView}
               baseDate={selectedDate}
+              monthSummary={monthSummary}
+              onDaySelect={handleDaySelect}
             />
           </div>
           {panelOpen && !isGroupDuty && (